@@ -0,0 +1,216 @@
+"""
+個人解釋圖 (waterfall PNG、force plot HTML) 的短期存放區：/predict 只回傳簽章過、會過期的網址
+
+    artifact_id = artifact_store.put(png_bytes, "image/png")
+    path = artifact_store.signed_path(artifact_id)      # /artifacts/<id>?expires=...&sig=...
+    body, media_type, expires = artifact_store.open(artifact_id, expires, sig)
+
+以前圖是 base64 放在 /predict 的 JSON 裡 (大 33%，後端編碼、前端解碼，再由 Streamlit 送給瀏覽器)，
+force plot 的 HTML 也含整段 SHAP JS (約 270 KB)；
+現在兩者在後端只存一份，瀏覽器用網址直接向後端拿 (可以快取)，不經過 Streamlit。
+    - 有上限：LRU + TTL，總大小不超過 max_bytes
+    - 簽章：HMAC-SHA256(id, 到期時間)，沒有簽章拿不到別人的圖，到期後網址失效
+    - 兩種存放方式：
+        ArtifactStore       process 內 (單一 instance)
+        RespArtifactStore   與結果快取同一個 Redis 協定服務 (key healthshield:artifact:<id>，TTL 由服務端管)，
+                            A instance 存的圖，B instance 快取命中時也找得到、/artifacts 也拿得到
+    - 預設 off (照舊放在 JSON 裡)：Cloud Run 上瀏覽器拿圖的 request 可能送到別的 instance，
+      只有 RESULT_CACHE 是共用的 (redis://) 而且設了 ARTIFACT_SECRET 時，才預設用 RespArtifactStore；
+      memory 要明確指定 (單一 instance 或有 session affinity)，而且也要設 ARTIFACT_SECRET
+
+設定 (環境變數)：
+    ARTIFACT_STORE       off (預設；RESULT_CACHE 是 redis:// 而且有 ARTIFACT_SECRET 時預設用同一個服務)
+                         | redis://[:password@]host:port/db | memory (不能與共用的 RESULT_CACHE 一起用)
+                         off 時照舊放在 JSON 裡：圖是 base64，force plot 是 HTML
+    ARTIFACT_SECRET      簽章金鑰，每個 instance 相同 (memory / redis:// 必填，沒設定就不啟動)
+    ARTIFACT_TTL         秒數，預設 600 (網址與圖的有效期間)
+    ARTIFACT_MAX_MB      總大小上限，預設 64 (只用在 memory；共用存放區的上限由服務端的 maxmemory 管)
+    PUBLIC_BACKEND_URL   瀏覽器連得到的後端網址 (預設用 request 的網址)
+"""
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlencode
+
+from result_cache import KEY_PREFIX, RespCache
+
+ROUTE = "/artifacts"
+
+
+class ArtifactError(Exception):
+    """拿不到檔案：status 是要回給瀏覽器的 HTTP 狀態碼"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class ArtifactStore:
+    """process 內的 LRU + TTL；子類別換掉 put / touch / _load / stats 就能換存放的地方"""
+
+    def __init__(self, secret=None, ttl=600, max_bytes=64 * 1024 * 1024):
+        self.secret = (secret or secrets.token_hex(32)).encode()
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._items = OrderedDict()  # id -> (到期時間, media type, bytes)
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def put(self, body, media_type):
+        """存一個檔案 (bytes)，回傳 artifact id；存不進去回傳 None (呼叫端改放在 JSON 裡)"""
+        artifact_id = secrets.token_urlsafe(16)
+        now = time.time()
+        with self._lock:
+            self._items[artifact_id] = (now + self.ttl, media_type, body)
+            self._size += len(body)
+            self._evict(now)
+        return artifact_id
+
+    def touch(self, artifact_id):
+        """還在就把有效期間從現在重新算 (快取命中時重發網址用)，回傳是否還在"""
+        now = time.time()
+        with self._lock:
+            item = self._items.get(artifact_id)
+            if item is None or item[0] < now:
+                return False
+            self._items[artifact_id] = (now + self.ttl,) + item[1:]
+            self._items.move_to_end(artifact_id)
+            return True
+
+    def signature(self, artifact_id, expires):
+        message = f"{artifact_id}:{expires}".encode()
+        return hmac.new(self.secret, message, hashlib.sha256).hexdigest()
+
+    def signed_path(self, artifact_id):
+        """/artifacts/<id>?expires=<unix 秒>&sig=<hmac>"""
+        expires = int(time.time() + self.ttl)
+        query = urlencode({"expires": expires, "sig": self.signature(artifact_id, expires)})
+        return f"{ROUTE}/{artifact_id}?{query}"
+
+    def open(self, artifact_id, expires, sig):
+        """檢查簽章與期限，回傳 (bytes, media type, 到期時間)；不行就丟出 ArtifactError"""
+        if not hmac.compare_digest(self.signature(artifact_id, expires), sig or ""):
+            raise ArtifactError(403, "Invalid signature")
+        if expires < time.time():
+            raise ArtifactError(410, "Link expired")
+        item = self._load(artifact_id)
+        with self._lock:
+            if item is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if item is None:
+            raise ArtifactError(404, "Artifact not found or evicted")
+        media_type, body = item
+        return body, media_type, expires
+
+    def _load(self, artifact_id):
+        """回傳 (media type, bytes)，沒有或過期回傳 None"""
+        with self._lock:
+            item = self._items.get(artifact_id)
+            if item is None or item[0] < time.time():
+                return None
+            self._items.move_to_end(artifact_id)
+        return item[1:]
+
+    def stats(self):
+        with self._lock:
+            return {"backend": type(self).__name__, "entries": len(self._items), "bytes": self._size, "max_bytes": self.max_bytes,
+                    "ttl": self.ttl, "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+    def close(self):
+        pass
+
+    def _evict(self, now):
+        # 先丟過期的，再從最久沒用的開始丟到總大小以內 (至少留下剛放進來的一筆)
+        for artifact_id in [k for k, item in self._items.items() if item[0] < now]:
+            self._drop(artifact_id)
+        while self._size > self.max_bytes and len(self._items) > 1:
+            self._drop(next(iter(self._items)))
+
+    def _drop(self, artifact_id):
+        _, _, body = self._items.pop(artifact_id)
+        self._size -= len(body)
+        self.evictions += 1
+
+
+class RespArtifactStore(ArtifactStore):
+    """
+    所有 instance 共用的存放區 (Redis 協定)，連線與 fail open 的方式同 result_cache.RespCache：
+    服務掛掉時 put 回傳 None (改放在 JSON 裡)、touch 回傳 False (重算)、/artifacts 回 404
+    值是 <media type>\n<bytes>，過期交給服務端的 EX / EXPIRE
+    """
+
+    def __init__(self, client, secret, ttl=600):
+        super().__init__(secret=secret, ttl=ttl)
+        self.client = client
+
+    @classmethod
+    def from_url(cls, url, secret, ttl=600):
+        return cls(RespCache.from_url(url, ttl=ttl), secret, ttl)
+
+    @staticmethod
+    def key(artifact_id):
+        return f"{KEY_PREFIX}:artifact:{artifact_id}"
+
+    def put(self, body, media_type):
+        artifact_id = secrets.token_urlsafe(16)
+        value = media_type.encode() + b"\n" + body
+        if self.client.execute([("SET", self.key(artifact_id), value, "EX", max(1, int(self.ttl)))]) is None:
+            return None
+        return artifact_id
+
+    def touch(self, artifact_id):
+        replies = self.client.execute([("EXPIRE", self.key(artifact_id), max(1, int(self.ttl)))])
+        return replies is not None and replies[0] == 1
+
+    def _load(self, artifact_id):
+        replies = self.client.execute([("GET", self.key(artifact_id))])
+        if not replies or replies[0] is None:
+            return None
+        media_type, _, body = replies[0].partition(b"\n")
+        return media_type.decode(), body
+
+    def stats(self):
+        with self._lock:
+            return {"backend": type(self).__name__, "ttl": self.ttl, "hits": self.hits,
+                    "misses": self.misses, "errors": self.client.errors}
+
+    def close(self):
+        self.client.close()
+
+
+def from_env():
+    """
+    依 ARTIFACT_STORE 建立；off 回傳 None (照舊放在 JSON 裡)
+    沒有指定時：RESULT_CACHE 是共用的 (redis://) 而且有 ARTIFACT_SECRET 就存在同一個服務，否則 off
+    設定互相矛盾或少了金鑰就不啟動 (ValueError)
+    """
+    result_cache = os.getenv("RESULT_CACHE", "off").strip()
+    shared_cache = result_cache.startswith("redis://")
+    secret = os.getenv("ARTIFACT_SECRET")
+    spec = os.getenv("ARTIFACT_STORE", "").strip() or (result_cache if shared_cache and secret else "off")
+    if spec.lower() == "off":
+        return None
+    if spec != "memory" and not spec.startswith("redis://"):
+        raise ValueError(f"未知的 ARTIFACT_STORE: {spec}")
+    if not secret:
+        raise ValueError(f"ARTIFACT_STORE={spec} 需要設定 ARTIFACT_SECRET (每個 instance 相同)")
+    ttl = float(os.getenv("ARTIFACT_TTL", "600"))
+    if spec.startswith("redis://"):
+        return RespArtifactStore.from_url(spec, secret, ttl)
+    if shared_cache:
+        raise ValueError("RESULT_CACHE 是共用的，ARTIFACT_STORE 不能是 memory "
+                         "(別的 instance 找不到圖)；改用 redis://... 或 off")
+    return ArtifactStore(
+        secret=secret,
+        ttl=ttl,
+        max_bytes=int(float(os.getenv("ARTIFACT_MAX_MB", "64")) * 1024 * 1024),
+    )
@@ -0,0 +1,167 @@
+"""
+離線批次評分 (換模型後重新評分 NHANES 檔，不經過 HTTP)
+
+    python batch_score.py ALL_NHANES_MERGED_20072018.csv -o scores.parquet --workers 4
+    python batch_score.py P_DEMO.xpt -o scores.parquet --shap
+    python batch_score.py ALL_NHANES_MERGED_20072018.csv --scaling 1 2 4 --limit 200000
+
+輸入是 CSV 或 XPT (原始 NHANES 代碼，或與 /predict 相同的欄位)，分塊後交給 process pool：
+    - 每個 worker 啟動時載入一次模型參數包 (initializer)，之後只收資料塊
+    - 前處理與線上服務共用 inference.transform
+    - 同時在途的資料塊有上限 (workers x 2)，記憶體與檔案大小無關
+結果依輸入順序寫成 Parquet (id, probability，加上 --shap 時每個特徵一欄 shap_<name>)。
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from field_schema import FIELDS
+from inference import MODEL_PATH, RAW_SLEEP_COLS, derive_from_raw, load_bundle, predict_proba, transform
+
+INPUT_CODES = [f["code"] for f in FIELDS]
+
+# worker process 內的模型 (initializer 設定)
+_worker = {}
+
+
+def _init_worker(model_path, with_shap, threads):
+    pipeline, version = load_bundle(model_path)
+    model = pipeline["model"]
+    # 多個 process 各自再開滿 thread 會互搶 CPU
+    model.set_params(n_jobs=threads)
+    _worker.update(pipeline=pipeline, model=model, version=version, explainer=None)
+    if with_shap:
+        import shap
+        _worker["explainer"] = shap.TreeExplainer(model)
+
+
+def _score(chunk, id_column):
+    """worker 內執行：一塊原始資料 -> 結果 DataFrame"""
+    pipeline, model = _worker["pipeline"], _worker["model"]
+    df = chunk.apply(pd.to_numeric, errors="coerce")
+    df = derive_from_raw(df)
+    for code in INPUT_CODES:
+        if code not in df.columns:
+            df[code] = np.nan
+    # 原始睡眠欄位也要留著 (transform 裡才併成 Sleep_Hours)
+    cols = INPUT_CODES + [c for c in RAW_SLEEP_COLS if c in df.columns]
+    X = transform(df[cols].astype(float), pipeline)
+
+    out = pd.DataFrame(index=chunk.index)
+    if id_column and id_column in chunk.columns:
+        out["id"] = chunk[id_column].to_numpy()
+    out["probability"] = predict_proba(model, X).astype(np.float32)
+    if _worker["explainer"] is not None:
+        values = np.asarray(_worker["explainer"].shap_values(X, check_additivity=False), dtype=np.float32)
+        for i, name in enumerate(X.columns):
+            out[f"shap_{name}"] = values[:, i]
+    return out.reset_index(drop=True)
+
+
+def read_chunks(path, chunksize, limit=None):
+    """依副檔名分塊讀取 CSV / XPT；limit 只讀前幾列 (量測用)"""
+    if path.lower().endswith(".xpt"):
+        reader = pd.read_sas(path, format="xport", chunksize=chunksize)
+    else:
+        reader = pd.read_csv(path, chunksize=chunksize, low_memory=False)
+    seen = 0
+    for chunk in reader:
+        if limit is not None and seen + len(chunk) > limit:
+            chunk = chunk.iloc[:limit - seen]
+        seen += len(chunk)
+        yield chunk
+        if limit is not None and seen >= limit:
+            break
+
+
+def score_file(path, output=None, workers=1, chunksize=20000, with_shap=False,
+               id_column="SEQN", model_path=MODEL_PATH, limit=None):
+    """評分整個檔案；回傳統計 (列數、秒數、rows/s)"""
+    writer = None
+    if output:
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            sys.exit("❌ 輸出 Parquet 需要 pyarrow (pip install -r requirements-tools.txt)")
+
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    rows = 0
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(model_path, with_shap, threads)) as pool:
+        # 先讓每個 worker 載入模型，計時不含啟動成本
+        for f in [pool.submit(_worker_ready) for _ in range(workers)]:
+            f.result()
+        started = time.perf_counter()
+
+        pending = deque()
+        chunks = read_chunks(path, chunksize, limit)
+        exhausted = False
+        while pending or not exhausted:
+            # 保持最多 workers x 2 個資料塊在途
+            while not exhausted and len(pending) < workers * 2:
+                try:
+                    chunk = next(chunks)
+                except StopIteration:
+                    exhausted = True
+                    break
+                pending.append(pool.submit(_score, chunk, id_column))
+            if not pending:
+                break
+            result = pending.popleft().result()
+            rows += len(result)
+            if output:
+                table = pa.Table.from_pandas(result, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(output, table.schema, compression="zstd")
+                writer.write_table(table)
+    if writer is not None:
+        writer.close()
+    elapsed = time.perf_counter() - started
+    return {"workers": workers, "rows": rows, "seconds": round(elapsed, 2),
+            "rows_per_s": round(rows / elapsed) if elapsed else None}
+
+
+def _worker_ready():
+    return _worker.get("version")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="離線批次評分 (CSV / XPT -> Parquet)")
+    parser.add_argument("input", help="CSV 或 XPT 檔")
+    parser.add_argument("-o", "--output", help="輸出的 Parquet 檔")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunksize", type=int, default=20000)
+    parser.add_argument("--shap", action="store_true", help="一併輸出每個特徵的 SHAP 值")
+    parser.add_argument("--id-column", default="SEQN")
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--limit", type=int, help="只評分前 N 列")
+    parser.add_argument("--scaling", type=int, nargs="+", metavar="N",
+                        help="依序用這些 worker 數評分 (不輸出檔案)，比較 rows/s")
+    args = parser.parse_args()
+
+    if args.scaling:
+        results = [score_file(args.input, None, n, args.chunksize, args.shap, args.id_column,
+                              args.model, args.limit) for n in args.scaling]
+        base = results[0]["rows_per_s"]
+        for r in results:
+            r["speedup"] = round(r["rows_per_s"] / base, 2) if base else None
+        print(json.dumps(results, indent=2))
+        return
+
+    stats = score_file(args.input, args.output, args.workers, args.chunksize, args.shap,
+                       args.id_column, args.model, args.limit)
+    print(f"✅ {stats['rows']} 列，{stats['seconds']} 秒 ({stats['rows_per_s']} rows/s)"
+          + (f" -> {args.output}" if args.output else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,6 @@
+"""
+後端效能量測腳本
+
+請在 backend/ 目錄下執行 (模型 pkl 是用相對路徑載入的)，例如：
+    python -m benchmarks.prediction_log
+"""
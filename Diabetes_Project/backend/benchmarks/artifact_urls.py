@@ -0,0 +1,98 @@
+"""
+/predict 的解釋圖放在 JSON 裡 (ARTIFACT_STORE=off) vs 簽章網址 (ARTIFACT_STORE=memory)
+
+    python -m benchmarks.artifact_urls --requests 20
+
+兩種設定各啟動一個 uvicorn，送同樣的 N 組輸入 (每組不同，結果快取關著)，量：
+    json_kb       /predict 回應的大小
+    predict_ms    /predict 的延遲中位數
+    client_ms     前端處理回應的時間 (JSON 解析 + base64 解碼；網址模式只有 JSON 解析)
+    fetch_kb      網址模式下瀏覽器另外拿的圖與 HTML (只傳一次，之後用瀏覽器快取)
+"""
+import argparse
+import base64
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import requests
+
+from benchmarks.result_cache import make_inputs
+
+
+def start_instance(port, artifact_store):
+    proc = subprocess.Popen(
+        [sys.executable, "-W", "ignore", "-m", "uvicorn", "main:app", "--port", str(port)],
+        env=dict(os.environ, ARTIFACT_STORE=artifact_store, ARTIFACT_SECRET="bench", RESULT_CACHE="off",
+                 DRIFT_MONITOR="0", LOG_LEVEL="WARNING"),
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 120
+    while True:
+        try:
+            requests.get(f"{url}/schema", timeout=1)
+            return proc, url
+        except requests.ConnectionError:
+            if time.time() > deadline:
+                proc.terminate()
+                raise RuntimeError(f"{url} 沒有啟動")
+            time.sleep(0.5)
+
+
+def run_mode(artifact_store, port, inputs):
+    proc, url = start_instance(port, artifact_store)
+    sizes, latencies, client, fetched = [], [], [], []
+    try:
+        with requests.Session() as s:
+            s.post(f"{url}/predict", json=inputs[0]).raise_for_status()  # 暖身
+            for payload in inputs:
+                t0 = time.perf_counter()
+                r = s.post(f"{url}/predict", json=payload)
+                latencies.append((time.perf_counter() - t0) * 1000)
+                r.raise_for_status()
+                sizes.append(len(r.content))
+
+                # 前端 (app.compact_result) 對回應做的事
+                t0 = time.perf_counter()
+                shap_local = json.loads(r.content)["shap_local"]
+                if shap_local.get("waterfall"):
+                    base64.b64decode(shap_local["waterfall"])
+                client.append((time.perf_counter() - t0) * 1000)
+
+                # 瀏覽器另外拿的檔案
+                fetched.append(sum(len(s.get(shap_local[k]).content)
+                                   for k in ("waterfall_url", "force_html_url") if shap_local.get(k)))
+    finally:
+        proc.terminate()
+        proc.wait()
+    return {
+        "json_kb": round(statistics.median(sizes) / 1024, 1),
+        "predict_ms": round(statistics.median(latencies), 1),
+        "client_ms": round(statistics.median(client), 2),
+        "fetch_kb": round(statistics.median(fetched) / 1024, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--port", type=int, default=8111)
+    args = parser.parse_args()
+
+    inputs = make_inputs(args.requests)
+    results = {
+        "inline": run_mode("off", args.port, inputs),
+        "urls": run_mode("memory", args.port + 1, inputs),
+    }
+    print(json.dumps(results, indent=2))
+    inline, urls = results["inline"], results["urls"]
+    print(f"/predict JSON {inline['json_kb']} KB -> {urls['json_kb']} KB "
+          f"({(urls['json_kb'] / inline['json_kb'] - 1) * 100:+.0f}%)")
+
+
+if __name__ == "__main__":
+    main()
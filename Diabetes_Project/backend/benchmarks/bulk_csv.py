@@ -0,0 +1,141 @@
+"""
+/predict_csv 的吞吐量與記憶體：檔案變大時 RSS 高峰不應跟著變大
+
+    python -m benchmarks.bulk_csv --rows 100000 400000 --chunksize 5000
+
+會在背景啟動一個 uvicorn (TestClient 會把整個 request / response 放在記憶體，量不準)，
+上傳與下載都用串流，並從 /proc 取樣 server process 的 RSS。
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import requests
+
+from benchmarks.common import PROFILES
+
+
+def write_csv(path, n, bad_fraction=0.001, seed=0):
+    """由三種樣本組成 n 列 (分段寫入，產生檔案本身不佔太多記憶體)"""
+    base = pd.DataFrame(list(PROFILES.values()))
+    rng = np.random.default_rng(seed)
+    with open(path, "w") as f:
+        for start in range(0, n, 50000):
+            size = min(50000, n - start)
+            block = base.iloc[rng.integers(0, len(base), size)].reset_index(drop=True)
+            block.insert(0, "SEQN", np.arange(start, start + size))
+            bad = rng.random(size) < bad_fraction
+            block.loc[bad, "LBXGLU"] = 9999
+            block.to_csv(f, index=False, header=start == 0)
+
+
+def rss_bytes(pid):
+    with open(f"/proc/{pid}/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+class PeakRSS:
+    """背景取樣某個 process 的 RSS 高峰"""
+
+    def __init__(self, pid, interval=0.02):
+        self.pid = pid
+        self.interval = interval
+        self.peak = rss_bytes(pid)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, rss_bytes(self.pid))
+            time.sleep(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def start_server(port):
+    proc = subprocess.Popen(
+        [sys.executable, "-W", "ignore", "-m", "uvicorn", "main:app", "--port", str(port)],
+        env=dict(os.environ, DRIFT_MONITOR="0", LOG_LEVEL="WARNING"),
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 120
+    while True:
+        try:
+            requests.get(f"{url}/schema", timeout=1)
+            return proc, url
+        except requests.ConnectionError:
+            if time.time() > deadline:
+                proc.terminate()
+                raise RuntimeError("uvicorn 沒有啟動")
+            time.sleep(0.5)
+
+
+def run(url, pid, path, chunksize):
+    def upload():
+        with open(path, "rb") as f:
+            while block := f.read(1 << 20):
+                yield block
+
+    before = rss_bytes(pid)
+    summary, lines = None, 0
+    t0 = time.perf_counter()
+    with PeakRSS(pid) as rss:
+        with requests.post(f"{url}/predict_csv?chunksize={chunksize}", data=upload(),
+                           headers={"Content-Type": "text/csv"}, stream=True) as r:
+            for line in r.iter_lines():
+                lines += 1
+                if line.startswith(b'{"summary"'):
+                    summary = json.loads(line)["summary"]
+    elapsed = time.perf_counter() - t0
+    return {
+        "file_mb": round(os.path.getsize(path) / 2**20, 1),
+        "rows_scored": summary["rows_scored"],
+        "rows_failed": summary["rows_failed"],
+        "rows_per_s": round(summary["rows_read"] / elapsed),
+        "output_lines": lines,
+        "rss_peak_growth_mb": round((rss.peak - before) / 2**20, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=[100000, 400000])
+    parser.add_argument("--chunksize", type=int, default=5000)
+    parser.add_argument("--port", type=int, default=8111)
+    args = parser.parse_args()
+
+    results = {}
+    proc, url = start_server(args.port)
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            # 暖身一次 (第一次 predict 的配置)
+            warm = os.path.join(tmp, "warm.csv")
+            write_csv(warm, 20000)
+            run(url, proc.pid, warm, args.chunksize)
+            for n in args.rows:
+                path = os.path.join(tmp, f"rows_{n}.csv")
+                write_csv(path, n)
+                results[n] = run(url, proc.pid, path, args.chunksize)
+                os.remove(path)
+    finally:
+        proc.terminate()
+        proc.wait()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""量測腳本共用的工具：固定輸入樣本、計時與百分位數"""
+import time
+
+import numpy as np
+
+# 完整填寫的使用者 (NHANES 代碼)
+COMPLETE_PROFILE = {
+    "RIDAGEYR": 52, "RIAGENDR": 1,
+    "BMXHT": 172.0, "BMXWT": 84.0, "BMXBMI": 28.4, "BMXWAIST": 98.0,
+    "systolic_avg": 132.0, "diastolic_avg": 84.0,
+    "LBXGLU": 108.0, "LBXIN": 14.2, "LBXGH": 5.9, "LBXTC": 205.0,
+    "LBDHDD": 44.0, "LBDLDL": 128.0, "LBXTR": 165.0,
+    "SMQ020": 1, "ALQ130": 2.0, "PAQ665": 2, "PAQ650": 2,
+    "MCQ300C": 1, "HUQ010": 3, "Sleep_Hours": 6.5,
+}
+
+# 大部分都回答「I don't know」的使用者
+MOSTLY_UNKNOWN_PROFILE = {
+    "RIDAGEYR": 35, "RIAGENDR": 2,
+    "BMXHT": None, "BMXWT": 61.0, "BMXBMI": None, "BMXWAIST": None,
+    "systolic_avg": None, "diastolic_avg": None,
+    "LBXGLU": None, "LBXIN": None, "LBXGH": None, "LBXTC": None,
+    "LBDHDD": None, "LBDLDL": None, "LBXTR": None,
+    "SMQ020": None, "ALQ130": None, "PAQ665": 1, "PAQ650": None,
+    "MCQ300C": None, "HUQ010": None, "Sleep_Hours": None,
+}
+
+# 接近前端上下限的極端值
+EXTREME_PROFILE = {
+    "RIDAGEYR": 119, "RIAGENDR": 2,
+    "BMXHT": 249.0, "BMXWT": 249.0, "BMXBMI": 40.2, "BMXWAIST": 199.0,
+    "systolic_avg": 249.0, "diastolic_avg": 139.0,
+    "LBXGLU": 599.0, "LBXIN": 699.0, "LBXGH": 19.9, "LBXTC": 849.0,
+    "LBDHDD": 249.0, "LBDLDL": 399.0, "LBXTR": 2999.0,
+    "SMQ020": 1, "ALQ130": 89.0, "PAQ665": 2, "PAQ650": 2,
+    "MCQ300C": 1, "HUQ010": 1, "Sleep_Hours": 16.9,
+}
+
+PROFILES = {
+    "complete": COMPLETE_PROFILE,
+    "mostly_unknown": MOSTLY_UNKNOWN_PROFILE,
+    "extreme": EXTREME_PROFILE,
+}
+
+
+def time_calls(fn, n, warmup=5):
+    """呼叫 fn() n 次，回傳每次耗時 (秒) 的 numpy array"""
+    for _ in range(warmup):
+        fn()
+    samples = np.empty(n)
+    for i in range(n):
+        t0 = time.perf_counter()
+        fn()
+        samples[i] = time.perf_counter() - t0
+    return samples
+
+
+def summarize(samples):
+    """整理成毫秒的 p50 / p95 / p99 / mean"""
+    ms = np.asarray(samples) * 1000
+    return {
+        "n": int(ms.size),
+        "mean_ms": float(ms.mean()),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "p99_ms": float(np.percentile(ms, 99)),
+    }
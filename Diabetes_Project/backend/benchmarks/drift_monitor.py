@@ -0,0 +1,31 @@
+"""
+量測漂移監控每個 request 的更新成本
+
+    python -m benchmarks.drift_monitor --n 100000
+"""
+import argparse
+import json
+
+import main as backend
+from drift_monitor import DriftMonitor
+from benchmarks.common import PROFILES, summarize, time_calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n", type=int, default=100000)
+    args = parser.parse_args()
+
+    monitor = DriftMonitor.from_pipeline(backend.pipeline)
+    results = {}
+    for name, profile in PROFILES.items():
+        stats = summarize(time_calls(lambda: monitor.update(profile), args.n, warmup=100))
+        # 換成微秒比較好讀
+        results[name] = {k.replace("_ms", "_us"): (v * 1000 if k.endswith("_ms") else v)
+                         for k, v in stats.items()}
+    results["report_sample"] = monitor.report()["numeric"].get("LBXGLU")
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+explain 模式的速度與準確度：approx / trees 相對於 exact (TreeSHAP)
+
+    python -m benchmarks.explain_modes --data ../../ALL_NHANES_MERGED_20072018.csv
+    python -m benchmarks.explain_modes --sizes 1 100 10000 --trees 25 50 100
+
+準確度用 NHANES 測試集 (照 notebook：DIQ010 去掉 NaN 與 3、2 -> 0，
+test_size=0.2、stratify、random_state=2025) 的前 k 名特徵與 exact 比較；
+沒有 --data 時改用欄位規格範圍內隨機產生的資料 (輸出會標明 synthetic)。
+速度只量 contributions 本身 (transform 已先做好)，每個批次大小取最佳的一次。
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from explain import contributions, top_k_agreement
+from field_schema import FIELDS
+from inference import MODEL_PATH, RAW_SLEEP_COLS, derive_from_raw, load_bundle, transform
+
+INPUT_CODES = [f["code"] for f in FIELDS]
+SEED = 2025
+
+
+def nhanes_test_split(path):
+    """notebook 的切分方式，回傳測試集 (原始 NHANES 代碼)"""
+    from sklearn.model_selection import train_test_split
+
+    df = pd.read_csv(path, low_memory=False)
+    df["DIQ010"] = pd.to_numeric(df["DIQ010"], errors="coerce")
+    df = df[df["DIQ010"].notna() & (df["DIQ010"] != 3.0)].copy()
+    df.loc[df["DIQ010"] == 2.0, "DIQ010"] = 0.0
+    y = df["DIQ010"].astype(int)
+    _, test = train_test_split(df, test_size=0.2, stratify=y, random_state=SEED)
+    return test
+
+
+def synthetic_rows(n, seed=SEED):
+    """欄位規格範圍內的隨機輸入 (非必填欄位約 20% 缺值)"""
+    rng = np.random.default_rng(seed)
+    data = {}
+    for f in FIELDS:
+        if f["type"] == "category":
+            col = rng.choice(f["categories"], n).astype(float)
+        else:
+            col = rng.uniform(f.get("min", 0.0), f.get("max", 60.0), n)
+            if f["type"] == "integer":
+                col = np.round(col)
+        if not f.get("required"):
+            col[rng.random(n) < 0.2] = np.nan
+        data[f["code"]] = col
+    df = pd.DataFrame(data)
+    df["BMXBMI"] = df["BMXWT"] / (df["BMXHT"] / 100) ** 2
+    return df
+
+
+def features(raw, pipeline):
+    df = raw.apply(pd.to_numeric, errors="coerce")
+    df = derive_from_raw(df)
+    df = df.reindex(columns=INPUT_CODES + [c for c in RAW_SLEEP_COLS if c in df.columns]).astype(float)
+    return transform(df, pipeline)
+
+
+def best_time(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--data", help="ALL_NHANES_MERGED_20072018.csv (沒有就用合成資料)")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 100, 10000])
+    parser.add_argument("--trees", type=int, nargs="+", default=[25, 50, 100])
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--model", default=MODEL_PATH)
+    args = parser.parse_args()
+
+    pipeline, version = load_bundle(args.model)
+    model = pipeline["model"]
+    if args.data:
+        raw, source = nhanes_test_split(args.data), "nhanes_test_split"
+    else:
+        raw, source = synthetic_rows(max(max(args.sizes), 5000)), "synthetic"
+    X = features(raw, pipeline)
+
+    modes = [("approx", None)] + [("trees", n) for n in args.trees]
+    label = {(m, n): (m if n is None else f"trees{n}") for m, n in modes}
+
+    # 準確度：整個測試集
+    exact, _ = contributions(model, X, "exact")
+    agreement = {}
+    for mode, n in modes:
+        values, _ = contributions(model, X, mode, n)
+        agreement[label[(mode, n)]] = top_k_agreement(values, exact, args.k)
+
+    # 速度：各批次大小
+    speed = {}
+    for size in args.sizes:
+        batch = X.iloc[np.arange(size) % len(X)]
+        repeat = 20 if size <= 100 else 3
+        t_exact = best_time(lambda: contributions(model, batch, "exact"), repeat)
+        row = {"exact_ms": round(t_exact * 1000, 3)}
+        for mode, n in modes:
+            t = best_time(lambda: contributions(model, batch, mode, n), repeat)
+            row[f"{label[(mode, n)]}_ms"] = round(t * 1000, 3)
+            row[f"{label[(mode, n)]}_speedup"] = round(t_exact / t, 2)
+        speed[size] = row
+
+    print(json.dumps({"model_version": version, "source": source, "rows": len(X),
+                      "top_k_agreement": agreement, "speed": speed}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,356 @@
+"""
+訓練 / 服務一致性 (golden dataset)：notebook 的前處理 vs. 線上的 transform
+
+    python -m benchmarks.golden_parity
+    python -m benchmarks.golden_parity --transform mymodule:fast_transform -o parity.json
+    python -m benchmarks.golden_parity --refresh --data ALL_NHANES_MERGED_20072018.csv
+
+固定的樣本 (benchmarks/golden_nhanes.csv，ALL_NHANES_MERGED 的格式) 分別走兩條路：
+    notebook   1213_NHANES_20072020_ensemble.ipynb 的前處理 (rename、< 1e-10 視為缺值、
+               身高體重 BMI 回推、血壓平均、飲酒 / 吸菸規則、中位數填補、MinMax、one-hot)，
+               訓練集的中位數與 scaler 改用參數包裡存的值
+    serving    batch_score.py 的路徑 (derive_from_raw -> transform) 與 /predict (explain=none)
+比較每個特徵與機率，超過容許誤差就列出最差的欄位並以 exit code 1 結束；
+同時量 serving 路徑的延遲 (整批 transform + predict_proba、單筆 /predict)。
+--transform 換成要上線的新版 transform，先證明結果不變再合併。
+
+樣本的 case 欄位：sample 是測試集 (notebook 的切分) 抽出的列，其餘是把某些欄位清成
+缺值的複本，確保每個填補分支都有被走到。年齡在服務端是必填、參數包也沒有年齡的中位數，
+所以樣本只收年齡有值的人。
+--refresh 的 --data 要是 combine_year.py 的輸出 (已經過 deal_nan.py 清洗)。
+"""
+import argparse
+import importlib
+import itertools
+import json
+import os
+import platform
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.common import summarize, time_calls
+from benchmarks.explain_modes import nhanes_test_split
+from field_schema import FIELDS
+from inference import MODEL_PATH, RAW_SLEEP_COLS, derive_from_raw, load_bundle, predict_proba
+
+GOLDEN_PATH = os.path.join(os.path.dirname(__file__), "golden_nhanes.csv")
+INPUT_CODES = [f["code"] for f in FIELDS]
+SEED = 2025
+
+SYS_COLS = ["BPXSY1", "BPXSY2", "BPXSY3"]
+DIA_COLS = ["BPXDI1", "BPXDI2", "BPXDI3"]
+LAB_COLS = ["LBXGLU", "LBXIN", "LBXGH", "LBXTC", "LBDHDD", "LBDLDL", "LBXTR"]
+
+# 複本要清成缺值的欄位 (每種 case 取 3 個不同的人)
+EDGE_CASES = {
+    "missing:BMXHT": ["BMXHT"],
+    "missing:BMXWT": ["BMXWT"],
+    "missing:BMXBMI": ["BMXBMI"],
+    "missing:BMXHT+BMXWT": ["BMXHT", "BMXWT"],
+    "missing:BMXHT+BMXBMI": ["BMXHT", "BMXBMI"],
+    "missing:BMXWT+BMXBMI": ["BMXWT", "BMXBMI"],
+    "missing:body": ["BMXHT", "BMXWT", "BMXBMI", "BMXWAIST"],
+    "missing:bp": SYS_COLS + DIA_COLS,
+    "missing:labs": LAB_COLS,
+    "missing:lifestyle": ["SMQ020", "ALQ130", "PAQ665", "PAQ650", "MCQ300C", "HUQ010", "SLD012"],
+    "missing:all_optional": ["BMXHT", "BMXWT", "BMXBMI", "BMXWAIST"] + SYS_COLS + DIA_COLS + LAB_COLS
+                            + ["SMQ020", "ALQ130", "PAQ665", "PAQ650", "MCQ300C", "HUQ010", "SLD012"],
+}
+
+# ---------------------------------------------------------
+# notebook 的前處理 (cell 2, 3, 9, 13, 19)
+# ---------------------------------------------------------
+NOTEBOOK_RENAME = {
+    "SEQN": "ID", "DIQ010": "diabetes", "RIDAGEYR": "age", "RIAGENDR": "gender",
+    "BMXHT": "height_cm", "BMXWT": "weight_kg", "BMXBMI": "bmi", "BMXWAIST": "waist_cm",
+    "BPXSY1": "systolic1", "BPXDI1": "diastolic1", "BPXSY2": "systolic2",
+    "BPXDI2": "diastolic2", "BPXSY3": "systolic3", "BPXDI3": "diastolic3",
+    "LBXGLU": "glucose_fast", "LBXIN": "insulin", "LBXGH": "HbA1c", "LBXTC": "cholesterol_total",
+    "LBDHDD": "hdl", "LBDLDL": "ldl", "LBXTR": "triglycerides",
+    "SMQ020": "ever_smoked", "MCQ300C": "family_diabetes", "ALQ130": "alcohol_drink",
+    "PAQ665": "moderate_excercise", "PAQ650": "serious_excercise",
+    "SLD012": "sleep_time", "HUQ010": "health_score",
+}
+
+# notebook 的欄位名稱 -> 參數包 (final_columns) 的名稱
+NOTEBOOK_TO_BUNDLE = {
+    "glucose_fast": "fasting_glucose", "cholesterol_total": "total_cholesterol",
+    "hdl": "HDL", "ldl": "LDL", "alcohol_drink": "alcohol_drinks",
+    "moderate_excercise": "moderate_activity", "serious_excercise": "vigorous_activity",
+    "sleep_time": "Sleep_Hours", "health_score": "general_health",
+}
+
+# notebook 的 median_fill_columns -> imputer_stats 的 key
+MEDIAN_STATS = {
+    "waist_cm": "BMXWAIST", "glucose_fast": "LBXGLU", "insulin": "LBXIN", "HbA1c": "LBXGH",
+    "cholesterol_total": "LBXTC", "hdl": "LBDHDD", "ldl": "LBDLDL", "triglycerides": "LBXTR",
+    "sleep_time": "Sleep_Hours", "health_score": "HUQ010",
+    "systolic_avg": "systolic_avg", "diastolic_avg": "diastolic_avg",
+}
+
+
+def fill_height_weight_bmi_partial(df):
+    h, w, b = df["height_cm"], df["weight_kg"], df["bmi"]
+
+    mask_bmi_missing = b.isna() & h.notna() & w.notna()
+    df.loc[mask_bmi_missing, "bmi"] = df.loc[mask_bmi_missing, "weight_kg"] / (df.loc[mask_bmi_missing, "height_cm"] / 100) ** 2
+
+    mask_weight_missing = w.isna() & h.notna() & b.notna()
+    df.loc[mask_weight_missing, "weight_kg"] = df.loc[mask_weight_missing, "bmi"] * (df.loc[mask_weight_missing, "height_cm"] / 100) ** 2
+
+    mask_height_missing = h.isna() & w.notna() & b.notna()
+    df.loc[mask_height_missing, "height_cm"] = np.sqrt(df.loc[mask_height_missing, "weight_kg"] / df.loc[mask_height_missing, "bmi"]) * 100
+    return df
+
+
+def fill_remaining_height_weight_bmi(df, median_height, median_weight):
+    mask = df["height_cm"].isna() & df["weight_kg"].isna() & df["bmi"].notna()
+    df.loc[mask, "weight_kg"] = median_weight
+    df.loc[mask, "height_cm"] = np.sqrt(df.loc[mask, "weight_kg"] / df.loc[mask, "bmi"]) * 100
+
+    mask = df["height_cm"].isna() & df["weight_kg"].notna() & df["bmi"].isna()
+    df.loc[mask, "height_cm"] = median_height
+    df.loc[mask, "bmi"] = df.loc[mask, "weight_kg"] / ((df.loc[mask, "height_cm"] / 100) ** 2)
+
+    mask = df["weight_kg"].isna() & df["height_cm"].notna() & df["bmi"].isna()
+    df.loc[mask, "weight_kg"] = median_weight
+    df.loc[mask, "bmi"] = df.loc[mask, "weight_kg"] / ((df.loc[mask, "height_cm"] / 100) ** 2)
+
+    mask = df["height_cm"].isna() & df["weight_kg"].isna() & df["bmi"].isna()
+    df.loc[mask, "height_cm"] = median_height
+    df.loc[mask, "weight_kg"] = median_weight
+    df.loc[mask, "bmi"] = df.loc[mask, "weight_kg"] / ((df.loc[mask, "height_cm"] / 100) ** 2)
+    return df
+
+
+def notebook_features(golden, pipeline):
+    """notebook 的 X_test 前處理 -> 模型輸入 (欄位順序同 final_columns)"""
+    stats = pipeline["imputer_stats"]
+    df = golden.rename(columns=NOTEBOOK_RENAME)
+
+    # cell 3：舒張壓與年齡 < 1e-10 視為缺值
+    bp = ["systolic1", "diastolic1", "systolic2", "diastolic2", "systolic3", "diastolic3"]
+    for col in bp + ["age"]:
+        df[col] = pd.to_numeric(df[col], errors="coerce")
+    check = ["diastolic1", "diastolic2", "diastolic3", "age"]
+    df[check] = df[check].mask(df[check].lt(1e-10))
+
+    # cell 9
+    X = df.drop(columns=["ID", "diabetes", "Source", "case"], errors="ignore").astype(float)
+
+    # cell 13 (訓練集的中位數 -> imputer_stats)
+    X = fill_height_weight_bmi_partial(X)
+    X = fill_remaining_height_weight_bmi(X, stats["BMXHT"], stats["BMXWT"])
+    X["systolic_avg"] = X[["systolic1", "systolic2", "systolic3"]].mean(axis=1)
+    X["diastolic_avg"] = X[["diastolic1", "diastolic2", "diastolic3"]].mean(axis=1)
+
+    X.loc[X["age"] < 20, "alcohol_drink"] = X.loc[X["age"] < 20, "alcohol_drink"].fillna(0)
+    X["alcohol_drink"] = X["alcohol_drink"].fillna(stats["ALQ130_adult"])
+
+    for col, key in MEDIAN_STATS.items():
+        X[col] = X[col].fillna(stats[key])
+
+    X.loc[X["age"] < 20, "ever_smoked"] = X.loc[X["age"] < 20, "ever_smoked"].fillna(2)
+    other_categorical = ["ever_smoked", "family_diabetes", "moderate_excercise", "serious_excercise"]
+    X[other_categorical] = X[other_categorical].fillna(3)
+    X = X.drop(columns=bp)
+
+    # cell 19 (scaler 與欄位順序 -> 參數包)
+    X = X.rename(columns=NOTEBOOK_TO_BUNDLE)
+    minmax = pipeline["minmax_cols"]
+    X[minmax] = pipeline["scaler"].transform(X[minmax])
+    for col in pipeline["onehot_cols"]:
+        X[col] = X[col].astype(str)
+    X = pd.get_dummies(X, columns=pipeline["onehot_cols"])
+    X = X.reindex(columns=pipeline["final_columns"], fill_value=0)
+    return X.astype({col: int for col in X.select_dtypes(bool).columns})
+
+
+# ---------------------------------------------------------
+# 服務端的兩條路
+# ---------------------------------------------------------
+def serving_features(golden, pipeline, transform):
+    """batch_score.py 的路徑 (原始 NHANES 欄位)"""
+    df = golden.drop(columns=["case"]).apply(pd.to_numeric, errors="coerce")
+    df = derive_from_raw(df)
+    df = df.reindex(columns=INPUT_CODES + [c for c in RAW_SLEEP_COLS if c in df.columns])
+    return transform(df.astype(float), pipeline)
+
+
+def api_payloads(golden):
+    """/predict 的輸入：血壓平均與睡眠時數由前端算好 (同 notebook 的定義)"""
+    df = golden.apply(pd.to_numeric, errors="coerce")
+    dia = df[DIA_COLS].mask(df[DIA_COLS].lt(1e-10))
+    df["systolic_avg"] = df[SYS_COLS].mean(axis=1)
+    df["diastolic_avg"] = dia.mean(axis=1)
+    df["Sleep_Hours"] = df["SLD012"]
+    df = df[INPUT_CODES].astype(object)
+    return df.where(df.notna(), None).to_dict("records")
+
+
+def compare_frames(expected, actual):
+    """每個欄位的最大絕對誤差"""
+    a = expected.to_numpy(dtype=float)
+    b = actual.reindex(columns=expected.columns).to_numpy(dtype=float)
+    diff = np.where(np.isnan(a) & np.isnan(b), 0.0, np.abs(a - b))
+    diff = np.nan_to_num(diff, nan=np.inf)
+    return pd.Series(diff.max(axis=0), index=expected.columns), diff.max(axis=1)
+
+
+def check(name, max_diff, row_diff, atol, golden):
+    bad = row_diff > atol
+    result = {"max_abs_diff": float(np.max(row_diff)) if len(row_diff) else 0.0,
+              "mismatched_rows": int(bad.sum()), "atol": atol, "ok": not bad.any()}
+    if bad.any():
+        result["cases"] = golden.loc[bad, "case"].value_counts().to_dict()
+    if max_diff is not None:
+        worst = max_diff[max_diff > atol].sort_values(ascending=False)
+        result["columns"] = {k: float(v) for k, v in worst.head(10).items()}
+    mark = "✅" if result["ok"] else "❌"
+    print(f"{mark} {name:<28} max |Δ| = {result['max_abs_diff']:.3g}  "
+          f"({result['mismatched_rows']} / {len(row_diff)} 列超過 {atol:g})")
+    for col, v in result.get("columns", {}).items():
+        print(f"     {col:<26} {v:.6g}")
+    for case, n in result.get("cases", {}).items():
+        print(f"     case {case:<21} {n} 列")
+    return result
+
+
+def load_transform(spec):
+    module, _, name = spec.partition(":")
+    return getattr(importlib.import_module(module), name or "transform")
+
+
+# ---------------------------------------------------------
+# 產生 golden 樣本
+# ---------------------------------------------------------
+def build_golden(path, rows, seed=SEED):
+    """測試集抽 rows 列，再加上各種缺值的複本"""
+    test = nhanes_test_split(path)
+    test = test[pd.to_numeric(test["RIDAGEYR"], errors="coerce").ge(1e-10)]
+    sample = test.sample(n=min(rows, len(test)), random_state=seed).reset_index(drop=True)
+    sample.insert(0, "case", "sample")
+
+    rng = np.random.default_rng(seed)
+    parts = [sample]
+    for case, cols in EDGE_CASES.items():
+        part = sample.iloc[rng.choice(len(sample), 3, replace=False)].copy()
+        part["case"] = case
+        part[[c for c in cols if c in part.columns]] = np.nan
+        parts.append(part)
+    # 未滿 20 歲、沒回答吸菸 / 飲酒 (notebook 填 2 / 0)
+    minors = sample.iloc[rng.choice(len(sample), 3, replace=False)].copy()
+    minors["case"] = "minor:no_smoke_alcohol"
+    minors["RIDAGEYR"] = [12.0, 16.0, 19.0]
+    minors[["SMQ020", "ALQ130"]] = np.nan
+    # 舒張壓 0 (notebook 視為缺值)
+    zeros = sample.iloc[rng.choice(len(sample), 3, replace=False)].copy()
+    zeros["case"] = "zero:diastolic"
+    zeros[["BPXDI1", "BPXDI2"]] = 0.0
+    parts += [minors, zeros]
+    return pd.concat(parts, ignore_index=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--golden", default=GOLDEN_PATH)
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--transform", default="inference:transform",
+                        help="要驗證的 transform (module:function，簽名同 inference.transform)")
+    parser.add_argument("--feature-atol", type=float, default=1e-9)
+    parser.add_argument("--proba-atol", type=float, default=1e-6)
+    parser.add_argument("--no-api", action="store_true", help="不測 /predict (不載入 main.py)")
+    parser.add_argument("--requests", type=int, default=200, help="單筆 /predict 量幾次")
+    parser.add_argument("--repeat", type=int, default=5, help="整批量幾次 (取最快)")
+    parser.add_argument("-o", "--output", help="結果寫成 JSON")
+    parser.add_argument("--refresh", action="store_true", help="由 --data 重新產生 golden 樣本")
+    parser.add_argument("--data", help="ALL_NHANES_MERGED_20072018.csv (--refresh 用)")
+    parser.add_argument("--rows", type=int, default=500, help="--refresh 從測試集抽幾列")
+    args = parser.parse_args()
+
+    if args.refresh:
+        if not args.data:
+            sys.exit("❌ --refresh 需要 --data")
+        golden = build_golden(args.data, args.rows)
+        golden.to_csv(args.golden, index=False, float_format="%.10g")
+        print(f"✅ golden 樣本 ({len(golden)} 列) 已寫入 {args.golden}")
+        return
+
+    pipeline, version = load_bundle(args.model)
+    model = pipeline["model"]
+    transform = load_transform(args.transform)
+    golden = pd.read_csv(args.golden)
+    print(f"golden: {args.golden} ({len(golden)} 列)  model: {version}  transform: {args.transform}")
+
+    expected = notebook_features(golden.copy(), pipeline)
+    expected_prob = predict_proba(model, expected)
+    results = {}
+
+    actual = serving_features(golden.copy(), pipeline, transform)
+    col_diff, row_diff = compare_frames(expected, actual)
+    results["batch_features"] = check("batch features", col_diff, row_diff, args.feature_atol, golden)
+    prob_diff = np.abs(predict_proba(model, actual) - expected_prob)
+    results["batch_probability"] = check("batch probability", None, prob_diff, args.proba_atol, golden)
+
+    latency = {}
+    best = min(time_calls(lambda: predict_proba(model, serving_features(golden.copy(), pipeline, transform)),
+                          args.repeat, warmup=1))
+    latency["batch"] = {"rows": len(golden), "ms": round(best * 1000, 3),
+                        "rows_per_s": round(len(golden) / best, 1)}
+
+    if not args.no_api:
+        import main as backend
+        from fastapi import HTTPException
+
+        api_prob = np.full(len(golden), np.nan)
+        payloads = api_payloads(golden)
+        valid = []
+        for i, payload in enumerate(payloads):
+            try:
+                api_prob[i] = backend.predict(backend.InputData(**payload), explain="none")["probability"]
+                valid.append(i)
+            except HTTPException:  # 超出欄位規格 (422) 的列 /predict 本來就不收
+                pass
+        skipped = len(golden) - len(valid)
+        results["api_probability"] = check("/predict probability", None,
+                                           np.abs(api_prob[valid] - expected_prob[valid]),
+                                           args.proba_atol, golden.iloc[valid])
+        results["api_probability"]["skipped_invalid"] = skipped
+        if skipped:
+            print(f"     ⚠ {skipped} 列不符合欄位規格，/predict 不收 (不列入比較)")
+
+        requests = itertools.cycle([backend.InputData(**payloads[i]) for i in valid])
+        samples = time_calls(lambda: backend.predict(next(requests), explain="none"), args.requests)
+        latency["predict_single"] = {k: round(v, 3) for k, v in summarize(samples).items()}
+
+    print(f"serving 延遲：整批 {latency['batch']['rows']} 列 {latency['batch']['ms']:.1f} ms "
+          f"({latency['batch']['rows_per_s']:.0f} 列/秒)", end="")
+    if "predict_single" in latency:
+        single = latency["predict_single"]
+        print(f"；單筆 /predict p50 {single['p50_ms']:.2f} ms / p95 {single['p95_ms']:.2f} ms", end="")
+    print()
+
+    ok = all(r["ok"] for r in results.values())
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "model_version": version,
+                "transform": args.transform,
+                "golden": os.path.basename(args.golden),
+                "rows": len(golden),
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                "python": platform.python_version(),
+                "ok": ok,
+                "checks": results,
+                "latency": latency,
+            }, f, indent=2)
+        print(f"✅ 結果已寫入 {args.output}")
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+"""
+負載測試：一個 backend instance 每秒能處理多少 request、p99 在哪個併發數開始惡化
+
+    python -m benchmarks.load_test
+    python -m benchmarks.load_test --concurrency 1 4 16 64 --duration 15 -o load.json
+    python -m benchmarks.load_test --scenarios predict:approx predict_csv:none --compare load.json
+    python -m benchmarks.load_test --url http://127.0.0.1:8000      # 不啟動，直接打現有的服務
+
+預設在背景啟動 uvicorn (結果快取、drift monitor 關閉)，用 asyncio + httpx 的
+closed loop：每個併發數開 N 個 worker，各自不停送 request，持續 --duration 秒。
+輸入依 --mix 的比例從三種樣本抽樣 (完整填寫 / 大部分不知道 / 極端值)，數值加上擾動。
+每個 scenario (端點:explain 模式) x 併發數輸出 rps 與 p50/p95/p99，
+JSON 內含 git commit 與模型版本，可用 --compare 與上一次的結果比較。
+需要 httpx (pip install -r requirements-tools.txt)。
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+
+import pandas as pd
+
+from benchmarks.bulk_csv import start_server
+from benchmarks.common import PROFILES, summarize
+from field_schema import FIELDS
+from inference import MODEL_PATH, load_bundle
+
+BOUNDS = {f["code"]: (f.get("min", float("-inf")), f.get("max", float("inf"))) for f in FIELDS}
+
+DEFAULT_SCENARIOS = ["predict:exact", "predict:approx", "predict:none", "global_shap"]
+DEFAULT_MIX = "complete=0.5,mostly_unknown=0.3,extreme=0.2"
+
+
+def parse_mix(spec):
+    names, weights = [], []
+    for part in spec.split(","):
+        name, weight = part.split("=")
+        if name not in PROFILES:
+            raise SystemExit(f"❌ 未知的樣本: {name} (可用: {list(PROFILES)})")
+        names.append(name)
+        weights.append(float(weight))
+    return names, weights
+
+
+def make_payload(rng, names, weights):
+    """依比例挑一種樣本，數值乘上 0.95 ~ 1.05 (避免每次都是同一組輸入，不超出欄位範圍)"""
+    profile = dict(PROFILES[rng.choices(names, weights)[0]])
+    for key, value in profile.items():
+        if isinstance(value, float):
+            lo, hi = BOUNDS[key]
+            profile[key] = round(min(max(value * rng.uniform(0.95, 1.05), lo), hi), 1)
+    return profile
+
+
+class Scenario:
+    """一種要量的 request：predict:<explain>、predict_csv:<explain> 或 global_shap"""
+
+    def __init__(self, spec, csv_rows):
+        self.name = spec
+        endpoint, _, explain = spec.partition(":")
+        self.endpoint = endpoint
+        self.explain = explain or None
+        self.csv_rows = csv_rows
+        if endpoint not in ("predict", "predict_csv", "global_shap"):
+            raise SystemExit(f"❌ 未知的 scenario: {spec}")
+
+    def request(self, rng, names, weights):
+        """回傳 (method, path, kwargs)"""
+        if self.endpoint == "global_shap":
+            return "GET", "/global_shap", {}
+        params = {"explain": self.explain} if self.explain else {}
+        if self.endpoint == "predict":
+            return "POST", "/predict", {"params": params, "json": make_payload(rng, names, weights)}
+        rows = pd.DataFrame([make_payload(rng, names, weights) for _ in range(self.csv_rows)])
+        return "POST", "/predict_csv", {
+            "params": params, "content": rows.to_csv(index=False),
+            "headers": {"Content-Type": "text/csv"},
+        }
+
+
+async def run_level(client, scenario, concurrency, duration, names, weights, seed):
+    """concurrency 個 worker 持續送 duration 秒；回傳延遲 (秒) 與錯誤數"""
+    latencies, errors = [], {}
+    deadline = time.perf_counter() + duration
+
+    async def worker(i):
+        rng = random.Random(seed * 1000 + i)
+        while time.perf_counter() < deadline:
+            method, path, kwargs = scenario.request(rng, names, weights)
+            t0 = time.perf_counter()
+            try:
+                r = await client.request(method, path, **kwargs)
+                await r.aread()
+                status = r.status_code
+            except Exception as e:  # 逾時、連線被拒等都算錯誤，繼續送
+                status = type(e).__name__
+            elapsed = time.perf_counter() - t0
+            if status == 200:
+                latencies.append(elapsed)
+            else:
+                errors[str(status)] = errors.get(str(status), 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    return latencies, errors, time.perf_counter() - started
+
+
+async def run_all(url, scenarios, levels, duration, warmup, names, weights, timeout):
+    import httpx
+
+    results = {}
+    limits = httpx.Limits(max_connections=max(levels), max_keepalive_connections=max(levels))
+    async with httpx.AsyncClient(base_url=url, timeout=timeout, limits=limits) as client:
+        for scenario in scenarios:
+            # 暖身 (第一次 SHAP / 圖的配置不算進去)
+            await run_level(client, scenario, 1, warmup, names, weights, seed=0)
+            rows = []
+            for level in levels:
+                latencies, errors, elapsed = await run_level(
+                    client, scenario, level, duration, names, weights, seed=level)
+                row = {"concurrency": level, "rps": round(len(latencies) / elapsed, 2),
+                       "errors": errors}
+                if latencies:
+                    row.update({k: round(v, 2) for k, v in summarize(latencies).items()})
+                rows.append(row)
+                print(f"  {scenario.name:<22} c={level:<4} rps={row['rps']:<8} "
+                      f"p99={row.get('p99_ms', float('nan')):.1f}ms", file=sys.stderr)
+            results[scenario.name] = {"levels": rows, "saturation": saturation(rows)}
+    return results
+
+
+def saturation(rows, gain=1.05):
+    """rps 不再明顯增加 (< 5%) 的第一個併發數，以及那時的 p99"""
+    for prev, cur in zip(rows, rows[1:]):
+        if cur["rps"] < prev["rps"] * gain:
+            return {"concurrency": prev["concurrency"], "rps": prev["rps"],
+                    "p99_ms": prev.get("p99_ms")}
+    return None
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_table(results, baseline=None):
+    header = f"{'scenario':<22} {'conc':>5} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}"
+    if baseline:
+        header += f" {'Δrps':>8} {'Δp99':>8}"
+    print(header)
+    print("-" * len(header))
+    for name, res in results.items():
+        base_rows = {r["concurrency"]: r for r in (baseline or {}).get(name, {}).get("levels", [])}
+        for r in res["levels"]:
+            line = (f"{name:<22} {r['concurrency']:>5} {r['rps']:>9.1f} {r.get('p50_ms', float('nan')):>9.1f} "
+                    f"{r.get('p95_ms', float('nan')):>9.1f} {r.get('p99_ms', float('nan')):>9.1f} "
+                    f"{sum(r['errors'].values()):>7}")
+            b = base_rows.get(r["concurrency"])
+            if baseline:
+                if b and b["rps"] and b.get("p99_ms"):
+                    line += (f" {(r['rps'] / b['rps'] - 1) * 100:>+7.1f}%"
+                             f" {(r.get('p99_ms', float('nan')) / b['p99_ms'] - 1) * 100:>+7.1f}%")
+                else:
+                    line += f" {'-':>8} {'-':>8}"
+            print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", default=DEFAULT_SCENARIOS,
+                        help="endpoint[:explain]，endpoint 為 predict / predict_csv / global_shap")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--duration", type=float, default=10.0, help="每個併發數持續的秒數")
+    parser.add_argument("--warmup", type=float, default=2.0)
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="樣本比例，例如 complete=0.5,extreme=0.5")
+    parser.add_argument("--csv-rows", type=int, default=100, help="predict_csv 每個 request 的列數")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--url", help="直接測試現有的服務 (不啟動 uvicorn)")
+    parser.add_argument("--port", type=int, default=8112)
+    parser.add_argument("-o", "--output", help="結果寫成 JSON")
+    parser.add_argument("--compare", help="上一次的 JSON，表格多列出 rps / p99 的變化")
+    args = parser.parse_args()
+
+    try:
+        import httpx  # noqa: F401
+    except ImportError:
+        sys.exit("❌ 負載測試需要 httpx (pip install -r requirements-tools.txt)")
+
+    names, weights = parse_mix(args.mix)
+    scenarios = [Scenario(s, args.csv_rows) for s in args.scenarios]
+    levels = sorted(set(args.concurrency))
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["scenarios"]
+
+    proc = None
+    url = args.url
+    if url is None:
+        proc, url = start_server(args.port)
+    try:
+        results = asyncio.run(run_all(url, scenarios, levels, args.duration, args.warmup,
+                                      names, weights, args.timeout))
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+
+    report = {
+        "commit": git_commit(),
+        "model_version": load_bundle(MODEL_PATH)[1] if os.path.exists(MODEL_PATH) else None,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "url": url if args.url else "local uvicorn",
+        "mix": dict(zip(names, weights)),
+        "duration_s": args.duration,
+        "scenarios": results,
+    }
+    print_table(results, baseline)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"✅ 結果已寫入 {args.output}")
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
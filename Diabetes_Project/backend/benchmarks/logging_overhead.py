@@ -0,0 +1,63 @@
+"""
+比較 print 與佇列式結構化日誌在 request 執行緒上的成本
+
+    python -m benchmarks.logging_overhead --n 20000 --sink-delay-us 50
+
+stdout 換成一個每次 write 都會 sleep 的 sink，模擬 Cloud Run 上 stdout 被日誌代理
+拖慢的情況。print 的延遲會直接算進呼叫端；logger.info 只做 put_nowait，
+寫出的延遲由背景執行緒承擔。
+"""
+import argparse
+import json
+import time
+
+from log_config import get_logger, setup_logging, shutdown_logging
+from benchmarks.common import summarize, time_calls
+
+
+class SlowSink:
+    """每次 write 都延遲 delay 秒的假 stdout"""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.lines = 0
+
+    def write(self, text):
+        if self.delay:
+            time.sleep(self.delay)
+        self.lines += text.count("\n")
+        return len(text)
+
+    def flush(self):
+        pass
+
+
+def to_us(stats):
+    return {k.replace("_ms", "_us"): (v * 1000 if k.endswith("_ms") else v) for k, v in stats.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n", type=int, default=20000)
+    parser.add_argument("--sink-delay-us", type=float, default=50.0)
+    args = parser.parse_args()
+
+    sink = SlowSink(args.sink_delay_us / 1e6)
+    msg = "[Body Measures] 執行身高、體重、BMI 複雜邏輯填補..."
+
+    results = {}
+    results["print"] = to_us(summarize(time_calls(lambda: print(msg, file=sink, flush=True), args.n)))
+
+    setup_logging(stream=sink)
+    log = get_logger("bench")
+    results["logger_info_queued"] = to_us(summarize(time_calls(lambda: log.info(msg), args.n)))
+    # 預設等級 INFO 時，hot path 上的 debug 幾乎沒有成本
+    results["logger_debug_filtered"] = to_us(summarize(time_calls(lambda: log.debug(msg), args.n)))
+    shutdown_logging()
+
+    results["sink_lines_written"] = sink.lines
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
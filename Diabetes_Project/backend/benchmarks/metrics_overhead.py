@@ -0,0 +1,50 @@
+"""
+量測各階段計時本身的成本
+
+    python -m benchmarks.metrics_overhead --n 100000
+
+模擬一個 /predict 的 10 個 stage + finish + Server-Timing header，
+與實際 /predict 的總時間相比，應該只佔很小的比例。
+"""
+import argparse
+import json
+
+import main as backend
+from metrics import StageMetrics, StageTimer
+from benchmarks.common import COMPLETE_PROFILE, summarize, time_calls
+
+STAGES = ["nan_codes", "imputation", "drop_rename", "scaling", "encoding",
+          "predict_proba", "shap", "waterfall", "force_plot", "getjs"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n", type=int, default=100000, help="模擬幾個 request 的計時")
+    parser.add_argument("--predict-n", type=int, default=50, help="實際呼叫幾次 /predict 當對照")
+    args = parser.parse_args()
+
+    metrics = StageMetrics()
+
+    def instrumented_request():
+        timer = StageTimer()
+        for name in STAGES:
+            with timer.stage(name):
+                pass
+        timer.finish(metrics)
+        timer.server_timing()
+
+    overhead = summarize(time_calls(instrumented_request, args.n, warmup=100))
+
+    data = backend.InputData(**COMPLETE_PROFILE)
+    predict = summarize(time_calls(lambda: backend.predict(data), args.predict_n))
+
+    print(json.dumps({
+        "instrumentation_per_request_us": {k.replace("_ms", "_us"): (v * 1000 if k.endswith("_ms") else v)
+                                           for k, v in overhead.items()},
+        "predict": predict,
+        "overhead_fraction_of_p50": overhead["p50_ms"] / predict["p50_ms"],
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
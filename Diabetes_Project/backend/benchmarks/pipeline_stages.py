@@ -0,0 +1,183 @@
+"""
+predict() 每個階段單獨計時 (固定輸入，批次大小 1 / 32 / 1k / 100k)
+
+    python -m benchmarks.pipeline_stages -o stages_baseline.json
+    python -m benchmarks.pipeline_stages --compare stages_baseline.json --threshold 0.15
+
+階段：nan_codes (pipeline["nan_map"])、imputation (apply_imputation)、drop_rename、
+scaling (scaler.transform)、encoding (get_dummies + reindex)、predict_proba、
+shap (TreeExplainer)，以及 plots (waterfall PNG + force plot HTML，只對單筆量，
+/predict 每個 request 只畫一張)。
+每個階段的輸入事先準備好 (不計時)，所以各階段互不影響；每格取 --repeat 次中最快的一次
+(比中位數更不受其他 process 干擾)。
+--compare 時任一格比 baseline 慢超過 threshold (而且差距大於 --min-delta-ms) 就以 exit code 1 結束。
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import shap
+
+import main as backend
+from inference import DROP_COLS, apply_imputation, clean_nan_codes
+from benchmarks.common import PROFILES
+
+STAGES = ["nan_codes", "imputation", "drop_rename", "scaling", "encoding",
+          "predict_proba", "shap", "plots"]
+
+
+def fixed_batch(n):
+    """三種樣本依序重複成 n 列 (每次執行都一樣)"""
+    base = pd.DataFrame(list(PROFILES.values()), dtype=float)
+    return base.iloc[np.arange(n) % len(base)].reset_index(drop=True)
+
+
+def stage_functions(pipeline, explainer):
+    """每個階段要計時的函式 (輸入是上一階段的輸出)"""
+    def drop_rename(df):
+        df = df.drop(columns=DROP_COLS, errors="ignore")
+        return df.rename(columns=pipeline["rename_dict"])
+
+    def scaling(df):
+        cols = pipeline["minmax_cols"]
+        df[cols] = pipeline["scaler"].transform(df[cols])
+        return df
+
+    def encoding(df):
+        df = pd.get_dummies(df, columns=pipeline["onehot_cols"])
+        return df.reindex(columns=pipeline["final_columns"], fill_value=0)
+
+    def plots(df):
+        explanation = explainer(df.iloc[:1], check_additivity=False)[0]
+        fig = plt.figure(figsize=(8, 6))
+        shap.plots.waterfall(explanation, show=False, max_display=10)
+        png = backend.plot_to_base64(fig)
+        html = shap.plots.force(explanation, matplotlib=False).html()
+        return png, f"<head>{shap.getjs()}</head><body>{html}</body>"
+
+    return {
+        "nan_codes": lambda df: clean_nan_codes(df, pipeline),
+        "imputation": lambda df: apply_imputation(df, pipeline["imputer_stats"]),
+        "drop_rename": drop_rename,
+        "scaling": scaling,
+        "encoding": encoding,
+        "predict_proba": lambda X: pipeline["model"].predict_proba(X)[:, 1],
+        "shap": lambda X: explainer(X, check_additivity=False),
+        "plots": plots,
+    }
+
+
+def time_stage(fn, make_input, repeat):
+    """每次重新準備輸入 (不計時)，回傳最快一次的毫秒數"""
+    fn(make_input())  # 暖身
+    samples = []
+    for _ in range(repeat):
+        data = make_input()
+        t0 = time.perf_counter()
+        fn(data)
+        samples.append(time.perf_counter() - t0)
+    return float(min(samples) * 1000)
+
+
+def run(sizes, repeat, max_shap_rows):
+    fns = stage_functions(backend.pipeline, backend.explainer)
+    results = {}
+    for size in sizes:
+        # 先跑一遍整條 pipeline，留下每個階段的輸入
+        inputs = {}
+        data = fixed_batch(size)
+        for name in STAGES[:6]:
+            inputs[name] = data
+            data = fns[name](data.copy())
+        inputs["shap"] = inputs["plots"] = inputs["predict_proba"]
+
+        n_repeat = repeat if size <= 1000 else max(1, repeat // 5)
+        row = {}
+        for name in STAGES:
+            if name == "shap" and size > max_shap_rows:
+                row[name] = None
+                continue
+            if name == "plots" and size != 1:
+                continue
+            src = inputs[name]
+            row[name] = round(time_stage(fns[name], src.copy, n_repeat), 4)
+            print(f"  batch={size:<7} {name:<14} {row[name]:.3f} ms", file=sys.stderr)
+        results[str(size)] = row
+    return results
+
+
+def compare(current, baseline, threshold, min_delta_ms):
+    """回傳 [(batch, stage, baseline_ms, current_ms, ratio)]，只列出變慢超過門檻的"""
+    regressions = []
+    for size, row in current.items():
+        for stage, ms in row.items():
+            old = baseline.get(size, {}).get(stage)
+            if ms is None or not old:
+                continue
+            if ms > old * (1 + threshold) and ms - old > min_delta_ms:
+                regressions.append((size, stage, old, ms, ms / old))
+    return regressions
+
+
+def print_table(results, baseline=None):
+    sizes = list(results)
+    print(f"{'stage':<14}" + "".join(f"{'batch ' + s:>16}" for s in sizes))
+    for stage in STAGES:
+        line = f"{stage:<14}"
+        for s in sizes:
+            ms = results[s].get(stage)
+            cell = "-" if ms is None else f"{ms:.3f}"
+            old = (baseline or {}).get(s, {}).get(stage)
+            if ms is not None and old:
+                cell += f" ({(ms / old - 1) * 100:+.0f}%)"
+            line += f"{cell:>16}"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 32, 1000, 100000])
+    parser.add_argument("--repeat", type=int, default=25, help="每格量幾次 (1k 以上的批次減為 1/5)")
+    parser.add_argument("--max-shap-rows", type=int, default=100000, help="超過這個批次大小就不量 SHAP")
+    parser.add_argument("-o", "--output", help="結果寫成 baseline JSON")
+    parser.add_argument("--compare", help="與這個 baseline JSON 比較")
+    parser.add_argument("--threshold", type=float, default=0.15, help="變慢多少比例算退步 (0.15 = 15%)")
+    parser.add_argument("--min-delta-ms", type=float, default=0.05, help="差距小於這個毫秒數不算退步 (雜訊)")
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.repeat, args.max_shap_rows)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["stages_ms"]
+    print_table(results, baseline)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "model_version": backend.MODEL_VERSION,
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                "python": platform.python_version(),
+                "cpus": os.cpu_count(),
+                "repeat": args.repeat,
+                "stages_ms": results,
+            }, f, indent=2)
+        print(f"✅ baseline 已寫入 {args.output}")
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.threshold, args.min_delta_ms)
+        for size, stage, old, ms, ratio in regressions:
+            print(f"❌ batch={size} {stage}: {old:.3f} -> {ms:.3f} ms ({(ratio - 1) * 100:+.0f}%)")
+        if regressions:
+            sys.exit(1)
+        print(f"✅ 沒有超過 {args.threshold:.0%} 的退步")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+比較開啟 / 關閉預測稽核紀錄時 /predict 的延遲
+
+    python -m benchmarks.prediction_log --n 500
+
+開啟紀錄時 request 只多了一次 queue.put，p99 應該跟關閉時差不多；
+另外會確認背景執行緒最後有把所有紀錄寫進 SQLite。
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+import main as backend
+from prediction_log import PredictionLog
+from benchmarks.common import COMPLETE_PROFILE, summarize
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n", type=int, default=500, help="每種設定呼叫幾次 /predict")
+    parser.add_argument("--policy", default="drop", choices=["drop", "block"])
+    args = parser.parse_args()
+
+    data = backend.InputData(**COMPLETE_PROFILE)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        log = PredictionLog(os.path.join(tmp, "predictions.db"), policy=args.policy)
+        log.start()
+
+        # 開 / 關交錯呼叫，讓機器本身的雜訊平均落在兩邊
+        def call(enabled):
+            backend.prediction_log = log if enabled else None
+            backend.predict(data)
+
+        for _ in range(5):
+            call(True)
+        samples = {True: np.empty(args.n), False: np.empty(args.n)}
+        for i in range(args.n):
+            for enabled in (i % 2 == 0, i % 2 == 1):
+                t0 = time.perf_counter()
+                call(enabled)
+                samples[enabled][i] = time.perf_counter() - t0
+
+        log.stop()
+        backend.prediction_log = None
+        results = {
+            "log_disabled": summarize(samples[False]),
+            "log_enabled": summarize(samples[True]),
+            "log_stats": log.stats(),
+        }
+
+    off, on = results["log_disabled"], results["log_enabled"]
+    results["p99_delta_ms"] = on["p99_ms"] - off["p99_ms"]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+多個 backend instance 時，各自的記憶體快取 vs 共用快取 (Redis 協定) 的命中率與延遲
+
+    python -m benchmarks.result_cache --instances 2 --requests 400 --distinct 50
+
+會在背景啟動本機的 RESP 替身 (resp_server.py) 與 N 個 uvicorn instance，
+請求以 Zipf 分佈從 distinct 組輸入中抽樣，輪流送到各 instance (模擬 load balancer)。
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+import requests
+
+import resp_server
+from field_schema import FIELDS
+from benchmarks.common import COMPLETE_PROFILE, summarize
+
+ADMIN_TOKEN = "bench"
+
+
+def make_inputs(distinct, seed=0):
+    """在欄位規格範圍內隨機產生 distinct 組輸入"""
+    rng = np.random.default_rng(seed)
+    out = []
+    for _ in range(distinct):
+        p = dict(COMPLETE_PROFILE)
+        for f in FIELDS:
+            if f["type"] == "number" and "max" in f:
+                p[f["code"]] = round(float(rng.uniform(f["min"], f["max"])), 1)
+        p["BMXBMI"] = round(p["BMXWT"] / (p["BMXHT"] / 100) ** 2, 1)
+        out.append(p)
+    return out
+
+
+def start_instances(n, base_port, cache_spec):
+    # 共用快取時解釋圖也放在同一個服務，每個 instance 要用同一把簽章金鑰
+    env = dict(os.environ, RESULT_CACHE=cache_spec, ADMIN_TOKEN=ADMIN_TOKEN, ARTIFACT_SECRET=ADMIN_TOKEN,
+               DRIFT_MONITOR="0", LOG_LEVEL="WARNING")
+    procs = []
+    for i in range(n):
+        procs.append(subprocess.Popen(
+            [sys.executable, "-W", "ignore", "-m", "uvicorn", "main:app", "--port", str(base_port + i)],
+            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        ))
+    urls = [f"http://127.0.0.1:{base_port + i}" for i in range(n)]
+    deadline = time.time() + 120
+    for url in urls:
+        while True:
+            try:
+                requests.get(f"{url}/schema", timeout=1)
+                break
+            except requests.ConnectionError:
+                if time.time() > deadline:
+                    raise RuntimeError(f"{url} 沒有啟動")
+                time.sleep(0.5)
+    return procs, urls
+
+
+def run_mode(name, cache_spec, args, inputs, order):
+    procs, urls = start_instances(args.instances, args.base_port, cache_spec)
+    session = requests.Session()
+    latencies, hits = [], []
+    try:
+        for i, idx in enumerate(order):
+            url = urls[i % len(urls)]
+            t0 = time.perf_counter()
+            r = session.post(f"{url}/predict", json=inputs[idx])
+            latencies.append(time.perf_counter() - t0)
+            r.raise_for_status()
+            hits.append(r.headers.get("X-Cache") == "hit")
+        per_instance = [
+            session.get(f"{u}/admin/cache", headers={"X-Admin-Token": ADMIN_TOKEN}).json() for u in urls
+        ]
+    finally:
+        for p in procs:
+            p.terminate()
+        for p in procs:
+            p.wait()
+
+    latencies, hits = np.array(latencies), np.array(hits)
+    result = {
+        "hit_rate": round(float(hits.mean()), 3),
+        "all": summarize(latencies),
+        "hit": summarize(latencies[hits]) if hits.any() else None,
+        "miss": summarize(latencies[~hits]) if (~hits).any() else None,
+    }
+    if name == "memory":
+        # 每個 instance 各存一份
+        result["entries_total"] = sum(s.get("entries", 0) for s in per_instance)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--instances", type=int, default=2)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--distinct", type=int, default=50)
+    parser.add_argument("--zipf", type=float, default=1.2)
+    parser.add_argument("--base-port", type=int, default=8101)
+    parser.add_argument("--resp-port", type=int, default=6390)
+    args = parser.parse_args()
+
+    inputs = make_inputs(args.distinct)
+    rng = np.random.default_rng(1)
+    order = (rng.zipf(args.zipf, args.requests) - 1) % args.distinct
+
+    store = resp_server.start_in_thread(port=args.resp_port)
+    results = {
+        "memory": run_mode("memory", "memory", args, inputs, order),
+        "shared": run_mode("shared", f"redis://127.0.0.1:{args.resp_port}/0", args, inputs, order),
+    }
+    stored = [v for v, _ in store.data.values()]
+    results["shared"]["entries_total"] = len(stored)
+    results["shared"]["avg_compressed_kb"] = round(sum(map(len, stored)) / max(len(stored), 1) / 1024, 1)
+    results["workload"] = {"instances": args.instances, "requests": args.requests,
+                           "distinct_inputs_seen": int(len(set(order.tolist())))}
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
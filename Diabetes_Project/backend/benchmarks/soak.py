@@ -0,0 +1,105 @@
+"""
+Soak test：送出大量合成 request，確認記憶體不會一直往上爬
+
+    python -m benchmarks.soak --n 5000 --max-rss-growth-mb 50
+
+先送 --warmup 筆讓快取、matplotlib 字型等一次性配置完成，記下 RSS；
+之後每 --every 筆取樣一次。結束時 RSS 成長超過門檻、或還有沒關掉的
+matplotlib figure，就以 exit code 1 結束 (可以放進 CI)。
+
+artifact store 本來就會長到 ARTIFACT_MAX_MB (預設 64 MB，比門檻大)，所以 soak
+預設以 ARTIFACT_STORE=off 執行。自己指定 in-process 的 store 時它也算在 RSS
+成長裡 (被淘汰的 artifact 釋放後 allocator 不一定還給 OS，扣掉 bytes 也不準)，
+它的大小另外列在 artifact_mb。
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+
+from fastapi.testclient import TestClient
+
+import main as backend
+import diagnostics
+from benchmarks.common import PROFILES
+from field_schema import FIELDS
+
+BOUNDS = {f["code"]: (f.get("min", float("-inf")), f.get("max", float("inf"))) for f in FIELDS}
+
+
+def synthetic_request(rng):
+    """從三種樣本中挑一種，數值加上一點隨機擾動 (不超出欄位範圍)、隨機挖掉幾個欄位"""
+    profile = dict(rng.choice(list(PROFILES.values())))
+    for key, value in profile.items():
+        if key in ("RIDAGEYR", "RIAGENDR"):
+            continue
+        if value is not None and isinstance(value, float):
+            lo, hi = BOUNDS[key]
+            profile[key] = round(min(max(value * rng.uniform(0.9, 1.1), lo), hi), 1)
+        if rng.random() < 0.1:
+            profile[key] = None
+    return profile
+
+
+def artifact_bytes():
+    """in-process artifact store 目前存的 bytes (off 或共用的 RESP store 都是 0)"""
+    if backend.artifact_store is None:
+        return 0
+    return backend.artifact_store.stats().get("bytes", 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n", type=int, default=5000)
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--every", type=int, default=250)
+    parser.add_argument("--max-rss-growth-mb", type=float, default=50.0)
+    parser.add_argument("--max-figures", type=int, default=0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if "ARTIFACT_STORE" not in os.environ and backend.artifact_store is not None:
+        backend.artifact_store.close()
+        backend.artifact_store = None  # 沒有明確指定就當作 ARTIFACT_STORE=off
+
+    rng = random.Random(args.seed)
+    samples = []
+    with TestClient(backend.app) as client:
+        for _ in range(args.warmup):
+            client.post("/predict", json=synthetic_request(rng)).raise_for_status()
+        gc.collect()
+        base_rss = diagnostics.current_rss_bytes()
+
+        for i in range(1, args.n + 1):
+            client.post("/predict", json=synthetic_request(rng)).raise_for_status()
+            if i % args.every == 0 or i == args.n:
+                rss = diagnostics.current_rss_bytes()
+                samples.append({
+                    "requests": i,
+                    "rss_mb": round(rss / 2**20, 1),
+                    "growth_mb": round((rss - base_rss) / 2**20, 1),
+                    "figures": diagnostics.figure_count(),
+                    "artifact_mb": round(artifact_bytes() / 2**20, 1),
+                })
+                print(json.dumps(samples[-1]), file=sys.stderr)
+
+    gc.collect()
+    final_growth = (diagnostics.current_rss_bytes() - base_rss) / 2**20
+    figures = diagnostics.figure_count()
+    ok = final_growth <= args.max_rss_growth_mb and figures <= args.max_figures
+    print(json.dumps({
+        "ok": ok,
+        "requests": args.n,
+        "base_rss_mb": round(base_rss / 2**20, 1),
+        "rss_growth_mb": round(final_growth, 1),
+        "figures_open": figures,
+        "artifact_store": type(backend.artifact_store).__name__ if backend.artifact_store is not None else "off",
+        "samples": samples,
+    }, indent=2))
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+量測整批輸入驗證的成本 (編譯後的 NumPy 檢查 vs 逐列逐欄的 Python 迴圈)
+
+    python -m benchmarks.validation --sizes 1 1000 100000
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from field_schema import FIELDS, compile_schema
+from benchmarks.common import PROFILES
+
+
+def make_batch(n, bad_fraction=0.01, seed=0):
+    """由三種樣本組成 n 列，並隨機把 bad_fraction 的格子改成超出範圍的值"""
+    schema = compile_schema()
+    base = np.array([[np.nan if p.get(c) is None else p[c] for c in schema.codes]
+                     for p in PROFILES.values()], dtype=float)
+    rng = np.random.default_rng(seed)
+    X = base[rng.integers(0, len(base), n)]
+    bad = rng.random(X.shape) < bad_fraction
+    X[bad] = 1e6
+    return X
+
+
+def loop_validate(X):
+    """對照組：逐列逐欄檢查"""
+    errors = []
+    for r, row in enumerate(X):
+        for field, v in zip(FIELDS, row):
+            if np.isnan(v):
+                if field.get("required"):
+                    errors.append((r, field["code"], "missing"))
+                continue
+            if v in field.get("missing_codes", ()):
+                continue
+            if field["type"] == "category":
+                if v not in field["categories"]:
+                    errors.append((r, field["code"], "not_allowed"))
+            elif v < field.get("min", -np.inf):
+                errors.append((r, field["code"], "below_min"))
+            elif v > field.get("max", np.inf):
+                errors.append((r, field["code"], "above_max"))
+    return errors
+
+
+def best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 1000, 100000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    schema = compile_schema()
+    results = {}
+    for n in args.sizes:
+        X = make_batch(n)
+        row_ok, _ = schema.validate(X, max_errors=10**9)
+        vec = best_of(lambda: schema.validate(X), args.repeat)
+        loop = best_of(lambda: loop_validate(X), max(1, args.repeat // 2))
+        results[n] = {
+            "invalid_rows": int((~row_ok).sum()),
+            "numpy_ms": round(vec * 1000, 3),
+            "loop_ms": round(loop * 1000, 3),
+            "numpy_rows_per_s": round(n / vec),
+            "speedup": round(loop / vec, 1),
+        }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+"""
+大量 CSV 評分 (合作診所上傳的 NHANES 代碼 CSV，可能有幾十萬列)
+
+上傳的內容一邊收一邊交給 pd.read_csv(chunksize=...) (UploadPipe)，不等整個檔案傳完；每一塊：
+    1. 轉成數字 (解析失敗的格子記為 not_numeric)；原始 NHANES 欄位 (三次血壓、SLD012 / SLD010H)
+       與 batch_score.py 一樣先經過 inference.derive_from_raw，睡眠欄位留給 transform 併成 Sleep_Hours
+    2. 用欄位規格 (field_schema) 整批檢查，不合法的列回報錯誤、不進模型
+    3. 合法的列走 inference.transform + predict_proba (整塊向量化)，也送進漂移監控 (有傳 monitor 時)
+    4. explain 不是 none 時，另外附上每列的前 3 名特徵 (explain.contributions)
+結果一塊一塊產生 (NDJSON 或 CSV)，記憶體只跟 chunksize 有關，與檔案大小無關。
+"""
+import asyncio
+import io
+import json
+import logging
+import time
+
+import anyio
+import numpy as np
+import pandas as pd
+from starlette.requests import ClientDisconnect
+from starlette.responses import StreamingResponse
+
+from explain import DEFAULT_TREES, contributions, top_features
+from inference import DROP_COLS, RAW_SLEEP_COLS, clean_nan_codes, derive_from_raw, predict_proba, transform
+
+log = logging.getLogger("healthshield.bulk_scoring")
+
+FORMATS = ("ndjson", "csv")
+MAX_CHUNKSIZE = 50000
+PIPE_PARTS = 16  # UploadPipe 最多先收幾塊 (uvicorn 一塊最多 64 KB)，parser 跟不上時上傳就會等
+
+
+class UploadAborted(Exception):
+    """上傳沒有收完 (用戶端斷線)：不用再輸出任何東西"""
+
+
+class UploadPipe(io.RawIOBase):
+    """
+    request body -> pd.read_csv 的檔案物件
+    event loop 那邊 await put(part) (佇列有上限)，parser 在 worker thread 裡 read，沒資料時等
+    """
+
+    def __init__(self, loop=None, max_parts=PIPE_PARTS):
+        self._loop = loop or asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=max_parts)
+        self._buffer = memoryview(b"")
+        self._eof = False
+        self._error = None
+
+    async def put(self, part):
+        await self._queue.put(bytes(part))
+
+    async def finish(self):
+        await self._queue.put(None)
+
+    def abort(self, error):
+        """上傳中斷：parser 下一次讀取時丟出 error (佇列滿的時候 parser 沒在等，讀完手上的就會看到)"""
+        self._error = error
+        try:
+            self._queue.put_nowait(None)
+        except asyncio.QueueFull:
+            pass
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while not self._buffer:
+            if self._error is not None:
+                raise self._error
+            if self._eof:
+                return 0
+            part = asyncio.run_coroutine_threadsafe(self._queue.get(), self._loop).result()
+            if part is None:
+                self._eof = self._error is None
+            else:
+                self._buffer = memoryview(part)
+        n = min(len(b), len(self._buffer))
+        b[:n] = self._buffer[:n]
+        self._buffer = self._buffer[n:]
+        return n
+
+
+class UploadStreamingResponse(StreamingResponse):
+    """
+    上傳還沒收完就開始回傳結果：body 一邊讀 request 一邊 put 進 UploadPipe
+    (StreamingResponse 原本另外 listen_for_disconnect，會跟這裡搶 request body；這裡等 body 收完才開始聽)
+    """
+
+    def __init__(self, content, request, pipe, **kwargs):
+        super().__init__(content, **kwargs)
+        self.request = request
+        self.pipe = pipe
+
+    async def __call__(self, scope, receive, send):
+        async with anyio.create_task_group() as task_group:
+
+            async def feed():
+                try:
+                    async for part in self.request.stream():
+                        if part:
+                            await self.pipe.put(part)
+                    await self.pipe.finish()
+                    await self.listen_for_disconnect(receive)
+                except ClientDisconnect:
+                    self.pipe.abort(UploadAborted("client disconnected during upload"))
+                task_group.cancel_scope.cancel()  # 用戶端斷線：不用再算了
+
+            task_group.start_soon(feed)
+            try:
+                await self.stream_response(send)
+            finally:
+                self.pipe.abort(UploadAborted("response finished"))  # parser 還在等資料的話叫醒它
+            task_group.cancel_scope.cancel()
+
+
+def score_chunk(chunk, pipeline, model, schema, id_column=None, row_offset=0,
+                explain="none", n_trees=DEFAULT_TREES, top_k=3, monitor=None):
+    """
+    評分一塊資料
+    回傳 (scored, errors)：
+        scored  DataFrame [row, (id), probability, (top_features)]，只含合法的列
+        errors  {row: [錯誤, ...]}，row 是整個檔案中的列號 (從 0 開始，不含標題列)
+    """
+    raw = chunk.reindex(columns=schema.codes)
+    # 原始 NHANES 欄位 (三次血壓 -> systolic_avg / diastolic_avg；睡眠留給 transform)，同 batch_score.py
+    present = [c for c in schema.codes + DROP_COLS if c in chunk.columns]
+    numeric = chunk[present].apply(pd.to_numeric, errors="coerce")
+    not_numeric = raw.notna().to_numpy() & numeric.reindex(columns=schema.codes).isna().to_numpy()
+    numeric = derive_from_raw(numeric)
+    X = numeric.reindex(columns=schema.codes).to_numpy(dtype=float)
+    sleep = numeric.reindex(columns=[c for c in RAW_SLEEP_COLS if c in numeric.columns])
+
+    row_ok, error_list = schema.validate(X, max_errors=X.size, not_numeric=not_numeric)
+    rows = np.arange(row_offset, row_offset + len(chunk))
+
+    errors = {}
+    for e in error_list:
+        row = int(rows[e.pop("row")])
+        errors.setdefault(row, []).append(e)
+
+    scored = pd.DataFrame({"row": rows[row_ok]})
+    if id_column and id_column in chunk.columns:
+        scored["id"] = chunk[id_column].to_numpy()[row_ok]
+    if row_ok.any():
+        frame = pd.DataFrame(X[row_ok], columns=schema.codes)
+        for col in sleep.columns:
+            frame[col] = sleep[col].to_numpy()[row_ok]
+        if monitor is not None:
+            monitor.update_frame(monitored_inputs(frame, pipeline))
+        features = transform(frame, pipeline)
+        scored["probability"] = predict_proba(model, features)
+        if explain != "none":
+            values, _ = contributions(model, features, explain, n_trees)
+            scored["top_features"] = top_features(values, list(features.columns), top_k)
+    else:
+        scored["probability"] = pd.Series(dtype=float)
+        if explain != "none":
+            scored["top_features"] = pd.Series(dtype=object)
+    return scored, errors
+
+
+def monitored_inputs(frame, pipeline):
+    """漂移監控看的欄位：特殊代碼轉成 NaN，原始睡眠欄位併進 Sleep_Hours (同 apply_imputation)"""
+    df = clean_nan_codes(frame.copy(), pipeline)
+    for col in RAW_SLEEP_COLS:
+        if col in df.columns:
+            df["Sleep_Hours"] = df["Sleep_Hours"].combine_first(df[col])
+    return df
+
+
+def _error_rows(errors, chunk, id_column, row_offset):
+    ids = chunk[id_column].to_numpy() if id_column and id_column in chunk.columns else None
+    for row, errs in errors.items():
+        item = {"row": row}
+        if ids is not None:
+            value = ids[row - row_offset]
+            item["id"] = value.item() if hasattr(value, "item") else value
+        item["errors"] = errs
+        yield item
+
+
+def stream_results(fileobj, pipeline, model, schema, fmt="ndjson", chunksize=5000,
+                   id_column="SEQN", model_version=None, explain="none", n_trees=DEFAULT_TREES, monitor=None):
+    """
+    逐塊產生輸出 (bytes)
+        ndjson：每列一行結果 / 錯誤，每塊之後一行 {"progress": ...}，最後一行 {"summary": ...}
+        csv   ：row, id, probability, (top_features,) errors
+                (錯誤寫成 "欄位:種類;..."，前幾名特徵寫成 "特徵:貢獻;..."，進度只寫進日誌)
+                中途讀檔失敗時最後一列的 row 是 "error"，errors 是錯誤訊息 (前面的結果不完整)
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"未知的格式: {fmt} (可用: {FORMATS})")
+    chunksize = max(1, min(int(chunksize), MAX_CHUNKSIZE))
+    progress = {"chunks": 0, "rows_read": 0, "rows_scored": 0, "rows_failed": 0}
+    started = time.perf_counter()
+    columns = None  # 已經寫出的 CSV 欄位 (None = 還沒寫標題列)
+
+    try:
+        reader = pd.read_csv(fileobj, chunksize=chunksize)
+        for chunk in reader:
+            offset = progress["rows_read"]
+            scored, errors = score_chunk(chunk, pipeline, model, schema, id_column, offset,
+                                         explain, n_trees, monitor=monitor)
+            progress["chunks"] += 1
+            progress["rows_read"] += len(chunk)
+            progress["rows_scored"] += len(scored)
+            progress["rows_failed"] += len(errors)
+            progress["elapsed_sec"] = round(time.perf_counter() - started, 3)
+
+            if fmt == "ndjson":
+                if len(scored):
+                    yield scored.to_json(orient="records", lines=True).encode("utf-8").rstrip(b"\n") + b"\n"
+                for item in _error_rows(errors, chunk, id_column, offset):
+                    yield (json.dumps(item) + "\n").encode("utf-8")
+                yield (json.dumps({"progress": progress}) + "\n").encode("utf-8")
+            else:
+                out = scored.copy()
+                if "top_features" in out.columns:
+                    out["top_features"] = [";".join(f"{t['feature']}:{t['shap']:.4f}" for t in tops)
+                                           for tops in out["top_features"]]
+                out["errors"] = ""
+                failed = pd.DataFrame(list(_error_rows(errors, chunk, id_column, offset)))
+                if len(failed):
+                    failed["errors"] = [";".join(f"{e['field']}:{e['error']}" for e in errs)
+                                        for errs in failed["errors"]]
+                    out = pd.concat([out, failed], ignore_index=True).sort_values("row")
+                yield out.to_csv(index=False, header=columns is None).encode("utf-8")
+                columns = columns or list(out.columns)
+            log.info("Bulk scoring progress", extra=dict(progress))
+    except pd.errors.EmptyDataError:
+        pass
+    except UploadAborted as e:
+        log.warning("Bulk scoring stopped: %s", e)
+        return
+    except Exception as e:
+        # 已經開始串流，只能在輸出裡回報 (parse 錯誤以外的例外也一樣，不讓連線直接斷掉)
+        if isinstance(e, (pd.errors.ParserError, UnicodeDecodeError)):
+            log.warning("Bulk scoring stopped: %s", e)
+            message = f"CSV parse error after {progress['rows_read']} rows: {e}"
+        else:
+            log.exception("Bulk scoring failed")
+            message = f"Scoring failed after {progress['rows_read']} rows: {type(e).__name__}: {e}"
+        if fmt == "ndjson":
+            yield (json.dumps({"error": message, "progress": progress}) + "\n").encode("utf-8")
+        else:
+            # 狀態碼已經送出 (200)，用最後一列標記檔案被截斷，不讓它看起來像完整的結果
+            marker = pd.DataFrame([{"row": "error", "errors": message}])
+            marker = marker.reindex(columns=columns or ["row", "errors"])
+            yield marker.to_csv(index=False, header=columns is None).encode("utf-8")
+        return
+
+    if fmt == "ndjson":
+        summary = dict(progress, model_version=model_version, explain=explain)
+        yield (json.dumps({"summary": summary}) + "\n").encode("utf-8")
@@ -0,0 +1,112 @@
+"""
+記憶體診斷 (opt-in)
+
+每個 request 都會建立 matplotlib figure、BytesIO、shap Explanation 與單列 DataFrame，
+長時間執行的 instance 常駐記憶體 (RSS) 若慢慢上升，用這裡的資訊找原因：
+    - 目前 RSS 與存活的 matplotlib figure 數量 (隨時可用，成本很低)
+    - tracemalloc：與基準 snapshot 的差異、目前配置最多的程式位置
+      (有額外成本，只有設定 DIAGNOSTICS=1 才啟動)
+"""
+import gc
+import os
+import threading
+import tracemalloc
+
+import matplotlib.pyplot as plt
+
+_baseline = None
+_lock = threading.Lock()
+
+
+def enabled():
+    return tracemalloc.is_tracing()
+
+
+def start_from_env():
+    """DIAGNOSTICS=1 時啟動 tracemalloc 並記錄基準 snapshot"""
+    if os.getenv("DIAGNOSTICS", "0") != "1":
+        return False
+    tracemalloc.start(int(os.getenv("DIAGNOSTICS_FRAMES", "10")))
+    reset_baseline()
+    return True
+
+
+def reset_baseline():
+    global _baseline
+    if not enabled():
+        return
+    with _lock:
+        _baseline = tracemalloc.take_snapshot()
+
+
+def current_rss_bytes():
+    """目前的常駐記憶體 (Linux 讀 /proc，其他平台退回 ru_maxrss 峰值)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def figure_count():
+    """還沒 plt.close 的 figure 數量；正常情況每個 request 結束後應為 0"""
+    return len(plt.get_fignums())
+
+
+def live_object_counts(type_names=("Figure", "BytesIO", "Explanation", "DataFrame")):
+    """掃描 gc 追蹤的物件，依型別名稱計數 (很慢，只在診斷時使用)"""
+    counts = dict.fromkeys(type_names, 0)
+    for obj in gc.get_objects():
+        name = type(obj).__name__
+        if name in counts:
+            counts[name] += 1
+    return counts
+
+
+def _format_stat(stat):
+    frame = stat.traceback[0]
+    return {
+        "location": f"{frame.filename}:{frame.lineno}",
+        "size_kb": round(stat.size / 1024, 1),
+        "count": stat.count,
+    }
+
+
+def _format_diff(stat):
+    frame = stat.traceback[0]
+    return {
+        "location": f"{frame.filename}:{frame.lineno}",
+        "size_diff_kb": round(stat.size_diff / 1024, 1),
+        "count_diff": stat.count_diff,
+        "size_kb": round(stat.size / 1024, 1),
+    }
+
+
+def report(top=15, objects=False):
+    """組出 /admin/memory 的內容"""
+    out = {
+        "rss_mb": round(current_rss_bytes() / 2**20, 1),
+        "matplotlib_figures": figure_count(),
+        "gc_counts": gc.get_count(),
+        "tracemalloc": enabled(),
+    }
+    if objects:
+        out["live_objects"] = live_object_counts()
+    if not enabled():
+        return out
+
+    snapshot = tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    ))
+    current, peak = tracemalloc.get_traced_memory()
+    out["traced_mb"] = round(current / 2**20, 1)
+    out["traced_peak_mb"] = round(peak / 2**20, 1)
+    out["top_allocations"] = [_format_stat(s) for s in snapshot.statistics("lineno")[:top]]
+    with _lock:
+        baseline = _baseline
+    if baseline is not None:
+        diff = snapshot.compare_to(baseline, "lineno")
+        out["growth_since_baseline"] = [_format_diff(s) for s in diff[:top] if s.size_diff > 0]
+    return out
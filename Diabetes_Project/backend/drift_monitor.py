@@ -0,0 +1,402 @@
+"""
+輸入漂移監控 (Input Drift Monitor)
+
+後端用 2007–2018 NHANES 算出的 imputer_stats 填補缺值，但看不到線上的輸入
+是不是還像當初的族群、使用者有多常回答「I don't know」。
+
+這裡對每個特徵維護固定記憶體的 streaming sketch：
+    數值欄位：以訓練資料分位數為邊界的直方圖 (可相加合併，可估計分位數)
+    類別欄位：各代碼的次數 (代碼種類有上限)
+    兩者都記錄缺值率
+並和 reference profile 比較，算出 PSI 與 KS 類型的漂移分數。
+
+reference profile 是獨立的 JSON 檔 (REFERENCE_PATH，DRIFT_REFERENCE 可改路徑)，不寫進模型參數包；
+也可以直接執行，從合併後的 NHANES CSV 重新建立：
+    python drift_monitor.py ../../ALL_NHANES_MERGED_20072018.csv
+    python drift_monitor.py benchmarks/golden_nhanes.csv --case sample   # 隨附的檔案就是這樣建的
+"""
+import argparse
+import json
+import logging
+import math
+import os
+import threading
+from bisect import bisect_right
+
+import numpy as np
+
+# 監控的欄位 (NHANES 代碼，與 InputData 相同)
+NUMERIC_FEATURES = [
+    "RIDAGEYR", "BMXHT", "BMXWT", "BMXBMI", "BMXWAIST",
+    "systolic_avg", "diastolic_avg",
+    "LBXGLU", "LBXIN", "LBXGH", "LBXTC", "LBDHDD", "LBDLDL", "LBXTR",
+    "ALQ130", "Sleep_Hours",
+]
+CATEGORICAL_FEATURES = ["RIAGENDR", "SMQ020", "PAQ665", "PAQ650", "MCQ300C", "HUQ010"]
+
+N_BINS = 10
+
+# 隨附的 reference profile：benchmarks/golden_nhanes.csv 裡 500 列測試集 (各 cycle 都有)；
+# 有完整訓練資料時用上面的指令重建，bin 會更細緻、分數的雜訊更小
+REFERENCE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "drift_reference.json")
+
+log = logging.getLogger("healthshield.drift_monitor")
+MAX_CATEGORIES = 16
+_EPS = 1e-4  # PSI 裡避免 log(0)
+
+
+def _label(value):
+    """類別代碼轉成文字 (2.0 -> "2")"""
+    if isinstance(value, str):
+        return value
+    return str(int(value)) if float(value).is_integer() else str(value)
+
+
+def _is_missing(value, codes):
+    return value is None or value != value or value in codes  # value != value 代表 NaN
+
+
+# ---------------------------------------------------------
+# Sketches
+# ---------------------------------------------------------
+class HistogramSketch:
+    """
+    固定邊界的直方圖；counts[0] 是下溢、counts[-1] 是上溢
+    bin 的切法與 np.histogram 相同 (reference 用它算)：最後一個 bin 包含上邊界，
+    剛好等於 edges[-1] 的值 (例如 NHANES 年齡上限 80) 算在最後一個 bin，不是上溢
+    """
+
+    def __init__(self, edges):
+        self.edges = [float(e) for e in edges]
+        self.counts = [0] * (len(self.edges) + 1)
+        self.missing = 0
+        self.n = 0  # 含缺值的總筆數
+
+    def update(self, value):
+        self.n += 1
+        if value is None or value != value:
+            self.missing += 1
+            return
+        i = bisect_right(self.edges, value)
+        if i == len(self.edges) and value == self.edges[-1]:
+            i -= 1
+        self.counts[i] += 1
+
+    def update_array(self, values):
+        values = np.asarray(values, dtype=float)
+        mask = np.isnan(values)
+        self.n += int(values.size)
+        self.missing += int(mask.sum())
+        observed = values[~mask]
+        idx = np.searchsorted(self.edges, observed, side="right")
+        idx[observed == self.edges[-1]] = len(self.edges) - 1
+        for i, c in zip(*np.unique(idx, return_counts=True)):
+            self.counts[int(i)] += int(c)
+
+    def merge(self, other):
+        if other.edges != self.edges:
+            raise ValueError("只能合併相同邊界的 sketch")
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.missing += other.missing
+        self.n += other.n
+
+    def observed(self):
+        return self.n - self.missing
+
+    def probs(self):
+        total = self.observed()
+        return [c / total for c in self.counts] if total else [0.0] * len(self.counts)
+
+    def quantile(self, q):
+        """在 bin 內線性內插估計分位數 (上下溢 bin 直接回傳邊界)"""
+        total = self.observed()
+        if not total:
+            return None
+        target = q * total
+        cum = 0
+        for i, c in enumerate(self.counts):
+            if c and cum + c >= target:
+                if i == 0:
+                    return self.edges[0]
+                if i == len(self.counts) - 1:
+                    return self.edges[-1]
+                lo, hi = self.edges[i - 1], self.edges[i]
+                return lo + (hi - lo) * (target - cum) / c
+            cum += c
+        return self.edges[-1]
+
+
+class CategorySketch:
+    """類別代碼計數；超過 MAX_CATEGORIES 種的代碼歸到 "other" """
+
+    def __init__(self, max_categories=MAX_CATEGORIES):
+        self.max_categories = max_categories
+        self.counts = {}
+        self.missing = 0
+        self.n = 0
+
+    def update(self, value):
+        # 計數時直接用原始數值當 key，轉成文字標籤留到報表時才做
+        self.n += 1
+        if value is None or value != value:
+            self.missing += 1
+            return
+        counts = self.counts
+        if value not in counts and len(counts) >= self.max_categories:
+            value = "other"
+        counts[value] = counts.get(value, 0) + 1
+
+    def update_array(self, values):
+        for v in values:
+            self.update(None if v is None or v != v else float(v))
+
+    def merge(self, other):
+        for k, c in other.counts.items():
+            self.counts[k] = self.counts.get(k, 0) + c
+        self.missing += other.missing
+        self.n += other.n
+
+    def observed(self):
+        return self.n - self.missing
+
+    def freqs(self):
+        total = self.observed()
+        if not total:
+            return {}
+        out = {}
+        for k, c in self.counts.items():
+            label = _label(k)
+            out[label] = out.get(label, 0.0) + c / total
+        return out
+
+
+# ---------------------------------------------------------
+# 漂移分數
+# ---------------------------------------------------------
+def psi(expected, actual):
+    """Population Stability Index：< 0.1 穩定，0.1–0.25 輕微，> 0.25 明顯漂移"""
+    total = 0.0
+    for e, a in zip(expected, actual):
+        e, a = max(e, _EPS), max(a, _EPS)
+        total += (a - e) * math.log(a / e)
+    return total
+
+
+def ks_from_bins(expected, actual):
+    """用 bin 的累積分佈近似 KS 統計量 (兩個 CDF 的最大差距)"""
+    ce = np.cumsum(expected)
+    ca = np.cumsum(actual)
+    return float(np.max(np.abs(ce - ca)))
+
+
+# ---------------------------------------------------------
+# Monitor
+# ---------------------------------------------------------
+class DriftMonitor:
+    """
+    每個 request 呼叫 update(input_dict)；批次用 update_frame(df)
+    reference 格式 (由 build_reference_profile 產生)：
+        {"numeric": {col: {"edges": [...], "probs": [...], "missing_rate": x}},
+         "categorical": {col: {"freqs": {code: p}, "missing_rate": x}}}
+    """
+
+    def __init__(self, reference=None, fallback_edges=None, missing_codes=None):
+        self.reference = reference or {}
+        self.missing_codes = missing_codes or {}
+        self._lock = threading.Lock()
+
+        ref_num = self.reference.get("numeric", {})
+        fallback_edges = fallback_edges or {}
+        self.numeric = {}
+        for col in NUMERIC_FEATURES:
+            if col in ref_num:
+                edges = ref_num[col]["edges"]
+            elif col in fallback_edges:
+                edges = fallback_edges[col]
+            else:
+                continue
+            self.numeric[col] = HistogramSketch(edges)
+        self.categorical = {col: CategorySketch() for col in CATEGORICAL_FEATURES}
+
+    @classmethod
+    def from_pipeline(cls, pipeline, reference=None):
+        """
+        從參數包建立：有 reference (load_reference()，或舊參數包裡的 reference_profile) 就能算漂移分數；
+        沒有的話用 MinMaxScaler 的 data_min_/data_max_ 切等寬 bin，只回報線上統計
+        """
+        inv_rename = {v: k for k, v in pipeline["rename_dict"].items()}
+        scaler = pipeline["scaler"]
+        fallback = {}
+        for name, lo, hi in zip(scaler.feature_names_in_, scaler.data_min_, scaler.data_max_):
+            code = inv_rename.get(name, name)
+            if hi > lo:
+                fallback[code] = np.linspace(lo, hi, N_BINS + 1).tolist()
+
+        from inference import nan_codes
+
+        reference = reference or pipeline.get("reference_profile")
+        return cls(reference, fallback, nan_codes(pipeline))
+
+    # ---------- Hot path ----------
+    def update(self, record):
+        """單筆更新 (純 Python + bisect，每筆只要幾微秒)"""
+        codes = self.missing_codes
+        with self._lock:
+            for col, sketch in self.numeric.items():
+                v = record.get(col)
+                sketch.update(None if _is_missing(v, codes.get(col, ())) else v)
+            for col, sketch in self.categorical.items():
+                v = record.get(col)
+                sketch.update(None if _is_missing(v, codes.get(col, ())) else v)
+
+    def update_frame(self, df):
+        """批次更新 (df 的特殊代碼應已轉成 NaN)"""
+        with self._lock:
+            for col, sketch in self.numeric.items():
+                if col in df.columns:
+                    sketch.update_array(df[col].to_numpy(dtype=float))
+            for col, sketch in self.categorical.items():
+                if col in df.columns:
+                    sketch.update_array(df[col].to_numpy(dtype=float))
+
+    def merge(self, other):
+        """合併另一個 monitor (例如其他 instance 匯出的)"""
+        with self._lock:
+            for col, sketch in other.numeric.items():
+                if col in self.numeric:
+                    self.numeric[col].merge(sketch)
+            for col, sketch in other.categorical.items():
+                self.categorical[col].merge(sketch)
+
+    # ---------- 報表 ----------
+    def report(self):
+        ref_num = self.reference.get("numeric", {})
+        ref_cat = self.reference.get("categorical", {})
+        out = {"has_reference": bool(self.reference), "numeric": {}, "categorical": {}}
+
+        with self._lock:
+            for col, sketch in self.numeric.items():
+                n = sketch.n
+                entry = {
+                    "n": n,
+                    "missing_rate": sketch.missing / n if n else None,
+                    "p10": sketch.quantile(0.10),
+                    "p50": sketch.quantile(0.50),
+                    "p90": sketch.quantile(0.90),
+                }
+                ref = ref_num.get(col)
+                if ref and sketch.observed():
+                    # reference 只有 bin 內的機率，上下溢 bin 視為 0
+                    expected = [0.0] + list(ref["probs"]) + [0.0]
+                    actual = sketch.probs()
+                    entry["psi"] = psi(expected, actual)
+                    entry["ks"] = ks_from_bins(expected, actual)
+                    entry["ref_missing_rate"] = ref.get("missing_rate")
+                out["numeric"][col] = entry
+
+            for col, sketch in self.categorical.items():
+                n = sketch.n
+                freqs = sketch.freqs()
+                entry = {"n": n, "missing_rate": sketch.missing / n if n else None, "freqs": freqs}
+                ref = ref_cat.get(col)
+                if ref and freqs:
+                    keys = sorted(set(ref["freqs"]) | set(freqs))
+                    entry["psi"] = psi([ref["freqs"].get(k, 0.0) for k in keys],
+                                       [freqs.get(k, 0.0) for k in keys])
+                    entry["ref_missing_rate"] = ref.get("missing_rate")
+                out["categorical"][col] = entry
+        return out
+
+
+# ---------------------------------------------------------
+# 建立 reference profile (離線)
+# ---------------------------------------------------------
+def build_reference_profile(df, n_bins=N_BINS):
+    """
+    df：已清洗特殊代碼、欄位為 NHANES 代碼 (含 systolic_avg / diastolic_avg / Sleep_Hours)
+    數值欄位用分位數當 bin 邊界，讓每個 bin 的 reference 機率大致相同
+    """
+    profile = {"numeric": {}, "categorical": {}}
+    for col in NUMERIC_FEATURES:
+        if col not in df.columns:
+            continue
+        values = df[col].to_numpy(dtype=float)
+        observed = values[~np.isnan(values)]
+        if observed.size == 0:
+            continue
+        edges = np.unique(np.quantile(observed, np.linspace(0, 1, n_bins + 1)))
+        counts = np.histogram(observed, bins=edges)[0]
+        profile["numeric"][col] = {
+            "edges": edges.tolist(),
+            "probs": (counts / counts.sum()).tolist(),
+            "missing_rate": float(np.isnan(values).mean()),
+        }
+
+    for col in CATEGORICAL_FEATURES:
+        if col not in df.columns:
+            continue
+        sketch = CategorySketch()
+        sketch.update_array(df[col].to_numpy(dtype=float))
+        profile["categorical"][col] = {
+            "freqs": sketch.freqs(),
+            "missing_rate": sketch.missing / sketch.n if sketch.n else 0.0,
+        }
+    return profile
+
+
+def load_reference(path=None):
+    """讀 reference profile (預設 DRIFT_REFERENCE 或 REFERENCE_PATH)；沒有檔案回傳 None"""
+    path = path or os.getenv("DRIFT_REFERENCE") or REFERENCE_PATH
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        log.warning("⚠️ 找不到 drift reference profile (%s)，/admin/drift 只回報線上統計", path)
+        return None
+
+
+def _load_training_inputs(csv_path, pipeline, case=None):
+    """讀合併後的 NHANES CSV，轉成和 InputData 相同的欄位"""
+    import pandas as pd
+
+    from inference import RAW_SLEEP_COLS
+
+    df = pd.read_csv(csv_path, low_memory=False)
+    if case is not None:
+        df = df[df["case"] == case]
+    df = df.apply(pd.to_numeric, errors="coerce")
+    for group, cols in pipeline["nan_map"].items():
+        vals = pipeline["nan_values"][group]
+        for c in cols:
+            if c in df.columns:
+                df[c] = df[c].replace(vals, np.nan)
+
+    sys_cols = [c for c in ["BPXSY1", "BPXSY2", "BPXSY3"] if c in df.columns]
+    dia_cols = [c for c in ["BPXDI1", "BPXDI2", "BPXDI3"] if c in df.columns]
+    df["systolic_avg"] = df[sys_cols].mean(axis=1)
+    df["diastolic_avg"] = df[dia_cols].mean(axis=1)
+    # 與 inference.apply_imputation 相同：SLD012 (2015 之後) 沒有值就用 SLD010H
+    sleep = pd.Series(np.nan, index=df.index)
+    for col in RAW_SLEEP_COLS:
+        if col in df.columns:
+            sleep = sleep.combine_first(df[col])
+    df["Sleep_Hours"] = sleep
+    return df
+
+
+if __name__ == "__main__":
+    import joblib
+
+    parser = argparse.ArgumentParser(description="建立 reference profile (JSON，不改模型參數包)")
+    parser.add_argument("csv", help="ALL_NHANES_MERGED_20072018.csv (或同格式的樣本)")
+    parser.add_argument("--bundle", default="nhanes_pipeline_XGBoost.pkl", help="讀特殊代碼的對照表用")
+    parser.add_argument("--case", help="只用 case 欄位等於這個值的列 (golden_nhanes.csv 用 sample)")
+    parser.add_argument("--out", default=REFERENCE_PATH)
+    args = parser.parse_args()
+
+    bundle = joblib.load(args.bundle)
+    profile = build_reference_profile(_load_training_inputs(args.csv, bundle, args.case))
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(profile, f, indent=1)
+        f.write("\n")
+    print(f"✅ reference profile 已寫入 {args.out}")
@@ -0,0 +1,75 @@
+"""
+特徵貢獻 (explanation) 的計算模式
+
+每個 request 可以選擇要多精確的解釋 (explain 參數)：
+    exact   TreeSHAP (XGBoost pred_contribs，與 shap.TreeExplainer 的值相同)
+    approx  路徑式近似 (Saabas，pred_contribs + approx_contribs)，只走一次每棵樹的決策路徑
+    trees   只用前 n_trees 棵樹算 TreeSHAP (iteration_range)
+    none    不算
+都在 transform 之後的同一組特徵上計算，輸出 log-odds 貢獻 (n, 特徵數)。
+批次篩檢的結果只顯示前 3 名，近似值通常就夠了；與 exact 的一致程度見
+benchmarks/explain_modes.py。
+"""
+import numpy as np
+import xgboost as xgb
+
+EXPLAIN_MODES = ("exact", "approx", "trees", "none")
+DEFAULT_TREES = 50
+
+
+def effective_trees(model, n_trees):
+    """trees 模式實際用到的樹數 (超過模型的樹數就是全部；API 已擋掉 < 1 的值)"""
+    return max(1, min(int(n_trees), model.get_booster().num_boosted_rounds()))
+
+
+def contributions(model, X, mode="exact", n_trees=DEFAULT_TREES):
+    """回傳 (貢獻值 (n, 特徵數), base value (n,))；mode="none" 回傳 (None, None)"""
+    if mode not in EXPLAIN_MODES:
+        raise ValueError(f"未知的 explain 模式: {mode} (可用: {EXPLAIN_MODES})")
+    if mode == "none":
+        return None, None
+    booster = model.get_booster()
+    kwargs = {"pred_contribs": True}
+    if mode == "approx":
+        kwargs["approx_contribs"] = True
+    elif mode == "trees":
+        kwargs["iteration_range"] = (0, effective_trees(model, n_trees))
+    out = booster.predict(xgb.DMatrix(X), **kwargs)
+    # 最後一欄是 bias (base value)
+    return out[:, :-1], out[:, -1]
+
+
+def top_k_indices(values, k=3):
+    """每列 |貢獻| 最大的前 k 個特徵的欄位索引 (由大到小)"""
+    k = min(k, values.shape[1])
+    idx = np.argpartition(-np.abs(values), k - 1, axis=1)[:, :k]
+    order = np.take_along_axis(np.abs(values), idx, axis=1).argsort(axis=1)[:, ::-1]
+    return np.take_along_axis(idx, order, axis=1)
+
+
+def top_features(values, feature_names, k=3):
+    """每列前 k 名 [{"feature", "shap"}]，格式與 /predict 的稽核紀錄相同"""
+    idx = top_k_indices(values, k)
+    picked = np.take_along_axis(values, idx, axis=1)
+    return [
+        [{"feature": feature_names[j], "shap": float(v)} for j, v in zip(row_idx, row_val)]
+        for row_idx, row_val in zip(idx, picked)
+    ]
+
+
+def top_k_agreement(approx_values, exact_values, k=3):
+    """
+    近似值與 exact 的前 k 名一致程度
+        top1       第一名相同的比例
+        overlap    前 k 名交集 / k 的平均
+        same_order 前 k 名 (含順序) 完全相同的比例
+    """
+    a = top_k_indices(approx_values, k)
+    e = top_k_indices(exact_values, k)
+    overlap = np.array([len(set(x) & set(y)) for x, y in zip(a, e)]) / a.shape[1]
+    return {
+        "k": int(a.shape[1]),
+        "top1": float((a[:, 0] == e[:, 0]).mean()),
+        "overlap": float(overlap.mean()),
+        "same_order": float((a == e).all(axis=1).mean()),
+    }
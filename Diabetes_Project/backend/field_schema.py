@@ -0,0 +1,239 @@
+"""
+輸入欄位規格 (Field Schema) 與欄位目錄 (Field Catalog)
+
+每個欄位的 NHANES 代碼、型別、上下限與允許的類別代碼只定義在這裡：
+    - 後端 GET /schema 原樣提供 (只有驗證用的規格)
+    - GET /field_catalog 再加上前端呈現用的資訊 (變數名、標籤、區塊、選項文字)，
+      前端整個輸入頁依此產生，檢查範圍與後端完全相同
+    - compile_schema() 把規格編譯成 NumPy 陣列，一次檢查整批資料
+      (n 列 x 欄位數的矩陣運算，不需要逐列的 Python 迴圈)
+
+missing_codes 是 NHANES 的「拒答 / 不知道」代碼，後端會在 nan_codes 階段
+轉成 NaN，所以視為合法輸入。代碼不寫在 FIELDS 裡，啟動時由 with_missing_codes()
+從參數包的 nan_map / nan_values 補上 (與 inference.clean_nan_codes 用同一份)。
+"""
+import hashlib
+import json
+
+import numpy as np
+
+FIELDS = [
+    # --- 基本人口學 ---
+    {"code": "RIDAGEYR", "type": "integer", "min": 1, "max": 120, "step": 1, "required": True},
+    {"code": "RIAGENDR", "type": "category", "categories": [1, 2], "required": True},
+    # --- 身體測量 ---
+    {"code": "BMXHT", "type": "number", "min": 30.0, "max": 250.0, "step": 0.1},
+    {"code": "BMXWT", "type": "number", "min": 3.0, "max": 250.0, "step": 0.1},
+    {"code": "BMXBMI", "type": "number", "min": 0.0},  # 由身高體重算出，不另設上限
+    {"code": "BMXWAIST", "type": "number", "min": 10.0, "max": 200.0, "step": 0.1},
+    # --- 血壓 ---
+    {"code": "systolic_avg", "type": "number", "min": 50.0, "max": 250.0, "step": 1.0},
+    {"code": "diastolic_avg", "type": "number", "min": 0.0, "max": 140.0, "step": 1.0},
+    # --- 血液檢驗 ---
+    {"code": "LBXGLU", "type": "number", "min": 15.0, "max": 600.0, "step": 1.0},
+    {"code": "LBXIN", "type": "number", "min": 0.0, "max": 700.0, "step": 0.1},
+    {"code": "LBXGH", "type": "number", "min": 0.0, "max": 20.0, "step": 0.1},
+    {"code": "LBXTC", "type": "number", "min": 50.0, "max": 850.0, "step": 1.0},
+    {"code": "LBDHDD", "type": "number", "min": 5.0, "max": 250.0, "step": 1.0},
+    {"code": "LBDLDL", "type": "number", "min": 5.0, "max": 400.0, "step": 1.0},
+    {"code": "LBXTR", "type": "number", "min": 10.0, "max": 3000.0, "step": 1.0},
+    # --- 生活習慣 ---
+    {"code": "SMQ020", "type": "category", "categories": [1, 2]},
+    {"code": "ALQ130", "type": "number", "min": 0.0, "max": 90.0, "step": 0.5},
+    {"code": "PAQ665", "type": "category", "categories": [1, 2]},
+    {"code": "PAQ650", "type": "category", "categories": [1, 2]},
+    {"code": "MCQ300C", "type": "category", "categories": [1, 2]},
+    {"code": "HUQ010", "type": "category", "categories": [1, 2, 3, 4, 5]},
+    {"code": "Sleep_Hours", "type": "number", "min": 0.0, "max": 17.0, "step": 0.1},
+]
+
+# 輸入頁的區塊 (順序即畫面順序)
+#   live=True：改值時只重跑這個區塊 (BMI 即時更新)，其餘區塊在表單裡，按下送出才一起送
+SECTIONS = [
+    {"id": "basic", "title": "Basic Information / 基本資料", "columns": 2, "live": True},
+    {"id": "body", "title": "Body Measurements / 身體測量", "columns": 3, "live": True},
+    {"id": "lifestyle", "title": "Family History & Lifestyle / 家族病史 & 生活作息", "columns": 2},
+    {"id": "blood_pressure", "title": "Blood Pressure / 血壓", "columns": 2},
+    {"id": "labs", "title": "Blood Test Results / 血液檢查結果", "columns": 3},
+]
+
+# 「我不知道」：選項的代碼是 null，數值欄位旁邊的勾選框也一樣，後端當作缺值再填補
+UNKNOWN_LABEL = "I don't know"
+YES_NO = [["yes", 1], ["no", 2], [UNKNOWN_LABEL, None]]
+
+# 前端呈現用的資訊 (驗證只看 FIELDS)
+#   name     前端的變數名 (上傳的 CSV 也可以用這個當欄位名)
+#   column   放在區塊的第幾欄；row="own" 的欄位自己佔一整行 (放在各欄下面)
+#   display  錯誤訊息裡的簡短名稱
+#   options  [選項文字, 代碼]；沒有 options 的是數值輸入
+#   unknown  數值輸入旁邊是否有「I don't know」勾選框
+#   derived  由其他欄位算出，不產生輸入元件 (bmi = 體重 / 身高²)
+PRESENTATION = {
+    "RIDAGEYR": {"name": "age", "section": "basic", "column": 0, "label": "Age", "display": "Age", "unknown": False},
+    "RIAGENDR": {"name": "gender", "section": "basic", "column": 1, "label": "Gender / 性別", "display": "Gender",
+                 "options": [["male", 1], ["female", 2]]},
+    "BMXHT": {"name": "height_cm", "section": "body", "column": 0, "label": "Height / 身高 (cm) ", "display": "Height"},
+    "BMXWT": {"name": "weight_kg", "section": "body", "column": 1, "label": "Weight / 體重 (kg)", "display": "Weight"},
+    "BMXBMI": {"name": "bmi", "section": "body", "column": 2, "label": "BMI / 身體質量指數", "display": "BMI",
+               "derived": "bmi"},
+    "BMXWAIST": {"name": "waist_cm", "section": "body", "label": "Waist Circumference / 腰圍 (cm)",
+                 "display": "Waist Circumference", "row": "own"},
+    "MCQ300C": {"name": "family_diabetes", "section": "lifestyle", "column": 0,
+                "label": "Does a close relative have diabetes? / 您的近親是否患有糖尿病嗎？",
+                "display": "Family History", "options": YES_NO},
+    "PAQ665": {"name": "moderate_activity", "section": "lifestyle", "column": 0,
+               "label": "Do you do moderate-intensity sports or fitness activities (e.g., brisk walking, swimming) weekly? / 您每週有從事中等強度運動或健身活動嗎 (例如快走、游泳)？",
+               "display": "Moderate Activity", "options": YES_NO},
+    "ALQ130": {"name": "alcohol_drinks", "section": "lifestyle", "column": 0,
+               "label": "What is your average alcoholic drinks per day? / 您平均每天飲用多少酒精飲品？",
+               "display": "Alcohol Drinks"},
+    "SMQ020": {"name": "ever_smoked", "section": "lifestyle", "column": 1,
+               "label": "Have you ever smoked? / 您是否曾經吸菸？", "display": "Ever Smoked", "options": YES_NO},
+    "PAQ650": {"name": "vigorous_activity", "section": "lifestyle", "column": 1,
+               "label": "Do you do vigorous-intensity sports or fitness activities (e.g., running, basketball) weekly? / 您每週有從事高強度運動或健身活動嗎 (例如跑步、籃球)？",
+               "display": "Vigorous Activity", "options": YES_NO},
+    "Sleep_Hours": {"name": "Sleep_Hours", "section": "lifestyle", "column": 1,
+                    "label": "How long do you sleep per night (hours)? / 您每晚睡眠時長（小時）是多久？",
+                    "display": "Sleep Hours"},
+    "HUQ010": {"name": "general_health", "section": "lifestyle", "row": "own",
+               "label": "How is your self-reported health status? (1=Poor, 5=Excellent) / 您的自評健康狀況如何？(1=差, 5=極佳)",
+               "display": "General Health",
+               "options": [[str(c), c] for c in (5, 4, 3, 2, 1)] + [[UNKNOWN_LABEL, None]]},
+    "systolic_avg": {"name": "systolic_avg", "section": "blood_pressure", "column": 0,
+                     "label": "Systolic Blood Pressure / 收縮壓 (mmHg)", "display": "Systolic Blood Pressure"},
+    "diastolic_avg": {"name": "diastolic_avg", "section": "blood_pressure", "column": 1,
+                      "label": "Diastolic Blood Pressure / 舒張壓 (mmHg)", "display": "Diastolic Blood Pressure"},
+    "LBXGLU": {"name": "fasting_glucose", "section": "labs", "column": 0,
+               "label": "Fasting Glucose / 空腹血糖 (mg/dL)", "display": "Fasting Glucose"},
+    "LBXTC": {"name": "total_cholesterol", "section": "labs", "column": 0,
+              "label": "Total Cholesterol / 總膽固醇 (mg/dL)", "display": "Total Cholesterol"},
+    "LBXTR": {"name": "triglycerides", "section": "labs", "column": 0,
+              "label": "Triglycerides / 三酸甘油脂 (mg/dL)", "display": "Triglycerides"},
+    "LBXIN": {"name": "insulin", "section": "labs", "column": 1,
+              "label": "Insulin / 胰島素 (µU/mL)", "display": "Insulin"},
+    "LBDHDD": {"name": "HDL", "section": "labs", "column": 1,
+               "label": "HDL Cholesterol / HDL 膽固醇 (mg/dL)", "display": "HDL Cholesterol"},
+    "LBXGH": {"name": "HbA1c", "section": "labs", "column": 2, "label": "HbA1c / 糖化血色素 (%)", "display": "HbA1c"},
+    "LBDLDL": {"name": "LDL", "section": "labs", "column": 2,
+               "label": "LDL Cholesterol / LDL 膽固醇 (mg/dL)", "display": "LDL Cholesterol"},
+}
+
+
+def with_missing_codes(fields, codes):
+    """
+    codes: {欄位: [特殊代碼, ...]} (inference.nan_codes(pipeline))
+    回傳補上 missing_codes 的欄位規格 (新的 list，FIELDS 不變)
+    """
+    return [dict(f, missing_codes=codes[f["code"]]) if f["code"] in codes else f for f in fields]
+
+
+def catalog_fields(fields=FIELDS):
+    """驗證規格 + 呈現資訊，依畫面順序 (區塊，再依 PRESENTATION 的順序)"""
+    specs = {f["code"]: f for f in fields}
+    order = {s["id"]: i for i, s in enumerate(SECTIONS)}
+    fields = [dict(specs[code], **ui) for code, ui in PRESENTATION.items()]
+    return sorted(fields, key=lambda f: order[f["section"]])
+
+
+def schema_version(fields=FIELDS):
+    """規格內容的雜湊，前端可用來判斷快取是否過期 (呈現資訊或 missing_codes 改了也算新版本)"""
+    return hashlib.sha256(
+        json.dumps([fields, SECTIONS, PRESENTATION], sort_keys=True).encode()).hexdigest()[:12]
+
+
+SCHEMA_VERSION = schema_version()
+
+
+def schema_document(fields=FIELDS):
+    """GET /schema 回傳的內容"""
+    return {"version": schema_version(fields), "fields": fields}
+
+
+def catalog_document(fields=FIELDS):
+    """GET /field_catalog 回傳的內容"""
+    return {"version": schema_version(fields), "unknown_label": UNKNOWN_LABEL,
+            "sections": SECTIONS, "fields": catalog_fields(fields)}
+
+
+def _padded(rows):
+    """長短不一的代碼清單 -> 以 NaN 補齊的 2D 陣列 (NaN 不等於任何值)"""
+    width = max((len(r) for r in rows), default=0) or 1
+    out = np.full((len(rows), width), np.nan)
+    for i, r in enumerate(rows):
+        out[i, :len(r)] = r
+    return out
+
+
+class CompiledSchema:
+    """編譯後的規格：每個檢查都是 (n, 欄位數) 的布林矩陣"""
+
+    def __init__(self, fields):
+        self.codes = [f["code"] for f in fields]
+        self.lo = np.array([f.get("min", -np.inf) for f in fields], dtype=float)
+        self.hi = np.array([f.get("max", np.inf) for f in fields], dtype=float)
+        self.required = np.array([f.get("required", False) for f in fields])
+        self.integer = np.array([f["type"] == "integer" for f in fields])
+        self.is_category = np.array([f["type"] == "category" for f in fields])
+        self.categories = _padded([f.get("categories", []) for f in fields])
+        self.missing_codes = _padded([f.get("missing_codes", []) for f in fields])
+
+    def check(self, X, not_numeric=None):
+        """
+        X: (n, 欄位數) 的 float 矩陣 (欄位順序同 self.codes，缺值為 NaN)
+        not_numeric: 解析不成數字的格子 (CSV 上傳用，X 在這些位置是 NaN)
+        回傳 {錯誤種類: 布林矩陣}；同一格最多只會落在一種錯誤
+        """
+        nan = np.isnan(X)
+        if not_numeric is not None:
+            nan = nan & ~not_numeric
+        special = (X[:, :, None] == self.missing_codes[None]).any(axis=2)
+        finite = np.isfinite(X) & ~special
+        numeric = finite & ~self.is_category
+        category = finite & self.is_category
+        return {
+            "missing": nan & self.required,
+            "not_finite": np.isinf(X),
+            "below_min": numeric & (X < self.lo),
+            "above_max": numeric & (X > self.hi),
+            "not_integer": numeric & self.integer & (X != np.floor(X)),
+            "not_allowed": category & ~(X[:, :, None] == self.categories[None]).any(axis=2),
+            "not_numeric": not_numeric if not_numeric is not None else np.zeros(X.shape, dtype=bool),
+        }
+
+    def validate(self, X, max_errors=1000, not_numeric=None):
+        """
+        回傳 (每列是否合法, 錯誤清單)
+        錯誤清單只在有錯的格子上展開，最多 max_errors 筆
+        """
+        X = np.asarray(X, dtype=float)
+        masks = self.check(X, not_numeric)
+        bad = np.zeros(X.shape, dtype=bool)
+        for mask in masks.values():
+            bad |= mask
+        row_ok = ~bad.any(axis=1)
+
+        errors = []
+        for kind, mask in masks.items():
+            rows, cols = np.nonzero(mask)
+            for r, c in zip(rows[:max_errors - len(errors)], cols):
+                error = {"row": int(r), "field": self.codes[c], "error": kind}
+                if kind in ("below_min", "above_max", "not_integer", "not_allowed", "not_finite"):
+                    error["value"] = float(X[r, c])
+                if kind == "below_min":
+                    error["limit"] = float(self.lo[c])
+                elif kind == "above_max":
+                    error["limit"] = float(self.hi[c])
+                errors.append(error)
+            if len(errors) >= max_errors:
+                break
+        errors.sort(key=lambda e: (e["row"], self.codes.index(e["field"])))
+        return row_ok, errors
+
+    def validate_frame(self, df, max_errors=1000):
+        """DataFrame 版本：缺少的欄位視為 NaN，多出來的欄位忽略"""
+        X = df.reindex(columns=self.codes).to_numpy(dtype=float)
+        return self.validate(X, max_errors=max_errors)
+
+
+def compile_schema(fields=FIELDS):
+    return CompiledSchema(fields)
@@ -0,0 +1,223 @@
+"""
+推論用的資料轉換 (重現訓練時的前處理)
+
+/predict (單筆)、/predict_csv (分塊上傳) 與離線的 batch_score.py 共用同一套邏輯，
+每一步都是整欄的 pandas / NumPy 運算，一次處理 n 列：
+    nan_codes -> imputation -> drop_rename -> scaling -> encoding
+"""
+import hashlib
+import logging
+from contextlib import nullcontext
+
+import joblib
+import numpy as np
+import pandas as pd
+
+MODEL_PATH = "nhanes_pipeline_XGBoost.pkl"
+
+# 原始 NHANES 欄位，特徵工程後用不到
+DROP_COLS = ['SLD012', 'SLD010H', 'BPXDI1', 'BPXDI2', 'BPXDI3', 'BPXSY1', 'BPXSY2', 'BPXSY3']
+
+# 原始 NHANES 檔的睡眠時數欄位 (不是 API 欄位，在 apply_imputation 併成 Sleep_Hours)
+RAW_SLEEP_COLS = ["SLD012", "SLD010H"]
+
+imputation_log = logging.getLogger("healthshield.imputation")
+
+
+def load_bundle(path=MODEL_PATH):
+    """載入模型參數包，回傳 (pipeline, model_version)"""
+    pipeline = joblib.load(path)
+    # 模型版本：參數包裡有寫就用，沒有就用 pkl 檔案的 hash (換模型就會變)
+    with open(path, "rb") as f:
+        version = pipeline.get("model_version") or hashlib.sha256(f.read()).hexdigest()[:12]
+    return pipeline, version
+
+
+def derive_from_raw(df):
+    """
+    原始 NHANES 檔 (例如 ALL_NHANES_MERGED_20072018.csv) 只有三次量測的血壓，
+    照 notebook 的做法：舒張壓與年齡接近 0 視為缺值，再取三次平均
+    (已經有 systolic_avg / diastolic_avg 的列不受影響，只補空著的列)
+    """
+    sys_cols = [c for c in ["BPXSY1", "BPXSY2", "BPXSY3"] if c in df.columns]
+    dia_cols = [c for c in ["BPXDI1", "BPXDI2", "BPXDI3"] if c in df.columns]
+    for col in dia_cols + (["RIDAGEYR"] if sys_cols or dia_cols else []):
+        df[col] = df[col].mask(df[col].lt(1e-10))
+    for avg, cols in (("systolic_avg", sys_cols), ("diastolic_avg", dia_cols)):
+        derived = df[cols].mean(axis=1) if cols else np.nan
+        df[avg] = df[avg].fillna(derived) if avg in df.columns else derived
+    return df
+
+
+def nan_codes(pipeline):
+    """參數包的 nan_map / nan_values -> {欄位: [特殊代碼, ...]} (clean_nan_codes 會轉成 NaN 的值)"""
+    codes = {}
+    for group, cols in pipeline["nan_map"].items():
+        for c in cols:
+            codes.setdefault(c, set()).update(pipeline["nan_values"][group])
+    return {c: sorted(v) for c, v in codes.items()}
+
+
+def clean_nan_codes(df, pipeline):
+    """NHANES 特殊代碼 (7, 9, 77, 99 ...) -> NaN"""
+    for group, cols in pipeline["nan_map"].items():
+        vals = pipeline["nan_values"][group]
+        for c in cols:
+            if c in df.columns:
+                df[c] = df[c].replace(vals, np.nan)
+    return df
+
+
+def apply_imputation(df, stats):
+    """
+    【通用】Training 和 Inference 都可以用
+    使用傳入的 stats 字典來填補，而不是重新計算
+    """
+    df = df.copy()
+
+    # --- 身體測量複雜邏輯 ---
+    median_h = stats.get("BMXHT")
+    median_w = stats.get("BMXWT")
+
+    if "BMXWAIST" in df.columns:
+        df["BMXWAIST"] = df["BMXWAIST"].fillna(stats.get("BMXWAIST"))
+
+    # Case 1 & 2 & 3 (公式回推邏輯)
+    # 這裡直接套用你原本的邏輯，但填補值改用 stats 裡的
+    if all(col in df.columns for col in ["BMXHT", "BMXWT", "BMXBMI"]):
+        imputation_log.debug("[Body Measures] 執行身高、體重、BMI 複雜邏輯填補...")
+
+        # 準備變數 (H:身高cm, W:體重kg, B:BMI)
+        # 中位數用上面 stats 裡訓練資料的值 (不能用這批資料自己的中位數，
+        # 否則單筆時是 NaN、分塊評分時結果會隨同一塊的其他列而變)
+
+        # -------------------------------------------------------
+        # Case 1: 只有其中一個缺，且其餘兩個有：用公式回推
+        # -------------------------------------------------------
+        # 1.1 缺 BMI (有 H, W) -> B = W / (H/100)^2
+        mask_miss_b = df["BMXBMI"].isna() & df["BMXHT"].notna() & df["BMXWT"].notna()
+        df.loc[mask_miss_b, "BMXBMI"] = df.loc[mask_miss_b, "BMXWT"] / ((df.loc[mask_miss_b, "BMXHT"] / 100) ** 2)
+
+        # 1.2 缺 體重 (有 H, B) -> W = B * (H/100)^2
+        mask_miss_w = df["BMXWT"].isna() & df["BMXHT"].notna() & df["BMXBMI"].notna()
+        df.loc[mask_miss_w, "BMXWT"] = df.loc[mask_miss_w, "BMXBMI"] * ((df.loc[mask_miss_w, "BMXHT"] / 100) ** 2)
+
+        # 1.3 缺 身高 (有 W, B) -> H = 100 * sqrt(W / B)
+        mask_miss_h = df["BMXHT"].isna() & df["BMXWT"].notna() & df["BMXBMI"].notna()
+        df.loc[mask_miss_h, "BMXHT"] = 100 * np.sqrt(df.loc[mask_miss_h, "BMXWT"] / df.loc[mask_miss_h, "BMXBMI"])
+
+        # -------------------------------------------------------
+        # Case 2: 三個中有兩個缺
+        # -------------------------------------------------------
+        # 2.1 身高、體重缺 (有 BMI)：先用中位數填補體重，用公式推算身高
+        mask_miss_hw = df["BMXHT"].isna() & df["BMXWT"].isna() & df["BMXBMI"].notna()
+        # Step 1: 填體重 (中位數)
+        df.loc[mask_miss_hw, "BMXWT"] = median_w
+        # Step 2: 推身高 (公式)
+        df.loc[mask_miss_hw, "BMXHT"] = 100 * np.sqrt(df.loc[mask_miss_hw, "BMXWT"] / df.loc[mask_miss_hw, "BMXBMI"])
+
+        # 2.2 身高、BMI 缺 (有 體重)：先用中位數填補身高，再計算 BMI
+        mask_miss_hb = df["BMXHT"].isna() & df["BMXBMI"].isna() & df["BMXWT"].notna()
+        # Step 1: 填身高 (中位數)
+        df.loc[mask_miss_hb, "BMXHT"] = median_h
+        # Step 2: 算 BMI
+        df.loc[mask_miss_hb, "BMXBMI"] = df.loc[mask_miss_hb, "BMXWT"] / ((df.loc[mask_miss_hb, "BMXHT"] / 100) ** 2)
+
+        # 2.3 體重、BMI 缺 (有 身高)：先用中位數填補體重，再計算 BMI
+        mask_miss_wb = df["BMXWT"].isna() & df["BMXBMI"].isna() & df["BMXHT"].notna()
+        # Step 1: 填體重 (中位數)
+        df.loc[mask_miss_wb, "BMXWT"] = median_w
+        # Step 2: 算 BMI
+        df.loc[mask_miss_wb, "BMXBMI"] = df.loc[mask_miss_wb, "BMXWT"] / ((df.loc[mask_miss_wb, "BMXHT"] / 100) ** 2)
+
+        # -------------------------------------------------------
+        # Case 3: 三個都缺
+        # -------------------------------------------------------
+        # 用中位數填補身高、體重，再計算填補後的 bmi
+        mask_miss_all = df["BMXHT"].isna() & df["BMXWT"].isna() & df["BMXBMI"].isna()
+        df.loc[mask_miss_all, "BMXHT"] = median_h
+        df.loc[mask_miss_all, "BMXWT"] = median_w
+        df.loc[mask_miss_all, "BMXBMI"] = median_w / ((median_h / 100) ** 2)
+
+    # 血壓計算
+    #sys_cols = [c for c in ["BPXSY1", "BPXSY2", "BPXSY3"] if c in df.columns]
+    #dia_cols = [c for c in ["BPXDI1", "BPXDI2", "BPXDI3"] if c in df.columns]
+
+    #if sys_cols:
+    #    df["systolic_avg"] = df[sys_cols].mean(axis=1)
+    df["systolic_avg"] = df["systolic_avg"].fillna(stats.get("systolic_avg"))
+
+    #if dia_cols:
+    #    df["diastolic_avg"] = df[dia_cols].mean(axis=1)
+    df["diastolic_avg"] = df["diastolic_avg"].fillna(stats.get("diastolic_avg"))
+
+    # Lab 填補
+    lab_vars = ["LBXGLU", "LBXIN", "LBXGH", "LBXTC", "LBDHDD", "LBDLDL", "LBXTR"]
+    for col in lab_vars:
+        if col in df.columns:
+            df[col] = df[col].fillna(stats.get(col))
+
+    # 生活習慣規則 (吸菸、飲酒、類別)
+    if "SMQ020" in df.columns and "RIDAGEYR" in df.columns:
+        df.loc[(df["RIDAGEYR"] < 20) & (df["SMQ020"].isna()), "SMQ020"] = 2
+        df.loc[(df["RIDAGEYR"] >= 20) & (df["SMQ020"].isna()), "SMQ020"] = 3
+
+    if "ALQ130" in df.columns:
+        df.loc[df["RIDAGEYR"] < 20, "ALQ130"] = df.loc[df["RIDAGEYR"] < 20, "ALQ130"].fillna(0)
+        df.loc[df["RIDAGEYR"] >= 20, "ALQ130"] = df.loc[df["RIDAGEYR"] >= 20, "ALQ130"].fillna(stats.get("ALQ130_adult"))
+
+    for col in ["MCQ300C", "PAQ650", "PAQ665"]:
+        if col in df.columns:
+            df[col] = df[col].fillna(3)
+
+    # 睡眠：/predict 直接給 Sleep_Hours (不能被蓋掉)；原始 NHANES 檔則是 SLD012 (2015 之後) 或 SLD010H
+    sleep = df["Sleep_Hours"] if "Sleep_Hours" in df.columns else pd.Series(np.nan, index=df.index)
+    for col in RAW_SLEEP_COLS:
+        if col in df.columns:
+            sleep = sleep.combine_first(df[col])
+    df["Sleep_Hours"] = sleep.fillna(stats.get("Sleep_Hours"))
+
+    if "HUQ010" in df.columns:
+        df["HUQ010"] = df["HUQ010"].fillna(stats.get("HUQ010"))
+
+    return df
+
+
+def transform(df, pipeline, timer=None):
+    """
+    NHANES 代碼的 DataFrame (n 列，float) -> 模型輸入 (欄位順序同 final_columns)
+    有傳 timer (metrics.StageTimer) 就分階段計時
+    """
+    def stage(name):
+        return timer.stage(name) if timer is not None else nullcontext()
+
+    # B. 清洗特殊代碼 (7, 9 -> NaN)
+    with stage("nan_codes"):
+        df = clean_nan_codes(df, pipeline)
+
+    # C. 填補與特徵工程
+    with stage("imputation"):
+        df = apply_imputation(df, pipeline["imputer_stats"])
+
+    # D. Rename & Drop
+    with stage("drop_rename"):
+        df = df.drop(columns=DROP_COLS, errors='ignore')
+        df = df.rename(columns=pipeline["rename_dict"])
+
+    # E. Scaling
+    with stage("scaling"):
+        cols_to_scale = pipeline["minmax_cols"]
+        df[cols_to_scale] = pipeline["scaler"].transform(df[cols_to_scale])
+
+    # F. Encoding & Alignment
+    with stage("encoding"):
+        cols_to_encode = pipeline["onehot_cols"]
+        df = pd.get_dummies(df, columns=cols_to_encode)
+        # 補齊缺少的欄位 (重要！)
+        df = df.reindex(columns=pipeline["final_columns"], fill_value=0)
+    return df
+
+
+def predict_proba(model, X):
+    """患病機率 (第 1 類) 的 1D array"""
+    return model.predict_proba(X)[:, 1]
@@ -0,0 +1,146 @@
+"""
+結構化日誌 (JSON lines)，取代 hot path 上的 print
+
+Cloud Run 上每一次 print 都是同步寫 stdout，會算進 request 的延遲。這裡改成：
+    request 執行緒：logger.info(...) 只把 LogRecord 放進有上限的佇列
+    背景執行緒   ：QueueListener 取出後格式化成一行 JSON 再寫 stdout
+每一行都帶 request_id (由 main.py 的 middleware 設定)。
+
+環境變數：
+    LOG_LEVEL          全域等級 (預設 INFO)
+    LOG_LEVELS         個別 logger 的等級，例如 "healthshield.imputation=DEBUG,healthshield.shap=WARNING"
+    LOG_DEBUG_SAMPLE   DEBUG 訊息的取樣率 (0~1，預設 0.01)，避免每個 request 都寫
+    LOG_QUEUE_SIZE     佇列上限 (預設 10000，滿了就丟棄並計數)
+"""
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+
+ROOT_LOGGER = "healthshield"
+
+# 目前 request 的 ID；不在 request 內時為 "-"
+request_id_var = contextvars.ContextVar("request_id", default="-")
+
+# logging 內建欄位，其餘的 (logger.info(..., extra={...})) 會一起輸出成 JSON 欄位
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "request_id"}
+
+
+class JsonFormatter(logging.Formatter):
+    """一筆 LogRecord -> 一行 JSON"""
+
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED:
+                entry[key] = value
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class DebugSampler(logging.Filter):
+    """DEBUG 只保留 rate 比例；INFO 以上全部保留"""
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno > logging.DEBUG or random.random() < self.rate
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    在呼叫端執行緒只做最少的事：
+    補上 request_id、把 args 合併進 msg、exception 轉文字，然後 put_nowait；
+    JSON 格式化與寫 stdout 都留給背景執行緒。佇列滿了就丟棄。
+    """
+
+    def __init__(self, q):
+        super().__init__(q)
+        self.dropped = 0
+
+    def prepare(self, record):
+        record.request_id = request_id_var.get()
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_listener = None
+_handler = None
+
+
+def _parse_levels(spec):
+    levels = {}
+    for item in (spec or "").split(","):
+        name, _, level = item.strip().partition("=")
+        if name and level:
+            levels[name] = level.upper()
+    return levels
+
+
+def setup_logging(stream=None):
+    """
+    設定 healthshield.* logger 走佇列與背景執行緒 (重複呼叫不會重複設定)
+    回傳根 logger
+    """
+    global _listener, _handler
+    root = logging.getLogger(ROOT_LOGGER)
+    if _listener is not None:
+        return root
+
+    q = queue.Queue(maxsize=int(os.getenv("LOG_QUEUE_SIZE", "10000")))
+    _handler = NonBlockingQueueHandler(q)
+    _handler.addFilter(DebugSampler(float(os.getenv("LOG_DEBUG_SAMPLE", "0.01"))))
+
+    out = logging.StreamHandler(stream or sys.stdout)
+    out.setFormatter(JsonFormatter())
+    _listener = logging.handlers.QueueListener(q, out, respect_handler_level=False)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+    root.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+    root.addHandler(_handler)
+    root.propagate = False
+    for name, level in _parse_levels(os.getenv("LOG_LEVELS")).items():
+        logging.getLogger(name).setLevel(level)
+    return root
+
+
+def shutdown_logging():
+    """停止背景執行緒 (會先把佇列內的訊息寫完)"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def dropped_count():
+    return _handler.dropped if _handler is not None else 0
+
+
+def get_logger(name):
+    """取得 healthshield.<name> logger"""
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
@@ -1,175 +1,219 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Header, HTTPException, Query, Request, Response
+from fastapi.responses import PlainTextResponse
+from starlette.datastructures import Headers, MutableHeaders
 from pydantic import BaseModel
-from typing import Optional
+from typing import Annotated, Optional
 import shap
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
-import joblib
 import io
+import json
+import os
+import time
 import base64
-
-app = FastAPI()
+import threading
+
+import diagnostics
+from log_config import get_logger, request_id_var, setup_logging
+from prediction_log import PredictionLog
+from tracing import (SpanExporter, make_span, new_span_id, new_trace_id,
+                     parse_traceparent, stage_spans, trace_context_var)
+from drift_monitor import DriftMonitor, load_reference
+from bulk_scoring import FORMATS, UploadPipe, UploadStreamingResponse, stream_results
+from explain import DEFAULT_TREES, EXPLAIN_MODES, contributions, effective_trees
+from explain import top_features as explain_top_features
+from field_schema import FIELDS, catalog_document, compile_schema, schema_document, schema_version, with_missing_codes
+from inference import MODEL_PATH, load_bundle, nan_codes, predict_proba, transform
+from metrics import StageMetrics, StageTimer
+import result_cache as result_cache_backends
+from result_cache import cache_key
+import artifact_store as artifact_store_backends
+from artifact_store import ArtifactError
+
+# 日誌走佇列 + 背景執行緒，輸出 JSON lines (取代 print)
+setup_logging()
+log = get_logger("app")
+
+# 記憶體診斷 (DIAGNOSTICS=1 才啟動 tracemalloc)
+if diagnostics.start_from_env():
+    log.info("🔍 tracemalloc 已啟動")
 
 # ---------------------------------------------------------
 # 1. 載入模型與參數包
 # ---------------------------------------------------------
 # 注意：在 Docker 裡，路徑就是當前目錄
 #try:
-pipeline = joblib.load("nhanes_pipeline_XGBoost.pkl")
+# 模型版本：參數包裡有寫就用，沒有就用 pkl 檔案的 hash (換模型就會變)
+pipeline, MODEL_VERSION = load_bundle(MODEL_PATH)
 model = pipeline["model"]       # 您的 XGBoost 模型
 stats = pipeline["imputer_stats"]
 scaler = pipeline["scaler"]
 
 # 🔥 關鍵修改：不要從 pickle 讀，我們現場用模型建立一個新的！
-print("⚡ 正在初始化 SHAP Explainer...")
-print("★ ★ ★ 新程式碼載入確認：我是最新版的 main.py！ ★ ★ ★")  # <--- 加這行
+log.info("⚡ 正在初始化 SHAP Explainer...")
 try:
     # 針對 XGBoost 模型，使用 TreeExplainer 是最快最穩的
     explainer = shap.TreeExplainer(model)
-    print("✅ SHAP Explainer 初始化成功")
+    log.info("✅ SHAP Explainer 初始化成功")
 except Exception as e:
-    print(f"⚠️ Explainer 初始化失敗: {e}")
+    log.warning(f"⚠️ Explainer 初始化失敗: {e}")
     explainer = None
 
 shap_plots = pipeline.get("shap_plots") # 拿預先畫好的圖
-print("✅ 模型與 Pipeline 載入成功")
+log.info("✅ 模型與 Pipeline 載入成功", extra={"model_version": MODEL_VERSION})
 #except Exception as e:
 #    print(f"❌ 載入失敗: {e}")
     # 為了防止 App 崩潰，這裡可能會需要處理，但在 Demo 前請確保檔案存在
 
-# ---------------------------------------------------------
-# 2. 定義資料處理函式 (重現訓練時的邏輯)
-# ---------------------------------------------------------
-def apply_imputation(df, stats):
+# 預測稽核紀錄 (設定 PREDICTION_LOG_PATH 才啟用)
+prediction_log = PredictionLog.from_env()
+
+# 輸入漂移監控 (預設開啟，DRIFT_MONITOR=0 關閉)
+# reference profile 是獨立的檔案 (drift_reference.json，DRIFT_REFERENCE 可改路徑)；單筆與 /predict_csv 的每一塊都會更新
+drift_monitor = (DriftMonitor.from_pipeline(pipeline, load_reference())
+                 if os.getenv("DRIFT_MONITOR", "1") != "0" else None)
+
+# 分散式追蹤 (設定 TRACE_EXPORT_FILE 或 TRACE_EXPORT_URL 才啟用)
+span_exporter = SpanExporter.from_env()
+
+# 輸入欄位規格 (與前端共用，GET /schema)；拒答 / 不知道的代碼取自參數包的 nan_map，與 clean_nan_codes 相同
+input_fields = with_missing_codes(FIELDS, nan_codes(pipeline))
+input_schema = compile_schema(input_fields)
+SCHEMA_VERSION = schema_version(input_fields)
+
+# 預測結果快取 (RESULT_CACHE=memory 或 redis://...，多個 instance 可共用)
+result_cache = result_cache_backends.from_env()
+
+# 個人解釋圖 (waterfall PNG、force plot HTML) 的短期存放區 (/predict 回傳簽章過、會過期的網址)
+# 預設 off (放在 JSON 裡)；RESULT_CACHE 是共用的 (redis://) 而且有 ARTIFACT_SECRET 時放在同一個服務
+artifact_store = artifact_store_backends.from_env()
+# 瀏覽器連得到的後端網址 (docker-compose 裡前端用 http://backend:8000，瀏覽器連不到)
+PUBLIC_BACKEND_URL = os.getenv("PUBLIC_BACKEND_URL")
+
+# /predict 各階段延遲的直方圖 (/metrics)
+stage_metrics = StageMetrics()
+
+# /predict_lite 同時處理的上限，超過就回 503 (前端的即時預覽會安靜地略過)
+lite_slots = threading.BoundedSemaphore(int(os.getenv("LITE_MAX_INFLIGHT", "4")))
+
+# 管理用 API 的 token (沒設定就關閉所有 /admin 路由)
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+
+@asynccontextmanager
+async def lifespan(app):
+    if prediction_log is not None:
+        prediction_log.start()
+    diagnostics.reset_baseline()  # 模型都載入後才當作記憶體基準
+    yield
+    if prediction_log is not None:
+        prediction_log.stop()  # 把佇列裡剩下的紀錄寫完
+    if span_exporter is not None:
+        span_exporter.stop()  # 還沒送出的 span 也一樣
+    if result_cache is not None:
+        result_cache.close()
+    if artifact_store is not None:
+        artifact_store.close()
+
+
+class RequestContextMiddleware:
     """
-    【通用】Training 和 Inference 都可以用
-    使用傳入的 stats 字典來填補，而不是重新計算
+    每個 request 一個 ID (前端有送 X-Request-ID 就沿用)，所有日誌都會帶上；
+    有 traceparent 就接上前端的 trace，並在結束時輸出這個 request 的 server span
+    寫成純 ASGI (不用 @app.middleware)：串流回應 (/predict_csv) 的 body 送完才結束 span、還原 context，
+    串流期間的日誌也帶著 request id，span 的長度包含整個串流
     """
-    df = df.copy()
-
-    # --- 身體測量複雜邏輯 ---
-    median_h = stats.get("BMXHT")
-    median_w = stats.get("BMXWT")
-
-    if "BMXWAIST" in df.columns:
-        df["BMXWAIST"] = df["BMXWAIST"].fillna(stats.get("BMXWAIST"))
-
-    # Case 1 & 2 & 3 (公式回推邏輯)
-    # 這裡直接套用你原本的邏輯，但填補值改用 stats 裡的
-    if all(col in df.columns for col in ["BMXHT", "BMXWT", "BMXBMI"]):
-        print("  [Body Measures] 執行身高、體重、BMI 複雜邏輯填補...")
-
-        # 準備變數 (H:身高cm, W:體重kg, B:BMI)
-        # 先計算全體的中位數 (Median)，用於稍後填補
-        median_h = df["BMXHT"].median()
-        median_w = df["BMXWT"].median()
-        # 注意：腰圍是獨立填補
-        if "BMXWAIST" in df.columns:
-            df["BMXWAIST"] = df["BMXWAIST"].fillna(df["BMXWAIST"].median())
-
-        # -------------------------------------------------------
-        # Case 1: 只有其中一個缺，且其餘兩個有：用公式回推
-        # -------------------------------------------------------
-        # 1.1 缺 BMI (有 H, W) -> B = W / (H/100)^2
-        mask_miss_b = df["BMXBMI"].isna() & df["BMXHT"].notna() & df["BMXWT"].notna()
-        df.loc[mask_miss_b, "BMXBMI"] = df.loc[mask_miss_b, "BMXWT"] / ((df.loc[mask_miss_b, "BMXHT"] / 100) ** 2)
-
-        # 1.2 缺 體重 (有 H, B) -> W = B * (H/100)^2
-        mask_miss_w = df["BMXWT"].isna() & df["BMXHT"].notna() & df["BMXBMI"].notna()
-        df.loc[mask_miss_w, "BMXWT"] = df.loc[mask_miss_w, "BMXBMI"] * ((df.loc[mask_miss_w, "BMXHT"] / 100) ** 2)
-
-        # 1.3 缺 身高 (有 W, B) -> H = 100 * sqrt(W / B)
-        mask_miss_h = df["BMXHT"].isna() & df["BMXWT"].notna() & df["BMXBMI"].notna()
-        df.loc[mask_miss_h, "BMXHT"] = 100 * np.sqrt(df.loc[mask_miss_h, "BMXWT"] / df.loc[mask_miss_h, "BMXBMI"])
-
-        # -------------------------------------------------------
-        # Case 2: 三個中有兩個缺
-        # -------------------------------------------------------
-        # 2.1 身高、體重缺 (有 BMI)：先用中位數填補體重，用公式推算身高
-        mask_miss_hw = df["BMXHT"].isna() & df["BMXWT"].isna() & df["BMXBMI"].notna()
-        # Step 1: 填體重 (中位數)
-        df.loc[mask_miss_hw, "BMXWT"] = median_w
-        # Step 2: 推身高 (公式)
-        df.loc[mask_miss_hw, "BMXHT"] = 100 * np.sqrt(df.loc[mask_miss_hw, "BMXWT"] / df.loc[mask_miss_hw, "BMXBMI"])
-
-        # 2.2 身高、BMI 缺 (有 體重)：先用中位數填補身高，再計算 BMI
-        mask_miss_hb = df["BMXHT"].isna() & df["BMXBMI"].isna() & df["BMXWT"].notna()
-        # Step 1: 填身高 (中位數)
-        df.loc[mask_miss_hb, "BMXHT"] = median_h
-        # Step 2: 算 BMI
-        df.loc[mask_miss_hb, "BMXBMI"] = df.loc[mask_miss_hb, "BMXWT"] / ((df.loc[mask_miss_hb, "BMXHT"] / 100) ** 2)
-
-        # 2.3 體重、BMI 缺 (有 身高)：先用中位數填補體重，再計算 BMI
-        mask_miss_wb = df["BMXWT"].isna() & df["BMXBMI"].isna() & df["BMXHT"].notna()
-        # Step 1: 填體重 (中位數)
-        df.loc[mask_miss_wb, "BMXWT"] = median_w
-        # Step 2: 算 BMI
-        df.loc[mask_miss_wb, "BMXBMI"] = df.loc[mask_miss_wb, "BMXWT"] / ((df.loc[mask_miss_wb, "BMXHT"] / 100) ** 2)
-
-        # -------------------------------------------------------
-        # Case 3: 三個都缺
-        # -------------------------------------------------------
-        # 用中位數填補身高、體重，再計算填補後的 bmi
-        mask_miss_all = df["BMXHT"].isna() & df["BMXWT"].isna() & df["BMXBMI"].isna()
-        df.loc[mask_miss_all, "BMXHT"] = median_h
-        df.loc[mask_miss_all, "BMXWT"] = median_w
-        df.loc[mask_miss_all, "BMXBMI"] = median_w / ((median_h / 100) ** 2)
-
-    # 血壓計算
-    #sys_cols = [c for c in ["BPXSY1", "BPXSY2", "BPXSY3"] if c in df.columns]
-    #dia_cols = [c for c in ["BPXDI1", "BPXDI2", "BPXDI3"] if c in df.columns]
-
-    #if sys_cols:
-    #    df["systolic_avg"] = df[sys_cols].mean(axis=1)
-    df["systolic_avg"] = df["systolic_avg"].fillna(stats.get("systolic_avg"))
-
-    #if dia_cols:
-    #    df["diastolic_avg"] = df[dia_cols].mean(axis=1)
-    df["diastolic_avg"] = df["diastolic_avg"].fillna(stats.get("diastolic_avg"))
-
-    # Lab 填補
-    lab_vars = ["LBXGLU", "LBXIN", "LBXGH", "LBXTC", "LBDHDD", "LBDLDL", "LBXTR"]
-    for col in lab_vars:
-        if col in df.columns:
-            df[col] = df[col].fillna(stats.get(col))
-
-    # 生活習慣規則 (吸菸、飲酒、類別)
-    if "SMQ020" in df.columns and "RIDAGEYR" in df.columns:
-        df.loc[(df["RIDAGEYR"] < 20) & (df["SMQ020"].isna()), "SMQ020"] = 2
-        df.loc[(df["RIDAGEYR"] >= 20) & (df["SMQ020"].isna()), "SMQ020"] = 3
-
-    if "ALQ130" in df.columns:
-        df.loc[df["RIDAGEYR"] < 20, "ALQ130"] = df.loc[df["RIDAGEYR"] < 20, "ALQ130"].fillna(0)
-        df.loc[df["RIDAGEYR"] >= 20, "ALQ130"] = df.loc[df["RIDAGEYR"] >= 20, "ALQ130"].fillna(stats.get("ALQ130_adult"))
-
-    for col in ["MCQ300C", "PAQ650", "PAQ665"]:
-        if col in df.columns:
-            df[col] = df[col].fillna(3)
-
-    # 睡眠
-    if "SLD012" in df.columns and "SLD010H" in df.columns:
-        df["Sleep_Hours"] = df["SLD012"].combine_first(df["SLD010H"])
-    elif "SLD012" in df.columns:
-        df["Sleep_Hours"] = df["SLD012"]
-    elif "SLD010H" in df.columns:
-        df["Sleep_Hours"] = df["SLD010H"]
-    else:
-        df["Sleep_Hours"] = np.nan
-    df["Sleep_Hours"] = df["Sleep_Hours"].fillna(stats.get("Sleep_Hours"))
-
-    if "HUQ010" in df.columns:
-        df["HUQ010"] = df["HUQ010"].fillna(stats.get("HUQ010"))
-
-    return df
 
-def plot_to_base64(fig):
-    """將 Matplotlib 圖片轉為 Base64 字串"""
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        headers = Headers(scope=scope)
+        parent = parse_traceparent(headers.get("traceparent"))
+        trace_id, parent_span_id = parent if parent else (new_trace_id(), None)
+        span_id = new_span_id()
+        request_id = headers.get("X-Request-ID") or trace_id
+        status = 500
+
+        async def send_with_request_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                MutableHeaders(scope=message)["X-Request-ID"] = request_id
+            await send(message)
+
+        rid_token = request_id_var.set(request_id)
+        trace_token = trace_context_var.set((trace_id, span_id))
+        start_ns = time.time_ns()
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            request_id_var.reset(rid_token)
+            trace_context_var.reset(trace_token)
+            if span_exporter is not None:
+                span_exporter.export([make_span(
+                    f"{scope['method']} {scope['path']}", trace_id, span_id, parent_span_id,
+                    start_ns, time.time_ns(),
+                    {"http.status_code": status, "request_id": request_id}, kind=2,
+                )])
+
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(RequestContextMiddleware)
+
+
+# ---------------------------------------------------------
+# 2. 定義資料處理函式 (前處理本身在 inference.py，與批次評分共用)
+# ---------------------------------------------------------
+def plot_to_png(fig):
+    """將 Matplotlib 圖片轉為 PNG bytes"""
     buf = io.BytesIO()
     fig.savefig(buf, format="png", bbox_inches='tight', dpi=150)
     plt.close(fig)
-    buf.seek(0)
-    return base64.b64encode(buf.read()).decode("utf-8")
+    return buf.getvalue()
+
+def plot_to_base64(fig):
+    """將 Matplotlib 圖片轉為 Base64 字串"""
+    return base64.b64encode(plot_to_png(fig)).decode("utf-8")
+
+def public_base_url(request):
+    """圖的網址前面接的後端網址 (PUBLIC_BACKEND_URL，沒設定就用這次 request 的網址)"""
+    if PUBLIC_BACKEND_URL:
+        return PUBLIC_BACKEND_URL.rstrip("/")
+    return str(request.base_url).rstrip("/") if request is not None else ""
+
+def artifacts_alive(entry):
+    """快取結果裡的圖都還在 (順便延長期限)；有一張不在了就當作 miss 重算"""
+    ids = list((entry.get("artifacts") or {}).values())
+    if not ids:
+        return True
+    return artifact_store is not None and all(artifact_store.touch(i) for i in ids)
+
+def link_artifacts(entry, base_url):
+    """entry 裡的圖 (artifact id) -> shap_local 的 <名稱>_url；每次回應都重新簽章"""
+    artifacts = entry.get("artifacts")
+    if not artifacts:
+        return entry["result"]
+    result = dict(entry["result"])
+    shap_local = dict(result.get("shap_local") or {})
+    for name, artifact_id in artifacts.items():
+        shap_local[f"{name}_url"] = base_url + artifact_store.signed_path(artifact_id)
+    result["shap_local"] = shap_local
+    return result
+
+def top_contributors(explanation, feature_names, k=3):
+    """取出 |SHAP| 最大的前 k 個特徵"""
+    values = np.asarray(explanation.values)
+    order = np.argsort(-np.abs(values))[:k]
+    return [{"feature": feature_names[i], "shap": float(values[i])} for i in order]
+
+def require_admin(token):
+    if not ADMIN_TOKEN or token != ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Forbidden")
 
 # ---------------------------------------------------------
 # 3. 定義 API 輸入格式 (NHANES Codes)
@@ -218,78 +262,129 @@ class InputData(BaseModel):
 # ---------------------------------------------------------
 # 4. API 路由
 # ---------------------------------------------------------
+def etag_matches(if_none_match, etag):
+    """If-None-Match 是否包含這個 ETag (弱比較，* 代表任何版本)"""
+    if not if_none_match:
+        return False
+    return if_none_match.strip() == "*" or etag in [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+
+
 # API 1: 傳送全域解釋圖給前端
-@app.get("/global_shap")
-def get_global_shap():
-    return shap_plots  # 直接回傳 base64 字串
+# 圖只會隨模型改變：ETag 用模型版本，前端帶 If-None-Match 來重新驗證時回 304 (不必再傳 ~300 KB)
+# 內容在啟動時就序列化好，每次 request 不必重新轉 JSON
+GLOBAL_SHAP_ETAG = f'"{MODEL_VERSION}"'
+GLOBAL_SHAP_BODY = json.dumps(shap_plots).encode("utf-8")
 
 
-# API 2: 預測 (這是原本的 predict，我們要加入單一解釋邏輯)
-@app.post("/predict")
-def predict(data: InputData):
-    # A. 轉 DataFrame
-    input_dict = data.dict()
-    df = pd.DataFrame([input_dict])
+@app.get("/global_shap")
+def get_global_shap(if_none_match: Optional[str] = Header(None)):
+    headers = {"ETag": GLOBAL_SHAP_ETAG, "Cache-Control": "no-cache", "X-Model-Version": MODEL_VERSION}
+    if etag_matches(if_none_match, GLOBAL_SHAP_ETAG):
+        return Response(status_code=304, headers=headers)
+    return Response(GLOBAL_SHAP_BODY, media_type="application/json", headers=headers)
 
-    # B. 清洗特殊代碼 (7, 9 -> NaN)
-    for group, cols in pipeline["nan_map"].items():
-        vals = pipeline["nan_values"][group]
-        for c in cols:
-            if c in df.columns:
-                df[c] = df[c].replace(vals, np.nan)
 
-    # C. 填補與特徵工程
-    df = apply_imputation(df, stats)
+# explain=trees 用的樹數：< 1 回 422，超過模型的樹數當作全部
+NTrees = Annotated[int, Query(ge=1)]
 
-    # D. Rename & Drop
-    drop_cols = ['SLD012', 'SLD010H', 'BPXDI1', 'BPXDI2', 'BPXDI3', 'BPXSY1', 'BPXSY2', 'BPXSY3']
-    df = df.drop(columns=drop_cols, errors='ignore')
-    df = df.rename(columns=pipeline["rename_dict"])
 
-    # E. Scaling
-    cols_to_scale = pipeline["minmax_cols"]
-    df[cols_to_scale] = scaler.transform(df[cols_to_scale])
+# API 2: 預測 (這是原本的 predict，我們要加入單一解釋邏輯)
+@app.post("/predict")
+def predict(data: InputData, response: Response = None, request: Request = None, explain: str = "exact",
+            n_trees: NTrees = DEFAULT_TREES):
+    if explain not in EXPLAIN_MODES:
+        raise HTTPException(status_code=400, detail=f"explain must be one of {EXPLAIN_MODES}")
+    # 超過模型樹數的 n_trees 都等於用全部的樹：先換成實際的數字 (快取 key 也用它)
+    n_trees = effective_trees(model, n_trees)
+    timer = StageTimer()
 
-    # F. Encoding & Alignment
-    cols_to_encode = pipeline["onehot_cols"]
-    df = pd.get_dummies(df, columns=cols_to_encode)
-    # 補齊缺少的欄位 (重要！)
-    df = df.reindex(columns=pipeline["final_columns"], fill_value=0)
+    # A. 轉 DataFrame
+    input_dict = data.dict()
+    # 指定 float：整欄都是 None 時才會是 NaN 而不是 object (否則 np.sqrt 等運算會失敗)
+    df = pd.DataFrame([input_dict], dtype=float)
+
+    # 檢查範圍與類別代碼，不合法就不進模型
+    with timer.stage("validation"):
+        _, errors = input_schema.validate_frame(df)
+    if errors:
+        raise HTTPException(status_code=422, detail={"errors": errors, "schema_version": SCHEMA_VERSION})
+
+    # 更新漂移監控的 sketch (特殊代碼與 None 都算缺值)
+    if drift_monitor is not None:
+        drift_monitor.update(input_dict)
+
+    # 快取：同樣的輸入、同一個模型版本直接回傳上次的結果
+    key = None
+    if result_cache is not None:
+        key = cache_key(input_dict, MODEL_VERSION, explain if explain != "trees" else f"trees{n_trees}")
+        with timer.stage("cache_get"):
+            cached = result_cache.get(key)
+        # 快取的結果裡的圖已經過期或被淘汰：重算一次
+        if cached is not None and artifacts_alive(cached):
+            return finish_predict(timer, response, input_dict, cached, "hit", public_base_url(request))
+
+    # B ~ F. 清洗特殊代碼、填補、Rename & Drop、Scaling、Encoding (inference.py)
+    df = transform(df, pipeline, timer)
 
     # G. 預測
     # 1. 預測機率
     # predict_proba 回傳 [[不患病機率, 患病機率]]
-    prob = model.predict_proba(df)[0][1]
+    with timer.stage("predict_proba"):
+        prob = model.predict_proba(df)[0][1]
     
     # 2. 計算這個人的 SHAP (Local Explanation)
     # 注意：TreeExplainer 速度很快，算一筆沒問題
+    # explain 模式：exact (TreeSHAP + 圖)、approx / trees (只回傳前幾名特徵，不畫圖)、none
     shap_data = {}
-    try:
-        # 計算 SHAP values
-        shap_values_local = explainer(df, check_additivity=False)
+    artifacts = {}  # 放進 artifact store 的圖 {名稱: artifact id}，回應時換成簽章網址
+    top_features = []
+    if explain == "exact":
+        try:
+            # 計算 SHAP values
+            with timer.stage("shap"):
+                shap_values_local = explainer(df, check_additivity=False)
         
-        # XGBoost 的 output 通常只有一維 (不像 Random Forest 有 Class 0/1)
-        # 如果是二元分類，XGBoost TreeExplainer 預設輸出 log-odds
+            # XGBoost 的 output 通常只有一維 (不像 Random Forest 有 Class 0/1)
+            # 如果是二元分類，XGBoost TreeExplainer 預設輸出 log-odds
         
-        # 處理單筆資料 (取出第 0 筆)
-        single_explanation = shap_values_local[0]
-
-        # 1. 繪製 Waterfall Plot (存成圖片)
-        fig_waterfall = plt.figure(figsize=(8, 6))
-        shap.plots.waterfall(single_explanation, show=False, max_display=10)
-        shap_data["waterfall"] = plot_to_base64(fig_waterfall)
-
-        # 2. 繪製 Force Plot (存成 HTML)
-        force_plot = shap.plots.force(
-            single_explanation, 
-            matplotlib=False
-        )
-        shap_data["force_html"] = f"<head>{shap.getjs()}</head><body>{force_plot.html()}</body>"
+            # 處理單筆資料 (取出第 0 筆)
+            single_explanation = shap_values_local[0]
+            top_features = top_contributors(single_explanation, list(df.columns))
+
+            # 1. 繪製 Waterfall Plot (存成圖片)
+            with timer.stage("waterfall"):
+                fig_waterfall = plt.figure(figsize=(8, 6))
+                shap.plots.waterfall(single_explanation, show=False, max_display=10)
+                png = plot_to_png(fig_waterfall)
+                artifact_id = artifact_store.put(png, "image/png") if artifact_store is not None else None
+                if artifact_id:
+                    artifacts["waterfall"] = artifact_id
+                else:
+                    shap_data["waterfall"] = base64.b64encode(png).decode("utf-8")
+
+            # 2. 繪製 Force Plot (存成 HTML)
+            with timer.stage("force_plot"):
+                force_plot = shap.plots.force(
+                    single_explanation, 
+                    matplotlib=False
+                )
+                force_html = force_plot.html()
+            with timer.stage("getjs"):
+                page = f"<head>{shap.getjs()}</head><body>{force_html}</body>"
+                artifact_id = (artifact_store.put(page.encode("utf-8"), "text/html; charset=utf-8")
+                               if artifact_store is not None else None)
+                if artifact_id:
+                    artifacts["force_html"] = artifact_id
+                else:
+                    shap_data["force_html"] = page
         
-    except Exception as e:
-        print(f"SHAP Error: {e}")
-        shap_data["error"] = str(e)
-    
+        except Exception as e:
+            log.exception(f"SHAP Error: {e}")
+            shap_data["error"] = str(e)
+    elif explain != "none":
+        with timer.stage("contribs"):
+            values, _ = contributions(model, df, explain, n_trees)
+        top_features = explain_top_features(values, list(df.columns))[0]
 
     # H. 產生建議 (這是加分題！前後端分離的好處)
     advice = []
@@ -305,4 +400,180 @@ def predict(data: InputData):
     # 3. 執行你原本的「分組邏輯」 (因為現在只有一筆，邏輯要微調或封裝成函式)
     # 為了簡化 Demo，這裡可以直接回傳最重要的特徵名稱
     # 若要完整復刻你的分組邏輯，建議把那段 base_map 的程式碼封裝成函式放在這裡呼叫
-    return {"probability": float(prob), "advice": advice, "shap_local": shap_data}
+    entry = {
+        "result": {
+            "probability": float(prob), "advice": advice, "shap_local": shap_data,
+            "explanation": {"mode": explain, "top_features": top_features},
+        },
+        "top_features": top_features,
+        "artifacts": artifacts,
+    }
+    # SHAP 失敗的結果不快取，下次再算一次
+    if key is not None and "error" not in shap_data:
+        with timer.stage("cache_set"):
+            result_cache.set(key, entry)
+    return finish_predict(timer, response, input_dict, entry, "miss" if key else None, public_base_url(request))
+
+
+# API 2b: 即時預覽用的輕量預測 (填表時前端會呼叫很多次)
+#   只做驗證 + transform + predict_proba：不算 SHAP、不畫圖、不寫稽核紀錄、不更新漂移監控
+#   同時處理的 request 超過 LITE_MAX_INFLIGHT 就直接回 503，不排隊、不佔住 /predict 的資源
+@app.post("/predict_lite")
+def predict_lite(data: InputData, response: Response):
+    if not lite_slots.acquire(blocking=False):
+        raise HTTPException(status_code=503, detail="Preview is busy, try again later",
+                            headers={"Retry-After": "5"})
+    try:
+        input_dict = data.dict()
+        df = pd.DataFrame([input_dict], dtype=float)
+        _, errors = input_schema.validate_frame(df)
+        if errors:
+            raise HTTPException(status_code=422, detail={"errors": errors, "schema_version": SCHEMA_VERSION})
+
+        key = result = None
+        if result_cache is not None:
+            key = cache_key(input_dict, MODEL_VERSION, "lite")
+            result = result_cache.get(key)
+            response.headers["X-Cache"] = "miss" if result is None else "hit"
+        if result is None:
+            result = {"probability": float(predict_proba(model, transform(df, pipeline))[0])}
+            if key is not None:
+                result_cache.set(key, result)
+    finally:
+        lite_slots.release()
+
+    response.headers["X-Model-Version"] = MODEL_VERSION
+    return result
+
+
+def finish_predict(timer, response, input_dict, entry, cache_status, base_url=""):
+    """/predict 的收尾 (算完或快取命中都一樣)：稽核紀錄、耗時、header"""
+    # I. 寫入稽核紀錄 (只是放進佇列，真正寫檔在背景執行緒)
+    if prediction_log is not None:
+        prediction_log.record(input_dict, MODEL_VERSION, entry["result"]["probability"], entry["top_features"])
+
+    # J. 記錄各階段耗時，並用 Server-Timing header 回傳給前端
+    timer.finish(stage_metrics)
+    context = trace_context_var.get()
+    if span_exporter is not None and context is not None:
+        span_exporter.export(stage_spans(timer, *context))
+    if response is not None:
+        response.headers["Server-Timing"] = timer.server_timing()
+        response.headers["Timing-Allow-Origin"] = "*"
+        # 前端用模型版本判斷手上的全域解釋圖是否還有效
+        response.headers["X-Model-Version"] = MODEL_VERSION
+        # 前端用欄位目錄版本判斷手上的輸入頁規格是否還有效
+        response.headers["X-Schema-Version"] = SCHEMA_VERSION
+        if cache_status:
+            response.headers["X-Cache"] = cache_status
+    return link_artifacts(entry, base_url)
+
+
+
+# API 2c: 個人解釋圖 (waterfall PNG、force plot HTML；/predict 回傳的簽章網址，瀏覽器直接拿，不經過前端)
+#   簽章錯 403、網址過期 410、圖已過期或被淘汰 404
+@app.get("/artifacts/{artifact_id}")
+def get_artifact(artifact_id: str, expires: int, sig: str):
+    if artifact_store is None:
+        raise HTTPException(status_code=404, detail="Artifact store is disabled")
+    try:
+        body, media_type, expires = artifact_store.open(artifact_id, expires, sig)
+    except ArtifactError as e:
+        raise HTTPException(status_code=e.status, detail=str(e))
+    # 同一個網址的內容不會變：到期前瀏覽器直接用快取
+    max_age = max(int(expires - time.time()), 0)
+    return Response(body, media_type=media_type,
+                    headers={"Cache-Control": f"private, max-age={max_age}, immutable", "ETag": f'"{artifact_id}"',
+                             "X-Content-Type-Options": "nosniff"})
+
+
+# API 3: 查詢最近的預測紀錄 (需要 X-Admin-Token)
+@app.get("/admin/predictions")
+def recent_predictions(limit: int = 50, x_admin_token: Optional[str] = Header(None)):
+    require_admin(x_admin_token)
+    if prediction_log is None:
+        raise HTTPException(status_code=404, detail="Prediction log is disabled")
+    return {"stats": prediction_log.stats(), "records": prediction_log.recent(limit)}
+
+
+# API 4: 線上輸入分佈與訓練資料的漂移分數 (需要 X-Admin-Token)
+@app.get("/admin/drift")
+def drift_report(x_admin_token: Optional[str] = Header(None)):
+    require_admin(x_admin_token)
+    if drift_monitor is None:
+        raise HTTPException(status_code=404, detail="Drift monitor is disabled")
+    return drift_monitor.report()
+
+
+# API 5: Prometheus 格式的各階段延遲直方圖
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    return PlainTextResponse(stage_metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+# API 6: 記憶體診斷 (RSS、matplotlib figure 數、tracemalloc 差異；需要 X-Admin-Token)
+@app.get("/admin/memory")
+def memory_report(top: int = 15, objects: bool = False, x_admin_token: Optional[str] = Header(None)):
+    require_admin(x_admin_token)
+    return diagnostics.report(top=top, objects=objects)
+
+
+@app.post("/admin/memory/baseline")
+def memory_baseline(x_admin_token: Optional[str] = Header(None)):
+    require_admin(x_admin_token)
+    diagnostics.reset_baseline()
+    return {"tracemalloc": diagnostics.enabled()}
+
+
+# API 7: 輸入欄位規格 (型別、上下限、類別代碼；前端依此產生輸入元件)
+@app.get("/schema")
+def get_schema():
+    return schema_document(input_fields)
+
+
+# API 7b: 欄位目錄 (驗證規格 + 標籤、區塊、選項文字；前端整個輸入頁依此產生)
+#   ETag 是目錄版本，前端每個 process 只下載一次，版本變了 (/predict 的 X-Schema-Version) 才重新下載
+FIELD_CATALOG_ETAG = f'"{SCHEMA_VERSION}"'
+FIELD_CATALOG_BODY = json.dumps(catalog_document(input_fields)).encode("utf-8")
+
+
+@app.get("/field_catalog")
+def get_field_catalog(if_none_match: Optional[str] = Header(None)):
+    headers = {"ETag": FIELD_CATALOG_ETAG, "Cache-Control": "no-cache", "X-Schema-Version": SCHEMA_VERSION}
+    if etag_matches(if_none_match, FIELD_CATALOG_ETAG):
+        return Response(status_code=304, headers=headers)
+    return Response(FIELD_CATALOG_BODY, media_type="application/json", headers=headers)
+
+
+# API 8: 預測結果快取的命中率 (需要 X-Admin-Token)
+@app.get("/admin/cache")
+def cache_stats(x_admin_token: Optional[str] = Header(None)):
+    require_admin(x_admin_token)
+    if result_cache is None:
+        raise HTTPException(status_code=404, detail="Result cache is disabled")
+    stats = result_cache.stats()
+    if artifact_store is not None:
+        stats["artifacts"] = artifact_store.stats()
+    return stats
+
+
+# API 9: 大量 CSV 評分 (request body 是 NHANES 代碼的 CSV；結果邊算邊串流回去)
+#   curl -X POST --data-binary @clinic.csv -H "Content-Type: text/csv" \
+#        "http://localhost:8000/predict_csv?format=ndjson&chunksize=5000"
+#   加上 explain=approx (或 trees / exact) 時每列附上前 3 名特徵
+@app.post("/predict_csv")
+async def predict_csv(request: Request, format: str = "ndjson", chunksize: int = 5000, id_column: str = "SEQN",
+                      explain: str = "none", n_trees: NTrees = DEFAULT_TREES):
+    if format not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {FORMATS}")
+    if explain not in EXPLAIN_MODES:
+        raise HTTPException(status_code=400, detail=f"explain must be one of {EXPLAIN_MODES}")
+    n_trees = effective_trees(model, n_trees)
+    # 上傳內容一邊收一邊交給 parser (UploadPipe)，每讀滿一塊就評分、串流回去，不等整個檔案
+    upload = UploadPipe()
+    body = stream_results(upload, pipeline, model, input_schema, format, chunksize,
+                          id_column, MODEL_VERSION, explain, n_trees, drift_monitor)
+    if format == "csv":
+        return UploadStreamingResponse(body, request, upload, media_type="text/csv",
+                                       headers={"Content-Disposition": 'attachment; filename="predictions.csv"'})
+    return UploadStreamingResponse(body, request, upload, media_type="application/x-ndjson")
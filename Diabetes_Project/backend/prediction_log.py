@@ -0,0 +1,210 @@
+"""
+預測稽核紀錄 (Prediction Audit Log)
+
+每一次 /predict 都要留下紀錄 (輸入代碼、模型版本、機率、主要貢獻特徵)，
+但不能讓寫檔的延遲落在 request 上：
+    request 執行緒只把紀錄丟進有上限的記憶體佇列 (record)，
+    背景執行緒再整批寫進 SQLite (WAL 模式，寫入時不擋讀取)。
+"""
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+# 佇列滿了的處理方式
+#   drop  : 直接丟掉這筆並計數 (不影響 request 延遲)
+#   block : 最多等 block_timeout 秒，讓 request 承受背壓 (backpressure)
+POLICIES = ("drop", "block")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS predictions (
+    id            INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts            REAL    NOT NULL,
+    model_version TEXT    NOT NULL,
+    probability   REAL    NOT NULL,
+    inputs        TEXT    NOT NULL,
+    top_features  TEXT    NOT NULL
+)
+"""
+
+_STOP = object()  # 通知背景執行緒結束用的哨兵
+
+log = logging.getLogger("healthshield.prediction_log")
+
+
+class PredictionLog:
+    """只能附加 (append-only) 的預測紀錄，批次寫入 SQLite"""
+
+    def __init__(self, db_path, max_queue=10000, batch_size=256,
+                 flush_interval=1.0, policy="drop", block_timeout=0.05):
+        if policy not in POLICIES:
+            raise ValueError(f"未知的 policy: {policy} (可用: {POLICIES})")
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.policy = policy
+        self.block_timeout = block_timeout
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._lock = threading.Lock()
+        self.written = 0
+        self.dropped = 0
+
+        conn = self._connect()
+        conn.execute(_SCHEMA)
+        conn.commit()
+        conn.close()
+
+    @classmethod
+    def from_env(cls):
+        """依環境變數建立；沒設定 PREDICTION_LOG_PATH 就回傳 None (不啟用)"""
+        path = os.getenv("PREDICTION_LOG_PATH")
+        if not path:
+            return None
+        return cls(
+            path,
+            max_queue=int(os.getenv("PREDICTION_LOG_QUEUE", "10000")),
+            batch_size=int(os.getenv("PREDICTION_LOG_BATCH", "256")),
+            flush_interval=float(os.getenv("PREDICTION_LOG_FLUSH_SEC", "1.0")),
+            policy=os.getenv("PREDICTION_LOG_POLICY", "drop"),
+        )
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    # ---------------------------------------------------------
+    # 生命週期
+    # ---------------------------------------------------------
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="prediction-log", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=5.0):
+        """送出哨兵，讓背景執行緒把佇列內剩下的紀錄寫完再結束"""
+        if self._thread is None:
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        self._thread = None
+
+    # ---------------------------------------------------------
+    # Hot path：只做 enqueue
+    # ---------------------------------------------------------
+    def record(self, inputs, model_version, probability, top_features):
+        """加入一筆紀錄；回傳 False 代表被丟棄"""
+        item = (time.time(), model_version, float(probability), inputs, top_features)
+        try:
+            if self.policy == "block":
+                self._queue.put(item, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(item)
+            return True
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+
+    # ---------------------------------------------------------
+    # 背景寫入
+    # ---------------------------------------------------------
+    def _run(self):
+        conn = self._connect()
+        batch = []
+        stopping = False
+        while not stopping:
+            deadline = time.monotonic() + self.flush_interval
+            # 收集到 batch_size 筆或超過 flush_interval 就寫一次
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            if stopping:
+                # 結束前把佇列清空
+                while True:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is not _STOP:
+                        batch.append(item)
+
+            if batch:
+                self._flush(conn, batch)
+                batch = []
+        conn.close()
+
+    def _flush(self, conn, batch):
+        rows = [
+            (ts, version, prob, json.dumps(inputs), json.dumps(top))
+            for ts, version, prob, inputs, top in batch
+        ]
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT INTO predictions (ts, model_version, probability, inputs, top_features) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    rows,
+                )
+            with self._lock:
+                self.written += len(rows)
+        except sqlite3.Error as e:
+            # 寫入失敗不能讓背景執行緒掛掉，計入 dropped
+            log.error("Prediction log write failed: %s", e, extra={"rows": len(rows)})
+            with self._lock:
+                self.dropped += len(rows)
+
+    # ---------------------------------------------------------
+    # 查詢
+    # ---------------------------------------------------------
+    def recent(self, limit=50, model_version=None):
+        """取最近 limit 筆已寫入的紀錄 (新的在前)"""
+        sql = "SELECT id, ts, model_version, probability, inputs, top_features FROM predictions"
+        params = []
+        if model_version:
+            sql += " WHERE model_version = ?"
+            params.append(model_version)
+        sql += " ORDER BY id DESC LIMIT ?"
+        params.append(int(limit))
+
+        conn = sqlite3.connect(self.db_path)
+        try:
+            rows = conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+        return [
+            {
+                "id": rid,
+                "ts": ts,
+                "model_version": version,
+                "probability": prob,
+                "inputs": json.loads(inputs),
+                "top_features": json.loads(top),
+            }
+            for rid, ts, version, prob, inputs, top in rows
+        ]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "queued": self._queue.qsize(),
+                "written": self.written,
+                "dropped": self.dropped,
+                "policy": self.policy,
+            }
@@ -0,0 +1,157 @@
+"""
+本機用的 Redis 協定 (RESP2) 替身，只給測試與 benchmark 用
+
+    python resp_server.py --port 6380
+    RESULT_CACHE=redis://127.0.0.1:6380/0 uvicorn main:app
+
+支援 result_cache.RespCache 會用到的指令：
+    PING ECHO AUTH SELECT GET MGET SET (EX/PX) EXPIRE DEL EXISTS DBSIZE FLUSHDB FLUSHALL INFO QUIT
+資料只放在記憶體，過期的 key 在讀到時才刪除。
+"""
+import argparse
+import asyncio
+import threading
+import time
+
+
+class Store:
+    def __init__(self):
+        self.data = {}  # key -> (value, expire_at 或 None)
+        self.commands = 0
+
+    def get(self, key):
+        entry = self.data.get(key)
+        if entry is None:
+            return None
+        value, expire_at = entry
+        if expire_at is not None and expire_at < time.monotonic():
+            del self.data[key]
+            return None
+        return value
+
+
+def _bulk(value):
+    if value is None:
+        return b"$-1\r\n"
+    return b"$%d\r\n%s\r\n" % (len(value), value)
+
+
+def _array(values):
+    return b"*%d\r\n" % len(values) + b"".join(_bulk(v) for v in values)
+
+
+def _error(msg):
+    return f"-ERR {msg}\r\n".encode()
+
+
+def handle(store, args):
+    """執行一個指令，回傳 RESP 編碼的回覆"""
+    store.commands += 1
+    cmd = args[0].upper()
+    if cmd == b"PING":
+        return b"+PONG\r\n" if len(args) == 1 else _bulk(args[1])
+    if cmd == b"ECHO":
+        return _bulk(args[1])
+    if cmd in (b"AUTH", b"SELECT"):
+        return b"+OK\r\n"
+    if cmd == b"GET":
+        return _bulk(store.get(args[1]))
+    if cmd == b"MGET":
+        return _array([store.get(k) for k in args[1:]])
+    if cmd == b"SET":
+        expire_at = None
+        opts = [a.upper() for a in args[3:]]
+        for i, opt in enumerate(opts):
+            if opt in (b"EX", b"PX"):
+                try:
+                    amount = int(args[4 + i])
+                except (IndexError, ValueError):
+                    return _error("syntax error")
+                expire_at = time.monotonic() + (amount if opt == b"EX" else amount / 1000)
+        store.data[args[1]] = (args[2], expire_at)
+        return b"+OK\r\n"
+    if cmd == b"EXPIRE":
+        if store.get(args[1]) is None:
+            return b":0\r\n"
+        store.data[args[1]] = (store.data[args[1]][0], time.monotonic() + int(args[2]))
+        return b":1\r\n"
+    if cmd == b"DEL":
+        return b":%d\r\n" % sum(store.data.pop(k, None) is not None for k in args[1:])
+    if cmd == b"EXISTS":
+        return b":%d\r\n" % sum(store.get(k) is not None for k in args[1:])
+    if cmd == b"DBSIZE":
+        return b":%d\r\n" % len(store.data)
+    if cmd in (b"FLUSHDB", b"FLUSHALL"):
+        store.data.clear()
+        return b"+OK\r\n"
+    if cmd == b"INFO":
+        return _bulk(f"# Stats\r\ntotal_commands_processed:{store.commands}\r\nkeys:{len(store.data)}\r\n".encode())
+    return _error(f"unknown command '{cmd.decode(errors='replace')}'")
+
+
+async def _read_command(reader):
+    line = await reader.readline()
+    if not line:
+        return None
+    if not line.startswith(b"*"):
+        return line.split()  # inline 指令 (例如 telnet 直接打 PING)
+    args = []
+    for _ in range(int(line[1:-2])):
+        header = await reader.readline()
+        n = int(header[1:-2])
+        args.append((await reader.readexactly(n + 2))[:-2])
+    return args
+
+
+def make_handler(store):
+    async def serve(reader, writer):
+        try:
+            while True:
+                args = await _read_command(reader)
+                if not args:
+                    break
+                if args[0].upper() == b"QUIT":
+                    writer.write(b"+OK\r\n")
+                    break
+                writer.write(handle(store, args))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+    return serve
+
+
+async def serve_forever(host, port, store=None, started=None):
+    store = store or Store()
+    server = await asyncio.start_server(make_handler(store), host, port)
+    if started is not None:
+        started.set()
+    async with server:
+        await server.serve_forever()
+
+
+def start_in_thread(host="127.0.0.1", port=6380):
+    """在背景執行緒啟動 (benchmark 用)，回傳 Store 方便檢查內容"""
+    store = Store()
+    started = threading.Event()
+    thread = threading.Thread(
+        target=lambda: asyncio.run(serve_forever(host, port, store, started)),
+        name="resp-server", daemon=True,
+    )
+    thread.start()
+    started.wait(5)
+    return store
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本機 Redis 協定替身")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6380)
+    args = parser.parse_args()
+    print(f"🚀 RESP server listening on {args.host}:{args.port}")
+    asyncio.run(serve_forever(args.host, args.port))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,312 @@
+"""
+預測結果快取 (同樣的輸入、同一個模型版本 -> 直接回傳上次的結果)
+
+Cloud Run 會開好幾個 backend instance，各自的記憶體快取命中率低、又重複佔空間，
+所以快取做成可替換的後端：
+    MemoryCache   單一 process 內的 LRU + TTL
+    RespCache     共用的 key-value 服務 (Redis 協定，RESP2)，所有 instance 共用
+                  批次讀寫用 pipeline (MGET / 多個 SET 一次送出)，值以 zlib 壓縮
+
+key 內含模型版本 (healthshield:<model_version>:predict:<explain 模式>:<輸入的 sha256>)，
+換模型後舊結果不會被讀到，只會在 TTL 到期後自然消失。
+快取服務掛掉時一律當作 miss (fail open)，並暫停連線 retry_after 秒。
+
+設定 (環境變數)：
+    RESULT_CACHE        off (預設) | memory | redis://[:password@]host:port/db
+    RESULT_CACHE_TTL    秒數，預設 3600
+    RESULT_CACHE_MAX    memory 模式的最大筆數，預設 10000
+"""
+import hashlib
+import json
+import logging
+import os
+import queue
+import socket
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+log = logging.getLogger("healthshield.result_cache")
+
+KEY_PREFIX = "healthshield"
+
+
+def cache_key(inputs, model_version, variant="exact"):
+    """
+    輸入 (dict) 的標準化 JSON 雜湊；None 與 NaN 視為相同
+    variant 區分同一組輸入的不同回應 (例如 explain 模式)
+    """
+    canonical = {k: (None if v is None or v != v else float(v)) for k, v in inputs.items()}
+    digest = hashlib.sha256(json.dumps(canonical, sort_keys=True).encode()).hexdigest()
+    return f"{KEY_PREFIX}:{model_version}:predict:{variant}:{digest}"
+
+
+def encode_value(value, level=6):
+    return zlib.compress(json.dumps(value, separators=(",", ":")).encode("utf-8"), level)
+
+
+def decode_value(data):
+    return json.loads(zlib.decompress(data).decode("utf-8"))
+
+
+class ResultCache:
+    """快取介面；子類別實作 get_many / set_many"""
+
+    def __init__(self, ttl=3600):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self._stats_lock = threading.Lock()
+
+    def get_many(self, keys):
+        """回傳與 keys 同長度的 list，沒有的位置是 None"""
+        raise NotImplementedError
+
+    def set_many(self, items):
+        """items: {key: value}，使用 self.ttl"""
+        raise NotImplementedError
+
+    def get(self, key):
+        return self.get_many([key])[0]
+
+    def set(self, key, value):
+        self.set_many({key: value})
+
+    def _count(self, values):
+        hits = sum(v is not None for v in values)
+        with self._stats_lock:
+            self.hits += hits
+            self.misses += len(values) - hits
+
+    def stats(self):
+        with self._stats_lock:
+            total = self.hits + self.misses
+            return {
+                "backend": type(self).__name__,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "errors": self.errors,
+                "hit_rate": round(self.hits / total, 4) if total else None,
+            }
+
+    def close(self):
+        pass
+
+
+class MemoryCache(ResultCache):
+    """process 內的 LRU；過期的項目在讀到時才移除"""
+
+    def __init__(self, max_entries=10000, ttl=3600):
+        super().__init__(ttl)
+        self.max_entries = max_entries
+        self._data = OrderedDict()  # key -> (expire_at, value)
+        self._lock = threading.Lock()
+
+    def get_many(self, keys):
+        now = time.monotonic()
+        out = []
+        with self._lock:
+            for key in keys:
+                entry = self._data.get(key)
+                if entry is None or entry[0] < now:
+                    if entry is not None:
+                        del self._data[key]
+                    out.append(None)
+                else:
+                    self._data.move_to_end(key)
+                    out.append(entry[1])
+        self._count(out)
+        return out
+
+    def set_many(self, items):
+        expire_at = time.monotonic() + self.ttl
+        with self._lock:
+            for key, value in items.items():
+                self._data[key] = (expire_at, value)
+                self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def stats(self):
+        out = super().stats()
+        with self._lock:
+            out["entries"] = len(self._data)
+        return out
+
+
+# ---------------------------------------------------------
+# Redis 協定 (RESP2) 的最小 client
+# ---------------------------------------------------------
+class RespError(Exception):
+    """服務端回傳的 -ERR"""
+
+
+def encode_command(*args):
+    out = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        if isinstance(arg, str):
+            arg = arg.encode("utf-8")
+        elif isinstance(arg, int):
+            arg = str(arg).encode()
+        out.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+    return b"".join(out)
+
+
+def read_reply(f):
+    line = f.readline()
+    if not line:
+        raise ConnectionError("connection closed")
+    kind, rest = line[:1], line[1:-2]
+    if kind == b"+":
+        return rest.decode()
+    if kind == b"-":
+        raise RespError(rest.decode())
+    if kind == b":":
+        return int(rest)
+    if kind == b"$":
+        n = int(rest)
+        if n < 0:
+            return None
+        data = f.read(n + 2)
+        return data[:-2]
+    if kind == b"*":
+        n = int(rest)
+        return None if n < 0 else [read_reply(f) for _ in range(n)]
+    raise ConnectionError(f"unexpected reply: {line!r}")
+
+
+class _Connection:
+    def __init__(self, host, port, timeout, password, db):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.file = self.sock.makefile("rb")
+        setup = []
+        if password:
+            setup.append(("AUTH", password))
+        if db:
+            setup.append(("SELECT", db))
+        if setup:
+            self.execute(setup)
+
+    def execute(self, commands):
+        """pipeline：一次送出全部指令，再依序讀回覆"""
+        self.sock.sendall(b"".join(encode_command(*c) for c in commands))
+        replies = []
+        error = None
+        for _ in commands:
+            try:
+                replies.append(read_reply(self.file))
+            except RespError as e:  # 讀完剩下的回覆，連線才能重用
+                error = error or e
+                replies.append(None)
+        if error is not None:
+            raise error
+        return replies
+
+    def close(self):
+        try:
+            self.file.close()
+            self.sock.close()
+        except OSError:
+            pass
+
+
+class RespCache(ResultCache):
+    """共用快取 (Redis 或相容的服務)；連線池 + pipeline + zlib"""
+
+    def __init__(self, host="127.0.0.1", port=6379, db=0, password=None, ttl=3600,
+                 timeout=0.5, pool_size=8, retry_after=5.0, compress_level=6):
+        super().__init__(ttl)
+        self.host, self.port, self.db, self.password = host, port, db, password
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self.compress_level = compress_level
+        self._pool = queue.LifoQueue(maxsize=pool_size)
+        self._down_until = 0.0
+
+    @classmethod
+    def from_url(cls, url, **kwargs):
+        u = urlparse(url)
+        db = int(u.path.lstrip("/") or 0)
+        return cls(host=u.hostname or "127.0.0.1", port=u.port or 6379, db=db,
+                   password=u.password, **kwargs)
+
+    def _acquire(self):
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            return _Connection(self.host, self.port, self.timeout, self.password, self.db)
+
+    def _release(self, conn):
+        try:
+            self._pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def execute(self, commands):
+        """執行一組 pipeline；失敗回傳 None (並暫停 retry_after 秒不再連線)
+        artifact_store.RespArtifactStore 也用這個 (同樣的連線池與 fail open)"""
+        if time.monotonic() < self._down_until:
+            return None
+        conn = None
+        try:
+            conn = self._acquire()
+            replies = conn.execute(commands)
+            self._release(conn)
+            return replies
+        except (OSError, RespError) as e:
+            if conn is not None:
+                conn.close()
+            with self._stats_lock:
+                self.errors += 1
+            self._down_until = time.monotonic() + self.retry_after
+            log.warning("Result cache unavailable: %s", e)
+            return None
+
+    def get_many(self, keys):
+        if not keys:
+            return []
+        replies = self.execute([("MGET", *keys)])
+        out = [None] * len(keys)
+        if replies is not None:
+            for i, data in enumerate(replies[0]):
+                if data is not None:
+                    try:
+                        out[i] = decode_value(data)
+                    except (zlib.error, ValueError):
+                        pass  # 壞掉的值當作 miss
+        self._count(out)
+        return out
+
+    def set_many(self, items):
+        if not items:
+            return
+        ttl = max(1, int(self.ttl))
+        self.execute([
+            ("SET", key, encode_value(value, self.compress_level), "EX", ttl)
+            for key, value in items.items()
+        ])
+
+    def close(self):
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+def from_env():
+    """依 RESULT_CACHE 建立；off 或沒設定回傳 None"""
+    spec = os.getenv("RESULT_CACHE", "off").strip()
+    ttl = float(os.getenv("RESULT_CACHE_TTL", "3600"))
+    if spec in ("", "off", "0"):
+        return None
+    if spec == "memory":
+        return MemoryCache(max_entries=int(os.getenv("RESULT_CACHE_MAX", "10000")), ttl=ttl)
+    if spec.startswith("redis://"):
+        return RespCache.from_url(spec, ttl=ttl)
+    raise ValueError(f"未知的 RESULT_CACHE: {spec}")
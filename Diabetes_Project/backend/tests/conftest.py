@@ -0,0 +1,5 @@
+"""從 backend/ 執行：python -m pytest tests"""
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
@@ -0,0 +1,68 @@
+import socket
+from urllib.parse import urlparse
+
+import pytest
+import requests
+
+import artifact_store
+import resp_server
+from benchmarks.common import COMPLETE_PROFILE
+from benchmarks.result_cache import start_instances
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def test_default_is_inline_unless_a_shared_store_and_secret_are_configured(monkeypatch):
+    for name in ("RESULT_CACHE", "ARTIFACT_STORE", "ARTIFACT_SECRET"):
+        monkeypatch.delenv(name, raising=False)
+    assert artifact_store.from_env() is None
+
+    monkeypatch.setenv("RESULT_CACHE", "redis://127.0.0.1:6399/0")
+    assert artifact_store.from_env() is None
+    monkeypatch.setenv("ARTIFACT_SECRET", "s")
+    assert isinstance(artifact_store.from_env(), artifact_store.RespArtifactStore)
+
+
+@pytest.mark.parametrize("env", [
+    {"ARTIFACT_STORE": "memory"},
+    {"ARTIFACT_STORE": "redis://127.0.0.1:6399/0"},
+    {"ARTIFACT_STORE": "memory", "ARTIFACT_SECRET": "s", "RESULT_CACHE": "redis://127.0.0.1:6399/0"},
+])
+def test_refuses_to_start_without_a_secret_or_with_memory_behind_a_shared_cache(monkeypatch, env):
+    for name in ("RESULT_CACHE", "ARTIFACT_STORE", "ARTIFACT_SECRET"):
+        monkeypatch.delenv(name, raising=False)
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    with pytest.raises(ValueError):
+        artifact_store.from_env()
+
+
+def test_instance_b_serves_the_hit_and_the_image_stored_by_instance_a():
+    pytest.importorskip("main")
+    resp_port = free_port()
+    resp_server.start_in_thread(port=resp_port)
+    procs, (url_a, url_b) = start_instances(2, free_port(), f"redis://127.0.0.1:{resp_port}/0")
+    try:
+        a = requests.post(f"{url_a}/predict", json=COMPLETE_PROFILE, timeout=60)
+        assert a.headers["X-Cache"] == "miss"
+        b = requests.post(f"{url_b}/predict", json=COMPLETE_PROFILE, timeout=60)
+        assert b.headers["X-Cache"] == "hit"
+
+        shap_local = b.json()["shap_local"]
+        assert urlparse(shap_local["waterfall_url"]).port == urlparse(url_b).port
+        image = requests.get(shap_local["waterfall_url"], timeout=10)
+        assert image.status_code == 200
+        assert image.headers["Content-Type"] == "image/png"
+        assert requests.get(shap_local["force_html_url"], timeout=10).status_code == 200
+
+        # A 簽的網址拿到 B 也能用 (同一把金鑰、同一個存放區)
+        signed_by_a = urlparse(a.json()["shap_local"]["waterfall_url"])
+        assert requests.get(f"{url_b}{signed_by_a.path}?{signed_by_a.query}", timeout=10).content == image.content
+    finally:
+        for p in procs:
+            p.terminate()
+            p.wait()
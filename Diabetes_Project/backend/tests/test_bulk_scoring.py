@@ -0,0 +1,119 @@
+import io
+import socket
+import threading
+import time
+
+import pandas as pd
+import pytest
+import uvicorn
+
+from benchmarks.common import COMPLETE_PROFILE
+from bulk_scoring import stream_results
+
+backend = pytest.importorskip("main")
+
+
+def malformed_upload():
+    """第一塊 (2 列) 正常，第二塊有一列多了欄位 (C parser 讀到第二塊時丟出 ParserError)"""
+    header = ",".join(COMPLETE_PROFILE)
+    row = ",".join("" if v is None else str(v) for v in COMPLETE_PROFILE.values())
+    lines = [header, row, row, row, row + ",1", row]
+    return io.BytesIO(("\n".join(lines) + "\n").encode("utf-8"))
+
+
+def run(fmt):
+    body = b"".join(stream_results(malformed_upload(), backend.pipeline, backend.model, backend.input_schema,
+                                   fmt=fmt, chunksize=2))
+    return body.decode("utf-8")
+
+
+def test_csv_output_marks_a_parse_error_mid_stream():
+    df = pd.read_csv(io.StringIO(run("csv")), dtype=str)
+    assert df["row"].tolist()[:2] == ["0", "1"]
+    assert df["row"].iloc[-1] == "error"
+    assert "CSV parse error after 2 rows" in df["errors"].iloc[-1]
+
+
+def test_ndjson_output_reports_a_parse_error_mid_stream():
+    assert '"error": "CSV parse error after 2 rows' in run("ndjson").splitlines()[-1]
+
+
+def upload(rows):
+    return io.BytesIO(pd.DataFrame(rows).to_csv(index=False).encode("utf-8"))
+
+
+def probabilities(rows):
+    body = b"".join(stream_results(upload(rows), backend.pipeline, backend.model, backend.input_schema, fmt="csv"))
+    return pd.read_csv(io.BytesIO(body))["probability"].tolist()
+
+
+def test_raw_nhanes_columns_are_derived_like_batch_score():
+    base = {k: v for k, v in COMPLETE_PROFILE.items() if k not in ("systolic_avg", "diastolic_avg", "Sleep_Hours")}
+    raw = dict(base, BPXSY1=130, BPXSY2=132, BPXSY3=134, BPXDI1=82, BPXDI2=84, BPXDI3=86, SLD012=6.5)
+    complete, derived, imputed = probabilities([COMPLETE_PROFILE, raw, base])
+    assert derived == pytest.approx(complete)
+    assert imputed != pytest.approx(complete)
+
+
+def test_unexpected_error_mid_stream_is_marked(monkeypatch):
+    import bulk_scoring
+
+    score_chunk = bulk_scoring.score_chunk
+    calls = []
+
+    def flaky(*args, **kwargs):
+        calls.append(1)
+        if len(calls) == 2:
+            raise RuntimeError("boom")
+        return score_chunk(*args, **kwargs)
+
+    monkeypatch.setattr(bulk_scoring, "score_chunk", flaky)
+    body = b"".join(stream_results(upload([COMPLETE_PROFILE] * 4), backend.pipeline, backend.model,
+                                   backend.input_schema, fmt="csv", chunksize=2))
+    df = pd.read_csv(io.BytesIO(body), dtype=str)
+    assert df["row"].tolist() == ["0", "1", "error"]
+    assert "Scoring failed after 2 rows: RuntimeError: boom" in df["errors"].iloc[-1]
+
+
+@pytest.fixture
+def server():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    srv = uvicorn.Server(uvicorn.Config(backend.app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=srv.run, daemon=True)
+    thread.start()
+    while not srv.started:
+        time.sleep(0.05)
+    yield port
+    srv.should_exit = True
+    thread.join(10)
+
+
+def read_until(sock, received, marker, timeout=30):
+    deadline = time.time() + timeout
+    while marker not in received:
+        sock.settimeout(max(deadline - time.time(), 0.01))
+        part = sock.recv(65536)
+        assert part, "connection closed"
+        received += part
+    return received
+
+
+def test_results_stream_back_while_the_upload_is_still_being_sent(server):
+    header = ",".join(COMPLETE_PROFILE).encode()
+    row = ",".join(str(v) for v in COMPLETE_PROFILE.values()).encode()
+    first = header + b"\n" + (row + b"\n") * 6000  # 超過 parser 一次讀的 256 KB
+    rest = (row + b"\n") * 1000
+
+    def chunk(data):
+        return b"%x\r\n%s\r\n" % (len(data), data)
+
+    with socket.create_connection(("127.0.0.1", server)) as sock:
+        sock.sendall(b"POST /predict_csv?chunksize=500 HTTP/1.1\r\nHost: test\r\n"
+                     b"Content-Type: text/csv\r\nTransfer-Encoding: chunked\r\n\r\n" + chunk(first))
+        # 上傳還沒結束就收到結果
+        received = read_until(sock, b"", b'"progress"')
+        sock.sendall(chunk(rest) + b"0\r\n\r\n")
+        received = read_until(sock, received, b'"summary"')
+    assert b'"rows_read": 7000' in received
@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import drift_monitor
+from benchmarks.common import COMPLETE_PROFILE
+from drift_monitor import DriftMonitor, HistogramSketch, _load_training_inputs, build_reference_profile
+
+
+def training_sample(n=5000, seed=0):
+    """年齡像 NHANES 一樣在 80 歲截頂 (80 以上都記成 80)"""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "RIDAGEYR": np.minimum(rng.integers(18, 95, n), 80).astype(float),
+        "LBXGH": rng.normal(5.7, 0.8, n).round(1),
+        "RIAGENDR": rng.choice([1.0, 2.0], n),
+    })
+
+
+def test_top_edge_counts_in_last_bin():
+    sketch = HistogramSketch([0.0, 1.0, 2.0])
+    sketch.update(2.0)
+    sketch.update_array([2.0, 2.5])
+    assert sketch.counts == [0, 0, 2, 1]
+
+
+def test_training_sample_has_no_drift():
+    df = training_sample()
+    profile = build_reference_profile(df)
+
+    per_row = DriftMonitor(profile)
+    for record in df.to_dict("records"):
+        per_row.update(record)
+    batch = DriftMonitor(profile)
+    batch.update_frame(df)
+
+    for monitor in (per_row, batch):
+        report = monitor.report()["numeric"]
+        for col in ("RIDAGEYR", "LBXGH"):
+            assert report[col]["psi"] < 1e-3, (col, report[col])
+            assert report[col]["ks"] < 1e-6, (col, report[col])
+
+
+def test_sleep_reference_uses_both_raw_columns(tmp_path):
+    path = tmp_path / "nhanes.csv"
+    pd.DataFrame({"SLD012": [7.5, None, None], "SLD010H": [None, 6.0, None]}).to_csv(path, index=False)
+    df = _load_training_inputs(path, {"nan_map": {}, "nan_values": {}})
+    assert df["Sleep_Hours"].tolist()[:2] == [7.5, 6.0]
+    assert np.isnan(df["Sleep_Hours"].iloc[2])
+
+
+def test_the_shipped_reference_profile_gives_drift_scores():
+    backend = pytest.importorskip("main")
+    reference = drift_monitor.load_reference()
+    monitor = drift_monitor.DriftMonitor.from_pipeline(backend.pipeline, reference)
+    assert set(reference["numeric"]) == set(drift_monitor.NUMERIC_FEATURES)
+    monitor.update(dict(COMPLETE_PROFILE))
+    report = monitor.report()
+    assert report["has_reference"]
+    assert "psi" in report["numeric"]["LBXGH"] and "psi" in report["categorical"]["HUQ010"]
+
+
+def test_bulk_chunks_feed_the_monitor(monkeypatch):
+    backend = pytest.importorskip("main")
+    from fastapi.testclient import TestClient
+
+    monitor = drift_monitor.DriftMonitor.from_pipeline(backend.pipeline, drift_monitor.load_reference())
+    monkeypatch.setattr(backend, "drift_monitor", monitor)
+    raw = {k: v for k, v in COMPLETE_PROFILE.items() if k != "Sleep_Hours"}
+    rows = [dict(COMPLETE_PROFILE), dict(raw, SLD012=7.5), dict(COMPLETE_PROFILE, HUQ010=9), dict(raw, RIDAGEYR=-1)]
+    body = pd.DataFrame(rows).to_csv(index=False).encode()
+    r = TestClient(backend.app).post("/predict_csv", params={"chunksize": 2}, content=body)
+    assert r.status_code == 200
+    report = monitor.report()
+    assert report["numeric"]["RIDAGEYR"]["n"] == 3  # 驗證不過的列不算
+    assert report["numeric"]["Sleep_Hours"]["missing_rate"] == 0  # SLD012 併進 Sleep_Hours
+    assert report["categorical"]["HUQ010"]["missing_rate"] == pytest.approx(1 / 3)  # 9 是不知道
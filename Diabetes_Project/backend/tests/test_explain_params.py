@@ -0,0 +1,30 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from benchmarks.common import COMPLETE_PROFILE
+from result_cache import MemoryCache
+
+backend = pytest.importorskip("main")
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(backend, "result_cache", MemoryCache())
+    return TestClient(backend.app)
+
+
+@pytest.mark.parametrize("n_trees", [0, -5])
+def test_n_trees_below_one_is_rejected(client, n_trees):
+    r = client.post("/predict", params={"explain": "trees", "n_trees": n_trees}, json=COMPLETE_PROFILE)
+    assert r.status_code == 422
+    r = client.post("/predict_csv", params={"explain": "trees", "n_trees": n_trees}, content=b"RIDAGEYR\n50\n")
+    assert r.status_code == 422
+
+
+def test_n_trees_above_the_model_shares_one_cache_entry(client):
+    total = backend.model.get_booster().num_boosted_rounds()
+    first = client.post("/predict", params={"explain": "trees", "n_trees": total + 100}, json=COMPLETE_PROFILE)
+    second = client.post("/predict", params={"explain": "trees", "n_trees": total}, json=COMPLETE_PROFILE)
+    assert first.headers["X-Cache"] == "miss"
+    assert second.headers["X-Cache"] == "hit"
+    assert first.json() == second.json()
@@ -0,0 +1,24 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from benchmarks.common import COMPLETE_PROFILE
+from inference import nan_codes
+
+backend = pytest.importorskip("main")
+
+
+def test_missing_codes_come_from_the_bundle_nan_map():
+    codes = nan_codes(backend.pipeline)
+    fields = {f["code"]: f for f in backend.input_fields}
+    for code in ("SMQ020", "MCQ300C", "HUQ010", "PAQ665", "ALQ130"):
+        assert fields[code]["missing_codes"] == codes[code]
+    assert {77, 99, 7777, 9999} <= set(fields["HUQ010"]["missing_codes"])
+
+
+@pytest.mark.parametrize("field, value", [("SMQ020", 77), ("MCQ300C", 999), ("HUQ010", 9999), ("ALQ130", 999)])
+def test_refusal_codes_reach_clean_nan_codes_instead_of_a_422(field, value):
+    client = TestClient(backend.app)
+    r = client.post("/predict", params={"explain": "none"}, json=dict(COMPLETE_PROFILE, **{field: value}))
+    assert r.status_code == 200, r.text
+    unknown = client.post("/predict", params={"explain": "none"}, json=dict(COMPLETE_PROFILE, **{field: None}))
+    assert r.json()["probability"] == pytest.approx(unknown.json()["probability"])
@@ -0,0 +1,65 @@
+import json
+import logging
+import queue
+
+import log_config
+from log_config import DebugSampler, JsonFormatter, NonBlockingQueueHandler, request_id_var
+
+
+def make_record(level=logging.INFO, msg="Prediction done", args=(), **extra):
+    record = logging.LogRecord("healthshield.app", level, __file__, 1, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_json_formatter_outputs_one_line_with_the_extra_fields():
+    record = make_record(request_id="abc", probability=0.42, model_version="8971c629c62f")
+    line = JsonFormatter().format(record)
+    assert "\n" not in line
+    entry = json.loads(line)
+    assert {k: entry[k] for k in ("level", "logger", "request_id", "msg")} == {
+        "level": "INFO", "logger": "healthshield.app", "request_id": "abc", "msg": "Prediction done"}
+    assert entry["probability"] == 0.42
+    assert entry["model_version"] == "8971c629c62f"
+    assert "args" not in entry and "levelno" not in entry
+
+
+def test_json_formatter_keeps_non_ascii_and_exception_text():
+    record = make_record(msg="✅ 模型載入成功", exc_text="Traceback ...\nValueError: bad", path=object())
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry["msg"] == "✅ 模型載入成功"
+    assert entry["exc"].endswith("ValueError: bad")
+    assert entry["request_id"] == "-"
+    assert entry["path"].startswith("<object")  # 無法序列化的值轉成字串
+
+
+def test_debug_sampler_only_samples_debug(monkeypatch):
+    sampler = DebugSampler(0.25)
+    monkeypatch.setattr(log_config.random, "random", lambda: 0.5)
+    assert not sampler.filter(make_record(logging.DEBUG))
+    assert sampler.filter(make_record(logging.INFO))
+    assert sampler.filter(make_record(logging.WARNING))
+    monkeypatch.setattr(log_config.random, "random", lambda: 0.1)
+    assert sampler.filter(make_record(logging.DEBUG))
+    assert not DebugSampler(0.0).filter(make_record(logging.DEBUG))
+
+
+def test_queue_handler_stamps_the_request_id_and_drops_when_full():
+    handler = NonBlockingQueueHandler(queue.Queue(maxsize=1))
+    token = request_id_var.set("req-1")
+    try:
+        handler.handle(make_record(msg="%d rows", args=(3,)))
+        handler.handle(make_record())
+    finally:
+        request_id_var.reset(token)
+
+    record = handler.queue.get_nowait()
+    assert record.request_id == "req-1"
+    assert (record.msg, record.args) == ("3 rows", None)
+    assert handler.dropped == 1
+
+
+def test_parse_levels_ignores_malformed_items():
+    assert log_config._parse_levels("healthshield.shap=warning, bad, =DEBUG,healthshield.imputation=DEBUG") == {
+        "healthshield.shap": "WARNING", "healthshield.imputation": "DEBUG"}
+    assert log_config._parse_levels(None) == {}
@@ -0,0 +1,54 @@
+import pytest
+
+from metrics import Histogram, StageMetrics, StageTimer
+
+
+def test_histogram_puts_a_value_on_a_bucket_edge_in_that_bucket():
+    hist = Histogram(buckets=(0.1, 1.0))
+    for seconds in (0.05, 0.1, 0.5, 3.0):
+        hist.observe(seconds)
+    assert hist.counts == [2, 1, 1]
+    assert hist.count == 4
+    assert hist.sum == pytest.approx(3.65)
+
+
+def test_render_is_cumulative_per_stage():
+    metrics = StageMetrics()
+    metrics.observe_many([("imputation", 0.0002), ("imputation", 0.003), ("shap", 7.0)])
+    lines = metrics.render().splitlines()
+
+    assert lines[:2] == ["# HELP healthshield_stage_seconds Latency of each /predict pipeline stage in seconds",
+                         "# TYPE healthshield_stage_seconds histogram"]
+    assert 'healthshield_stage_seconds_bucket{stage="imputation",le="0.00025"} 1' in lines
+    assert 'healthshield_stage_seconds_bucket{stage="imputation",le="0.0025"} 1' in lines
+    assert 'healthshield_stage_seconds_bucket{stage="imputation",le="0.005"} 2' in lines
+    assert 'healthshield_stage_seconds_bucket{stage="imputation",le="+Inf"} 2' in lines
+    assert 'healthshield_stage_seconds_count{stage="imputation"} 2' in lines
+    # 超過最大 bucket 的只算在 +Inf
+    assert 'healthshield_stage_seconds_bucket{stage="shap",le="5.0"} 0' in lines
+    assert 'healthshield_stage_seconds_bucket{stage="shap",le="+Inf"} 1' in lines
+    assert 'healthshield_stage_seconds_sum{stage="shap"} 7.0' in lines
+    # stage 依名稱排序
+    stages = [line.split('stage="')[1].split('"')[0] for line in lines[2:]]
+    assert stages == sorted(stages)
+
+
+def test_timer_records_stages_in_order_and_adds_the_total_on_finish():
+    timer = StageTimer()
+    with timer.stage("clean_nan_codes"):
+        pass
+    with pytest.raises(RuntimeError):
+        with timer.stage("predict_proba"):
+            raise RuntimeError("model failed")  # 失敗的步驟也要計時
+    metrics = StageMetrics()
+    timer.finish(metrics)
+
+    assert [name for name, _ in timer.durations] == ["clean_nan_codes", "predict_proba", "total"]
+    assert len(timer.starts) == 3
+    assert 'healthshield_stage_seconds_count{stage="total"} 1' in metrics.render()
+
+
+def test_server_timing_is_in_milliseconds():
+    timer = StageTimer()
+    timer.durations = [("imputation", 0.00231), ("predict_proba", 0.00087)]
+    assert timer.server_timing() == "imputation;dur=2.31, predict_proba;dur=0.87"
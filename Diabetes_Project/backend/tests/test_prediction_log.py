@@ -0,0 +1,44 @@
+import time
+
+import pytest
+
+from prediction_log import PredictionLog
+
+
+def make_log(tmp_path, **kwargs):
+    return PredictionLog(str(tmp_path / "predictions.db"), **kwargs)
+
+
+def test_unknown_policy_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        make_log(tmp_path, policy="wait")
+
+
+def test_drop_policy_counts_records_that_do_not_fit(tmp_path):
+    log = make_log(tmp_path, max_queue=2)  # 沒有 start：佇列不會被消化
+    assert [log.record({"RIDAGEYR": 50}, "v1", 0.5, []) for _ in range(3)] == [True, True, False]
+    assert log.stats() == {"queued": 2, "written": 0, "dropped": 1, "policy": "drop"}
+
+
+def test_block_policy_waits_up_to_the_timeout_before_dropping(tmp_path):
+    log = make_log(tmp_path, max_queue=1, policy="block", block_timeout=0.2)
+    assert log.record({}, "v1", 0.5, [])
+    t0 = time.perf_counter()
+    assert not log.record({}, "v1", 0.5, [])
+    assert time.perf_counter() - t0 >= 0.2
+    assert log.stats()["dropped"] == 1
+
+
+def test_stop_flushes_records_still_waiting_for_a_batch(tmp_path):
+    # 批次很大、間隔很長：只有 stop 會讓這些紀錄寫進去
+    log = make_log(tmp_path, batch_size=1000, flush_interval=60)
+    log.start()
+    for i in range(5):
+        log.record({"RIDAGEYR": 40 + i}, "v2" if i % 2 else "v1", i / 10, [{"feature": "LBXGH"}])
+    log.stop()
+
+    assert log.stats()["written"] == 5
+    rows = log.recent(limit=10)
+    assert [r["inputs"]["RIDAGEYR"] for r in rows] == [44, 43, 42, 41, 40]
+    assert rows[0]["top_features"] == [{"feature": "LBXGH"}]
+    assert [r["probability"] for r in log.recent(model_version="v2")] == [0.3, 0.1]
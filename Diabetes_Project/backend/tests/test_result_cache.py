@@ -0,0 +1,76 @@
+import socket
+
+import result_cache
+import resp_server
+from result_cache import MemoryCache, RespCache, cache_key
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def test_cache_key_ignores_order_and_treats_none_and_nan_alike():
+    key = cache_key({"RIDAGEYR": 50, "LBXGH": None}, "v1")
+    assert key == cache_key({"LBXGH": float("nan"), "RIDAGEYR": 50.0}, "v1")
+    assert key.startswith("healthshield:v1:predict:exact:")
+    assert key != cache_key({"RIDAGEYR": 50, "LBXGH": None}, "v2")
+    assert key != cache_key({"RIDAGEYR": 50, "LBXGH": None}, "v1", variant="none")
+    assert key != cache_key({"RIDAGEYR": 50, "LBXGH": 5.7}, "v1")
+
+
+def test_memory_cache_evicts_the_least_recently_used():
+    cache = MemoryCache(max_entries=2)
+    cache.set_many({"a": 1, "b": 2})
+    assert cache.get("a") == 1  # a 變成最近用過
+    cache.set("c", 3)
+    assert cache.get_many(["a", "b", "c"]) == [1, None, 3]
+    assert cache.stats()["entries"] == 2
+    assert (cache.hits, cache.misses) == (3, 1)
+
+
+def test_memory_cache_expires_entries_on_read(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(result_cache.time, "monotonic", lambda: now[0])
+    cache = MemoryCache(ttl=10)
+    cache.set("a", {"probability": 0.4})
+    now[0] = 109.0
+    assert cache.get("a") == {"probability": 0.4}
+    now[0] = 111.0
+    assert cache.get("a") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_resp_cache_round_trip_and_corrupt_values_are_misses():
+    port = free_port()
+    resp_server.start_in_thread(port=port)
+    cache = RespCache(port=port, ttl=60)
+    try:
+        cache.set_many({"a": {"probability": 0.4}, "b": [1, 2]})
+        assert cache.get_many(["a", "b", "missing"]) == [{"probability": 0.4}, [1, 2], None]
+        cache.execute([("SET", "bad", b"not zlib")])
+        assert cache.get("bad") is None
+        assert cache.stats()["hit_rate"] == 0.5
+    finally:
+        cache.close()
+
+
+def test_resp_cache_fails_open_and_backs_off(monkeypatch):
+    cache = RespCache(port=free_port(), retry_after=30)  # 沒有服務在聽
+    assert cache.get("a") is None
+    cache.set("a", 1)  # 不丟例外
+    assert cache.errors == 1
+
+    attempts = []
+    monkeypatch.setattr(cache, "_acquire", lambda: attempts.append(1))
+    assert cache.get_many(["a", "b"]) == [None, None]
+    assert attempts == []  # retry_after 內不再連線
+
+    def refused():
+        raise ConnectionRefusedError("refused")
+
+    monkeypatch.setattr(cache, "_down_until", 0.0)
+    monkeypatch.setattr(cache, "_acquire", refused)
+    assert cache.get("a") is None
+    assert cache.errors == 2
@@ -0,0 +1,14 @@
+import random
+
+import pandas as pd
+
+from benchmarks.soak import synthetic_request
+from field_schema import compile_schema
+
+
+def test_synthetic_requests_pass_schema_validation():
+    schema = compile_schema()
+    rng = random.Random(0)
+    rows = [synthetic_request(rng) for _ in range(300)]
+    _, errors = schema.validate_frame(pd.DataFrame(rows, dtype=float))
+    assert errors == []
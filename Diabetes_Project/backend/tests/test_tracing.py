@@ -0,0 +1,54 @@
+import json
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import bulk_scoring
+from benchmarks.common import COMPLETE_PROFILE
+from log_config import request_id_var
+from tracing import SpanExporter
+
+backend = pytest.importorskip("main")
+
+
+def test_shutdown_flushes_buffered_spans(tmp_path, monkeypatch):
+    path = tmp_path / "spans.jsonl"
+    exporter = SpanExporter(path=str(path))
+    write = exporter._write
+    monkeypatch.setattr(exporter, "_write", lambda payload: (time.sleep(0.5), write(payload)))  # 慢的 collector
+    monkeypatch.setattr(backend, "span_exporter", exporter)
+    with TestClient(backend.app) as client:
+        for trace_id in ("1" * 32, "3" * 32):
+            client.get("/schema", headers={"traceparent": f"00-{trace_id}-{'2' * 16}-01"})
+    # 第二個 span 還在佇列裡：lifespan 結束時就要寫完
+    spans = [span for line in path.read_text().splitlines()
+             for span in json.loads(line)["resourceSpans"][0]["scopeSpans"][0]["spans"]]
+    assert sorted(s["traceId"] for s in spans) == ["1" * 32, "3" * 32]
+
+
+def test_streamed_response_keeps_the_span_and_request_id_until_the_last_chunk(monkeypatch):
+    class Collect:
+        spans = []
+
+        def export(self, spans):
+            self.spans.extend(spans)
+
+    score_chunk = bulk_scoring.score_chunk
+    seen = []
+
+    def slow(*args, **kwargs):
+        time.sleep(0.2)
+        seen.append(request_id_var.get())
+        return score_chunk(*args, **kwargs)
+
+    monkeypatch.setattr(backend, "span_exporter", Collect())
+    monkeypatch.setattr(bulk_scoring, "score_chunk", slow)
+    header = ",".join(COMPLETE_PROFILE)
+    row = ",".join(str(v) for v in COMPLETE_PROFILE.values())
+    r = TestClient(backend.app).post("/predict_csv", params={"chunksize": 1}, headers={"X-Request-ID": "bulk-1"},
+                                     content="\n".join([header] + [row] * 3) + "\n")
+    assert r.headers["X-Request-ID"] == "bulk-1"
+    assert seen == ["bulk-1"] * 3
+    span, = [s for s in Collect.spans if s["name"] == "POST /predict_csv"]
+    assert int(span["endTimeUnixNano"]) - int(span["startTimeUnixNano"]) >= 0.6e9
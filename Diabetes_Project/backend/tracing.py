@@ -0,0 +1,159 @@
+"""
+分散式追蹤 (Streamlit -> FastAPI)
+
+前端在每次「Get My Prediction」產生一組 W3C trace context，透過 `traceparent`
+header 送到後端。後端為每個 request 建一個 server span，/predict 的每個 stage
+(StageTimer 記錄的) 再各自成為子 span。
+
+span 以 OTLP/JSON 格式輸出 (每行一個 ExportTraceServiceRequest，與 OpenTelemetry
+Collector 的 file exporter / otlpjsonfile receiver 相同)，由背景執行緒寫入：
+    TRACE_EXPORT_FILE   寫到本機檔案 (例如 traces/backend.jsonl)
+    TRACE_EXPORT_URL    POST 到 collector 的 OTLP/HTTP JSON 端點 (例如 http://collector:4318/v1/traces)
+兩者都沒設定就不追蹤。離線重建 waterfall 用 ../trace_waterfall.py。
+"""
+import contextvars
+import json
+import logging
+import os
+import queue
+import secrets
+import threading
+import urllib.request
+
+SERVICE_NAME = "healthshield-backend"
+
+log = logging.getLogger("healthshield.tracing")
+
+# 目前 request 的 (trace_id, server_span_id)
+trace_context_var = contextvars.ContextVar("trace_context", default=None)
+
+
+def new_trace_id():
+    return secrets.token_hex(16)
+
+
+def new_span_id():
+    return secrets.token_hex(8)
+
+
+def parse_traceparent(header):
+    """`00-<trace_id>-<parent_span_id>-<flags>` -> (trace_id, parent_span_id)；格式不對回傳 None"""
+    if not header:
+        return None
+    parts = header.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    trace_id, parent_id = parts[1].lower(), parts[2].lower()
+    if trace_id == "0" * 32 or parent_id == "0" * 16:
+        return None
+    return trace_id, parent_id
+
+
+def make_span(name, trace_id, span_id, parent_span_id, start_ns, end_ns, attributes=None, kind=1):
+    """OTLP/JSON 的 span (kind：1=INTERNAL、2=SERVER、3=CLIENT)"""
+    return {
+        "traceId": trace_id,
+        "spanId": span_id,
+        "parentSpanId": parent_span_id or "",
+        "name": name,
+        "kind": kind,
+        "startTimeUnixNano": str(start_ns),
+        "endTimeUnixNano": str(end_ns),
+        "attributes": [
+            {"key": k, "value": {"stringValue": str(v)}} for k, v in (attributes or {}).items()
+        ],
+    }
+
+
+def otlp_payload(spans, service_name=SERVICE_NAME):
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": service_name}}]},
+            "scopeSpans": [{"scope": {"name": "healthshield"}, "spans": spans}],
+        }]
+    }
+
+
+class SpanExporter:
+    """背景執行緒批次輸出 span；request 端只做 put_nowait (滿了就丟)"""
+
+    def __init__(self, path=None, url=None, max_queue=10000, flush_interval=1.0):
+        self.path = path
+        self.url = url
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self.dropped = 0
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def from_env(cls):
+        path = os.getenv("TRACE_EXPORT_FILE")
+        url = os.getenv("TRACE_EXPORT_URL")
+        if not path and not url:
+            return None
+        return cls(path=path, url=url)
+
+    def export(self, spans):
+        try:
+            self._queue.put_nowait(spans)
+        except queue.Full:
+            self.dropped += len(spans)
+
+    def stop(self, timeout=5.0):
+        """停止背景執行緒，把佇列裡剩下的 span 寫完 (shutdown 時呼叫，否則最後一秒內的 span 會遺失)"""
+        self._stop.set()
+        self._thread.join(timeout)
+        if not self._thread.is_alive():
+            batch = self._drain()
+            if batch:
+                self._write(otlp_payload(batch))
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                batch = list(self._queue.get(timeout=self.flush_interval))
+            except queue.Empty:
+                continue
+            batch.extend(self._drain())
+            self._write(otlp_payload(batch))
+
+    def _drain(self):
+        batch = []
+        while True:
+            try:
+                batch.extend(self._queue.get_nowait())
+            except queue.Empty:
+                return batch
+
+    def _write(self, payload):
+        line = json.dumps(payload, separators=(",", ":"))
+        if self.path:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+        if self.url:
+            req = urllib.request.Request(
+                self.url, data=line.encode("utf-8"),
+                headers={"Content-Type": "application/json"}, method="POST",
+            )
+            try:
+                urllib.request.urlopen(req, timeout=5).close()
+            except OSError as e:
+                log.warning("Span export failed: %s", e)
+
+
+def stage_spans(timer, trace_id, parent_span_id):
+    """把 StageTimer 記錄的各階段轉成子 span"""
+    spans = []
+    for (name, seconds), started in zip(timer.durations, timer.starts):
+        if name == "total":
+            continue  # 總時間就是 server span 本身
+        start_ns = timer.wall_start_ns + int((started - timer.start) * 1e9)
+        spans.append(make_span(
+            f"predict.{name}", trace_id, new_span_id(), parent_span_id,
+            start_ns, start_ns + int(seconds * 1e9),
+        ))
+    return spans
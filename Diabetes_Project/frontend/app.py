@@ -4,39 +4,101 @@ import requests
 import os
 import json
 import base64
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlparse
 import streamlit.components.v1 as components
 
-# --- 1. 設定後端連線 ---
-# 從環境變數抓取，如果沒設定預設用 localhost (方便本地測試)
-# 在 Docker Compose 裡我們會設定成 http://backend:8000
-BACKEND_URL = os.getenv("BACKEND_URL", "http://localhost:8000")
-
-# --- 2. 定義欄位名稱對照表 (Frontend -> Backend NHANES Codes) ---
-# 左邊是你前端的變數名，右邊是模型訓練時用的 NHANES 代碼
-NAME_MAPPING = {
-    "age": "RIDAGEYR",
-    "gender": "RIAGENDR",
-    "height_cm": "BMXHT",
-    "weight_kg": "BMXWT",
-    "bmi": "BMXBMI",
-    "waist_cm": "BMXWAIST",
-    "systolic_avg": "systolic_avg",   # 後端這兩個是用 avg 命名的
-    "diastolic_avg": "diastolic_avg",
-    "fasting_glucose": "LBXGLU",
-    "insulin": "LBXIN",
-    "HbA1c": "LBXGH",
-    "total_cholesterol": "LBXTC",
-    "HDL": "LBDHDD",
-    "LDL": "LBDLDL",
-    "triglycerides": "LBXTR",
-    "ever_smoked": "SMQ020",
-    "alcohol_drinks": "ALQ130",
-    "moderate_activity": "PAQ665", # 或 PAQ650，視你訓練時選哪一個
-    "vigorous_activity": "PAQ650", # 或 PAQ665
-    "family_diabetes": "MCQ300C",
-    "general_health": "HUQ010",
-    "Sleep_Hours": "Sleep_Hours"
-}
+from backend_api import backend_client, field_catalog, preview_client, refresh_field_catalog
+from global_plots import GlobalPlotCache
+from live_preview import FRESH, LivePreview, PreviewBusy
+import result_store
+from tracing import SPAN_CLIENT, Trace
+
+# 這次 script run 開始的時間 (追蹤用)
+SCRIPT_START_NS = time.time_ns()
+
+# 超出這個範圍的 BMI 多半是身高或體重打錯，輸入頁會即時提醒
+BMI_PLAUSIBLE = (10.0, 80.0)
+
+# 即時風險預覽：每隔 PREVIEW_POLL 秒檢查一次輸入，停止變動 PREVIEW_DEBOUNCE 秒後才問後端
+PREVIEW_POLL = float(os.getenv("PREVIEW_POLL", "0.5"))
+PREVIEW_DEBOUNCE = float(os.getenv("PREVIEW_DEBOUNCE", "0.8"))
+
+def parse_server_timing(header):
+    """把後端的 Server-Timing header 轉成 {階段: 毫秒}"""
+    timings = {}
+    for part in (header or "").split(","):
+        name, _, params = part.strip().partition(";")
+        for p in params.split(";"):
+            key, _, value = p.strip().partition("=")
+            if key == "dur":
+                try:
+                    timings[name] = float(value)
+                except ValueError:
+                    pass
+    return timings
+
+@st.cache_resource(show_spinner=False)
+def call_executor():
+    """背景執行後端呼叫的 thread pool (所有 session 共用)"""
+    return ThreadPoolExecutor(max_workers=int(os.getenv("BACKEND_CALL_WORKERS", "8")),
+                              thread_name_prefix="backend-call")
+
+def start_call(trace, name, fn):
+    """
+    在背景開始一個後端呼叫，回傳 Future；fn(headers) 收到帶 trace context 的 header
+    (worker thread 裡不能碰 st.*，需要的值要先在這裡取好)
+    """
+    parent_id = trace.run_id
+
+    def run():
+        with trace.span(name, parent_id=parent_id, kind=SPAN_CLIENT) as span_id:
+            return fn(trace.headers(span_id))
+    return call_executor().submit(run)
+
+@st.cache_resource(show_spinner=False)
+def global_plot_cache():
+    """全域解釋圖的快取 (所有 session 共用，依模型版本 / ETag 重新驗證)"""
+    return GlobalPlotCache(backend_client())
+
+@st.cache_resource(show_spinner=False)
+def shared_result_store():
+    """個人解釋圖等大型結果的 store (所有 session 共用，有大小上限與 TTL)"""
+    return result_store.from_env()
+
+def compact_result(result):
+    """
+    把 /predict 的回應拆開：大型檔案 (waterfall PNG、force HTML) 放進 store，
+    回傳只含 result_id 與機率、建議等小欄位的 dict (放進 session state)
+    後端有 artifact store 時只回傳兩者的簽章網址 (瀏覽器直接向後端拿)，store 裡只放網址
+    """
+    result = dict(result)
+    shap_local = result.pop("shap_local", None) or {}
+    artifacts = {}
+    if shap_local.get("waterfall"):
+        artifacts["waterfall"] = base64.b64decode(shap_local["waterfall"])
+    if shap_local.get("force_html"):
+        artifacts["force_html"] = shap_local["force_html"]
+    for name in ("waterfall_url", "force_html_url"):
+        if shap_local.get(name):
+            artifacts[name] = shap_local[name]
+    result["result_id"] = shared_result_store().put(artifacts) if artifacts else None
+    return result
+
+def url_expired(url):
+    """後端簽章網址的 expires (unix 秒) 已經過了"""
+    expires = parse_qs(urlparse(url).query).get("expires")
+    return bool(expires) and float(expires[0]) < time.time()
+
+def format_validation_errors(detail, catalog):
+    """把後端 422 的欄位錯誤轉成欄位的顯示名稱，方便使用者對照"""
+    lines = []
+    for err in detail.get("errors", []):
+        field = catalog.display_name(err["field"])
+        limit = f" (limit {err['limit']:g})" if "limit" in err else ""
+        lines.append(f"- {field}: {err['error']}{limit}")
+    return "\n".join(lines)
 
 st.set_page_config(page_title="HealthShield", layout="wide")
 
@@ -61,280 +123,177 @@ if st.session_state["page"] == "input":
     )
     st.divider()
 
-    # ---------- Helper ----------
-    def number_input_with_missing(label, min_val, max_val, key, step=0.1):
-        value = st.number_input(label, min_value=min_val, max_value=max_val, value=None, step=step, key=key)
-        unknown = st.checkbox("I don't know", key=f"{key}_unknown")
-        if unknown: return None
-        return value
-
-    # ---------- Demographics ----------
-    st.header("Basic Information / 基本資料")
-    col_age, col_gender = st.columns(2)
-    with col_age:
-        age = st.number_input(
-        label="Age",
-        min_value=1,
-        max_value=120,
-        value=None, # 可以將其設為 None 讓用戶必須輸入
-        step=1,
-        key="age" # 使用新的 key
-    )
+    try:
+        catalog = field_catalog()
+    except (requests.RequestException, ValueError, KeyError) as e:
+        # 輸入頁整個是依欄位目錄產生的，拿不到就沒辦法顯示 (後端也無法預測)
+        st.error(f"Could not load the input fields from the backend / 無法取得輸入欄位: {e}")
+        st.button("Retry / 重試")
+        st.stop()
 
-    with col_gender: # 這是為了視覺上的對齊，因為 number_input_with_missing 佔用更多垂直空間
-        gender = st.selectbox("Gender / 性別", ["male", "female"], index=None)
+    # 即時風險預覽 (選用)：開著時所有欄位都放在 fragment 裡，改值就會更新側邊欄的預覽
+    live_preview_on = st.toggle("Live risk preview / 即時風險預覽", key="live_preview",
+                                help="A rough estimate from the fields filled so far, without the explanation. "
+                                     "/ 依目前已填的欄位粗估，不含解釋")
 
-    st.divider()
-    # ---------- Body Measurements ----------
-    st.header("Body Measurements / 身體測量")
-    col_h, col_w, col_bmi = st.columns(3)
-    with col_h:
-        height_cm = number_input_with_missing(
-            label="Height / 身高 (cm) ",
-            min_val=30.0,
-            max_val=250.0,
-            key="height_cm",
-            step=0.1
-        )
-
-    with col_w:
-        weight_kg = number_input_with_missing(
-            label="Weight / 體重 (kg)",
-            min_val=3.0,
-            max_val=250.0,
-            key="weight_kg",
-            step=0.1
-        )
-        
-    # 計算 BMI
-    if height_cm is not None and weight_kg is not None:
-        # BMI = 體重 (kg) / [身高 (m)]²
+    # ---------- Helper ----------
+    def compute_bmi(height_cm, weight_kg):
+        """BMI = 體重 (kg) / [身高 (m)]²；身高或體重沒填就是 None"""
+        if height_cm is None or weight_kg is None:
+            return None
         height_m = height_cm / 100
-        if height_m > 0:
-            bmi = round(weight_kg / (height_m ** 2), 1)
-        else:
-            # 避免除以零
-            bmi = 0.0
-    else:
-        bmi = None
+        return round(weight_kg / (height_m ** 2), 1) if height_m > 0 else 0.0  # 避免除以零
 
-    # 使用 st.metric 顯示 BMI 數值
-    with col_bmi:
+    def field_value(name):
+        """欄位目前的值 (從 session_state 讀，勾了 I don't know 就是 None)"""
+        if st.session_state.get(f"{name}_unknown", False):
+            return None
+        return st.session_state.get(name)
+
+    def collect_inputs():
+        """目前的輸入 {變數名: 值} (BMI 由身高體重算出)"""
+        user_input = {f["name"]: field_value(f["name"]) for f in catalog.inputs()}
+        user_input["bmi"] = compute_bmi(user_input["height_cm"], user_input["weight_kg"])
+        return user_input
+
+    def render_bmi():
+        # BMI 由身高體重算出 (同一個區塊裡，身高體重已經先畫好)
+        bmi = compute_bmi(field_value("height_cm"), field_value("weight_kg"))
         if bmi is not None:
-            st.metric(
-                label="BMI / 身體質量指數", 
-                value=bmi
-            )
+            st.metric(label="BMI / 身體質量指數", value=bmi)
         else:
-            st.metric(
-                label="BMI / 身體質量指數", 
-                value="--",
-                delta="請輸入身高/體重" # 顯示缺省符號
-            )
-
-    # 腰圍保持在下一行，因為它是獨立的測量項目
-    waist_cm = number_input_with_missing(
-        label="Waist Circumference / 腰圍 (cm)",
-        min_val=10.0,
-        max_val=200.0,
-        key="waist_cm"
-    )
+            st.metric(label="BMI / 身體質量指數", value="--", delta="請輸入身高/體重")  # 顯示缺省符號
+        # 身高或體重打錯 (例如單位弄錯) 時 BMI 會很離譜，當下就提醒
+        if bmi is not None and not BMI_PLAUSIBLE[0] <= bmi <= BMI_PLAUSIBLE[1]:
+            st.warning(f"BMI {bmi} looks unusual, please check height / weight / BMI 數值異常，請確認身高體重")
 
-    st.divider()
-    # ---------- Family & Lifestyle ----------
-    st.header("Family History & Lifestyle / 家族病史 & 生活作息")
-    c1, c2 = st.columns(2)
-    with c1:
-        family_diabetes = st.selectbox(
-        "Does a close relative have diabetes? / 您的近親是否患有糖尿病嗎？",
-        options=["yes", "no", "I don't know"],
-        index=None
-        )
-        
-        moderate_activity = st.selectbox(
-            "Do you do moderate-intensity sports or fitness activities (e.g., brisk walking, swimming) weekly? / 您每週有從事中等強度運動或健身活動嗎 (例如快走、游泳)？",
-            options=["yes", "no", "I don't know"],
-            index=None
-        )
-
-        alcohol_drinks = number_input_with_missing(
-            label="What is your average alcoholic drinks per day? / 您平均每天飲用多少酒精飲品？",
-            min_val=0.0,
-            max_val=90.0,
-            key="alcohol_drinks",
-            step=0.5
-        )
-    with c2:
-        st.write("")
-        ever_smoked = st.selectbox(
-            "Have you ever smoked? / 您是否曾經吸菸？" ,
-            options=["yes", "no", "I don't know"],
-            index=None
-        )
-
-        vigorous_activity = st.selectbox(
-            "Do you do vigorous-intensity sports or fitness activities (e.g., running, basketball) weekly? / 您每週有從事高強度運動或健身活動嗎 (例如跑步、籃球)？",
-            options=["yes", "no", "I don't know"],
-            index=None
-        )
-        
-        Sleep_Hours = number_input_with_missing(
-            label="How long do you sleep per night (hours)? / 您每晚睡眠時長（小時）是多久？",
-            min_val=0.0,
-            max_val=17.0,
-            key="Sleep_Hours",
-            step=0.1
-        )
-        
-    general_health = st.selectbox(
-        "How is your self-reported health status? (1=Poor, 5=Excellent) / 您的自評健康狀況如何？(1=差, 5=極佳)",
-        options=[
-            5,  
-            4,  
-            3,  
-            2, 
-            1, 
-            "I don't know" 
-        ],
-        index=None
-    )
-    
-    st.divider()
-    # ---------- Blood Pressure ----------
-    st.header("Blood Pressure / 血壓")
-    c3, c4 = st.columns(2)
-    with c3:
-        systolic_avg = number_input_with_missing(
-        label="Systolic Blood Pressure / 收縮壓 (mmHg)",
-        min_val=50.0,
-        max_val=250.0,
-        key="systolic_avg",
-        step=1.0
-    )
-        
-    with c4:
-        diastolic_avg = number_input_with_missing(
-        label="Diastolic Blood Pressure / 舒張壓 (mmHg)",
-        min_val=0.0,
-        max_val=140.0,
-        key="diastolic_avg",
-        step=1.0
-    )
+    def render_field(field):
+        """依欄位目錄產生一個輸入元件 (key 是前端變數名)"""
+        name = field["name"]
+        if field.get("derived") == "bmi":
+            render_bmi()
+        elif field.get("options"):
+            st.selectbox(field["label"], catalog.option_labels(field), index=None, key=name)
+        else:
+            # 上下限與間距和後端的驗證相同；整數欄位用整數輸入
+            integer = field["type"] == "integer"
+            cast = int if integer else float
+            st.number_input(field["label"],
+                            min_value=cast(field["min"]) if "min" in field else None,
+                            max_value=cast(field["max"]) if "max" in field else None,
+                            step=cast(field.get("step", 1 if integer else 0.1)), value=None, key=name)
+            if field.get("unknown", True):
+                st.checkbox(catalog.unknown_label, key=f"{name}_unknown")
 
-    st.divider()
-    # ---------- Blood Tests ----------
-    st.header("Blood Test Results / 血液檢查結果")
-    c5, c6, c7 = st.columns(3)
-    with c5:
-        fasting_glucose = number_input_with_missing(
-        label="Fasting Glucose / 空腹血糖 (mg/dL)",
-        min_val=15.0,
-        max_val=600.0,
-        key="fasting_glucose",
-        step=1.0
-        )
-
-        total_cholesterol = number_input_with_missing(
-            label="Total Cholesterol / 總膽固醇 (mg/dL)",
-            min_val=50.0,
-            max_val=850.0,
-            key="total_cholesterol",
-            step=1.0
-        )
-
-        triglycerides = number_input_with_missing(
-            label="Triglycerides / 三酸甘油脂 (mg/dL)",
-            min_val=10.0,
-            max_val=3000.0,
-            key="triglycerides",
-            step=1.0
-        )
-        
-    with c6:
-        insulin = number_input_with_missing(
-            label="Insulin / 胰島素 (µU/mL)",
-            min_val=0.0,
-            max_val=700.0,
-            key="insulin",
-            step=0.1
-        )
-
-        HDL = number_input_with_missing(
-            label="HDL Cholesterol / HDL 膽固醇 (mg/dL)",
-            min_val=5.0,
-            max_val=250.0,
-            key="HDL",
-            step=1.0
-        )
-        
-    with c7:
-        HbA1c = number_input_with_missing(
-            label="HbA1c / 糖化血色素 (%)",
-            min_val=0.0,
-            max_val=20.0,
-            key="HbA1c",
-            step=0.1
-        )
-
-        LDL = number_input_with_missing(
-            label="LDL Cholesterol / LDL 膽固醇 (mg/dL)",
-            min_val=5.0,
-            max_val=400.0,
-            key="LDL",
-            step=1.0
-        )
+    def render_section(section):
+        st.header(section["title"])
+        fields = catalog.section_fields(section["id"])
+        columns = st.columns(section.get("columns", 1))
+        for field in fields:
+            if field.get("row") != "own":
+                with columns[field.get("column", 0)]:
+                    render_field(field)
+        # 自己佔一整行的欄位放在各欄下面
+        for field in fields:
+            if field.get("row") == "own":
+                render_field(field)
+
+    # live 的區塊 (基本資料與身體測量) 放在 fragment 裡：改這些欄位只重跑這一段 (BMI 與提醒即時更新)，
+    # 其餘區塊在 st.form 裡，填寫時不會 rerun，按下送出才整頁重跑一次 (開了即時預覽就全部放在 fragment 裡)
+    @st.fragment
+    def live_sections():
+        for i, section in enumerate(s for s in catalog.sections if s.get("live") or live_preview_on):
+            if i:
+                st.divider()
+            render_section(section)
+
+    live_sections()
 
     st.divider()
-    # 收集輸入
-    user_input = {
-        "age": age, "gender": gender, "height_cm": height_cm, "weight_kg": weight_kg, "bmi": bmi,
-        "waist_cm": waist_cm, "systolic_avg": systolic_avg, "diastolic_avg": diastolic_avg,
-        "fasting_glucose": fasting_glucose, "insulin": insulin, "HbA1c": HbA1c,
-        "total_cholesterol": total_cholesterol, "HDL": HDL, "LDL": LDL, "triglycerides": triglycerides,
-        "ever_smoked": ever_smoked, "alcohol_drinks": alcohol_drinks,
-        "moderate_activity": moderate_activity, "vigorous_activity": vigorous_activity,
-        "family_diabetes": family_diabetes, "general_health": general_health, "Sleep_Hours": Sleep_Hours
-    }
-
-    # 驗證邏輯 (這裡保留你原本寫得很棒的邏輯)
-    missing_fields = []
-    for k, v in user_input.items():
-        if k == 'bmi': continue
-        if v is None and not st.session_state.get(f"{k}_unknown", False):
-            missing_fields.append(k)
-
-    if st.button("Get My Prediction → / 獲取我的預測結果 →"):
+    if live_preview_on:
+        submitted = st.button("Get My Prediction → / 獲取我的預測結果 →")
+    else:
+        with st.form("prediction_form", border=False):
+            for section in catalog.sections:
+                if not section.get("live"):
+                    render_section(section)
+                    st.divider()
+            submitted = st.form_submit_button("Get My Prediction → / 獲取我的預測結果 →")
+
+    def fetch_preview(values):
+        """POST /predict_lite；後端忙時丟出 PreviewBusy / requests.RequestException"""
+        resp = preview_client().post("/predict_lite", json=catalog.to_payload(values))
+        if resp.status_code == 503:
+            raise PreviewBusy(float(resp.headers.get("Retry-After") or 0) or None)
+        if resp.status_code == 422:
+            return None  # 輸入不合法：不顯示預覽 (送出時會看到錯誤)
+        resp.raise_for_status()
+        return resp.json()["probability"]
+
+    # 預覽的 fragment 定時重跑 (只讀輸入、查快取，真的問後端要等輸入停止變動)
+    @st.fragment(run_every=PREVIEW_POLL)
+    def live_preview_gauge():
+        st.subheader("Live risk preview / 即時風險預覽")
+        preview = st.session_state.setdefault("live_preview_state", LivePreview(debounce=PREVIEW_DEBOUNCE))
+        values = collect_inputs()
+        required = [f.get("display", f["name"]) for f in catalog.inputs()
+                    if f.get("required") and values[f["name"]] is None]
+        if required:
+            st.caption(f"Fill in {', '.join(required)} to see a preview / 請先填寫必填欄位")
+            return
+        status, prob = preview.poll(values, fetch_preview)
+        if prob is None:
+            # 還沒有任何結果 (或後端忙)：不顯示錯誤
+            st.caption("Preview not available yet / 預覽暫時無法顯示")
+            return
+        st.metric("Estimated risk / 預估風險", f"{prob * 100:.0f}%")
+        st.progress(prob)
+        st.caption("Updating... / 更新中" if status != FRESH else
+                   "Fields left blank are filled with typical values. Press the button below for the full result. "
+                   "/ 未填欄位以一般值估計，完整結果請按下方按鈕")
+
+    if live_preview_on:
+        with st.sidebar:
+            live_preview_gauge()
+
+    if submitted:
+        # 收集輸入 (只在送出時做；轉換成代碼是整個 DataFrame 一次換，與批次篩檢共用)
+        user_input = collect_inputs()
+        unknown = {f["name"]: st.session_state.get(f"{f['name']}_unknown", False) for f in catalog.inputs()}
+        missing_fields = catalog.missing(user_input, unknown)
+
         if missing_fields:
             st.error(f"Please fill: {', '.join(missing_fields)}")
         else:
-            # --- 數據清理與轉換 ---
-            cleaned = user_input.copy()
-            binary_map = {'yes': 1, 'no': 2, "I don't know": None}
-            gender_map = {'male': 1, 'female': 2}
-            
-            # 套用清理邏輯
-            for k in ["ever_smoked", "moderate_activity", "vigorous_activity", "family_diabetes"]:
-                if isinstance(cleaned[k], str): cleaned[k] = binary_map.get(cleaned[k].lower())
-            if isinstance(cleaned["gender"], str):
-                cleaned["gender"] = gender_map.get(cleaned["gender"].lower())
-            for k, v in cleaned.items():
-                if v == "I don't know": cleaned[k] = None
-
-            # ★★★ 關鍵步驟：轉換成後端看不懂的變數名稱 ★★★
-            payload = {}
-            for frontend_key, backend_key in NAME_MAPPING.items():
-                if frontend_key in cleaned:
-                    payload[backend_key] = cleaned[frontend_key]
-
-            # 呼叫 API
+            # ★★★ 關鍵步驟：轉換成後端的 NHANES 代碼 (I don't know -> null) ★★★
+            payload = catalog.to_payload(user_input)
+
+            # 呼叫 API (帶上 trace context，後端的 span 會接在這個 request 底下)
+            # 互不相依的呼叫同時開始：全域解釋圖不必等預測與換頁，結果頁只等還沒完成的部分
+            trace = Trace(start_ns=SCRIPT_START_NS)
+            client, plot_cache = backend_client(), global_plot_cache()
+            known_version = st.session_state.get("model_version")
+            plots_future = start_call(trace, "GET /global_shap",
+                                      lambda headers: plot_cache.get(known_version, headers=headers))
+            predict_future = start_call(trace, "POST /predict",
+                                        lambda headers: client.post("/predict", json=payload, headers=headers))
             try:
                 with st.spinner("Analyzing with AI Model..."):
-                    response = requests.post(f"{BACKEND_URL}/predict", json=payload)
+                    response = predict_future.result()
+                # 後端的欄位目錄換版本了：下次 rerun 重新下載
+                refresh_field_catalog(response.headers.get("X-Schema-Version"))
                 
                 if response.status_code == 200:
-                    st.session_state["prediction_result"] = response.json()
+                    st.session_state["global_plots_future"] = plots_future
+                    st.session_state["prediction_result"] = compact_result(response.json())
+                    st.session_state["server_timing"] = parse_server_timing(response.headers.get("Server-Timing"))
+                    st.session_state["model_version"] = response.headers.get("X-Model-Version")
                     st.session_state["page"] = "result" # 跳轉頁面
+                    trace.end_run("streamlit.input_run")
+                    st.session_state["trace"] = trace  # 結果頁畫完再輸出
                     st.rerun() # 強制刷新
+                elif response.status_code == 422 and isinstance(response.json().get("detail"), dict):
+                    st.error("Some values are out of range / 部分數值超出範圍:\n" + format_validation_errors(response.json()["detail"], catalog))
                 else:
                     st.error(f"Backend Error: {response.text}")
             except Exception as e:
@@ -345,6 +304,9 @@ if st.session_state["page"] == "input":
 # ==========================================
 elif st.session_state["page"] == "result":
     res = st.session_state["prediction_result"]
+    trace = st.session_state.get("trace")
+    if trace is not None:
+        trace.start_run(SCRIPT_START_NS)
     
     st.button("← Back to Calculator / 回到前一頁", on_click=lambda: st.session_state.update({"page": "input"}))
     
@@ -372,13 +334,19 @@ elif st.session_state["page"] == "result":
         st.subheader("📋 Recommendations / 建議")
         for item in res["advice"]: st.info(item)
 
-    # SHAP 圖表
-    if "shap_local" in res:
+    # SHAP 圖表 (從 result store 取；過期或被淘汰就請使用者重新預測)
+    shap_data = shared_result_store().get(res.get("result_id"))
+    # 後端的簽章網址過期了 (ARTIFACT_TTL)：瀏覽器拿不到圖，一樣請使用者重新預測
+    if shap_data and any(url_expired(v) for k, v in shap_data.items() if k.endswith("_url")):
+        shap_data = None
+    if res.get("result_id") and shap_data is None:
+        st.markdown("---")
+        st.info("This explanation has expired, please run the prediction again. / 個人解釋圖已過期，請重新預測")
+    elif shap_data is not None:
         st.markdown("---")
         st.header("🔍 Why this result? (AI Explanation) / 個人風險分析")
         st.markdown("Understanding the key factors driving this prediction. / 了解影響糖尿病的重要因素")
         
-        shap_data = res["shap_local"]
         tab1, tab2 = st.tabs(["Waterfall Plot (Factor Contribution) / 風險累積圖", "Force Plot (Risk Push/Pull) / 風險拔河圖"])
         
         with tab1:
@@ -394,8 +362,10 @@ elif st.session_state["page"] == "result":
             """)
             
             if "waterfall" in shap_data:
-                img = base64.b64decode(shap_data['waterfall'])
-                st.image(img, width="stretch")
+                st.image(shap_data['waterfall'], width="stretch")
+            elif "waterfall_url" in shap_data:
+                # 瀏覽器直接向後端拿圖 (不經過 Streamlit)
+                st.image(shap_data['waterfall_url'], width="stretch")
         
         with tab2:
             st.caption("Visualizing the balance of risk factors. / 風險因子 vs 保護因子")
@@ -410,35 +380,49 @@ elif st.session_state["page"] == "result":
             
             if "force_html" in shap_data:
                 components.html(shap_data['force_html'], height=100, scrolling=True)
+            elif "force_html_url" in shap_data:
+                components.iframe(shap_data['force_html_url'], height=100, scrolling=True)
 
     st.markdown("---")
     st.header("📊 Global Explanation / 模型整體解釋")
     st.write("The most important features for whole people.")
 
-    # 呼叫後端 API 拿圖
+    # 全域解釋圖：送出時就已經在背景下載 (同一個模型版本只下載一次，解碼好的圖所有 session 共用)
     try:
-        # 注意：這裡是 GET 請求
-        resp = requests.get(f"{BACKEND_URL}/global_shap")
-        
-        if resp.status_code == 200:
-            plots = resp.json()
-            
-            tab1, tab2 = st.tabs(["Beeswarm / 特徵影響力", "Bar / 重要性排名"])
-            
-            with tab1:
-                if "beeswarm" in plots:
-                    # 解碼並顯示
-                    img_data = base64.b64decode(plots['beeswarm'])
-                    st.image(img_data, caption="紅點代表數值高，藍點代表數值低；越往右邊代表風險越高。", width="stretch")
-                else:
-                    st.info("暫無圖表數據")
-                    
-            with tab2:
-                if "bar" in plots:
-                    img_data = base64.b64decode(plots['bar'])
-                    st.image(img_data, caption="特徵重要性平均排名", width="stretch")
-                else:
-                    st.info("暫無圖表數據")
-                    
+        plots_future = st.session_state.pop("global_plots_future", None)
+        if plots_future is not None:
+            with st.spinner("Loading global explanation... / 載入中"):
+                plots = plots_future.result()
+        else:
+            plots = global_plot_cache().get(st.session_state.get("model_version"))
+
+        tab1, tab2 = st.tabs(["Beeswarm / 特徵影響力", "Bar / 重要性排名"])
+
+        with tab1:
+            if "beeswarm" in plots:
+                st.image(plots["beeswarm"], caption="紅點代表數值高，藍點代表數值低；越往右邊代表風險越高。", width="stretch")
+            else:
+                st.info("暫無圖表數據")
+
+        with tab2:
+            if "bar" in plots:
+                st.image(plots["bar"], caption="特徵重要性平均排名", width="stretch")
+            else:
+                st.info("暫無圖表數據")
+
     except Exception as e:
         st.error(f"無法載入圖表: {e}")
+
+    # 後端各階段耗時 (來自 Server-Timing header)
+    timings = st.session_state.get("server_timing")
+    if timings:
+        with st.expander("⏱ Backend timing / 後端各階段耗時 (ms)"):
+            st.bar_chart({"ms": {k: v for k, v in timings.items() if k != "total"}}, horizontal=True)
+            if "total" in timings:
+                st.caption(f"Total / 總計: {timings['total']:.1f} ms")
+
+    # 結果頁第一次畫完：結束這次預測的 trace 並輸出
+    if trace is not None:
+        trace.end_run("streamlit.result_run")
+        trace.finish()
+        st.session_state["trace"] = None
@@ -0,0 +1,44 @@
+"""
+前端各頁 (app.py 與 pages/) 共用的後端設定：網址、共用的 client、欄位目錄
+"""
+import os
+
+import streamlit as st
+
+from field_catalog import FieldCatalog
+from http_client import BackendClient
+
+# --- 設定後端連線 ---
+# 從環境變數抓取，如果沒設定預設用 localhost (方便本地測試)
+# 在 Docker Compose 裡我們會設定成 http://backend:8000
+BACKEND_URL = os.getenv("BACKEND_URL", "http://localhost:8000")
+
+@st.cache_resource(show_spinner=False)
+def backend_client():
+    """呼叫後端的 client (所有 session 共用連線池、timeout、重試與 circuit breaker)"""
+    return BackendClient.from_env(BACKEND_URL)
+
+@st.cache_resource(show_spinner=False)
+def preview_client():
+    """
+    即時預覽 (/predict_lite) 專用的 client：timeout 短、不重試，
+    circuit breaker 也是自己的 (預覽失敗不會讓正式的預測被擋下)
+    """
+    return BackendClient(BACKEND_URL, connect_timeout=0.5,
+                         read_timeout=float(os.getenv("PREVIEW_TIMEOUT", "1.5")),
+                         retries=0, pool_size=4, failure_threshold=3, reset_after=30.0)
+
+@st.cache_resource(show_spinner=False)
+def field_catalog():
+    """
+    後端的欄位目錄 (FieldCatalog)：每個 process 下載一次，所有 session 共用
+    失敗時丟出例外，不會被快取
+    """
+    resp = backend_client().get("/field_catalog", timeout=5)
+    resp.raise_for_status()
+    return FieldCatalog(resp.json())
+
+def refresh_field_catalog(version):
+    """/predict 回應的 X-Schema-Version 和手上的目錄不同 -> 丟掉快取，下次用到時重新下載"""
+    if version and version != field_catalog().version:
+        field_catalog.clear()
@@ -0,0 +1,6 @@
+"""
+前端 (Streamlit) 的量測腳本
+
+請在 frontend/ 目錄下執行，例如：
+    python -m benchmarks.input_reruns
+"""
@@ -0,0 +1,163 @@
+"""
+批次篩檢頁 (bulk_screening.score_upload) 的速度與前端記憶體
+
+    python -m benchmarks.bulk_upload
+    python -m benchmarks.bulk_upload --rows 10000 100000 --chunksize 2000
+    python -m benchmarks.bulk_upload --url http://localhost:8000
+
+產生表單欄位名稱的 CSV (yes / no、male / female、少量空白與錯誤值)，從磁碟上的檔案
+分塊送到後端 /predict_csv。沒給 --url 時會在 backend/ 啟動一個 uvicorn。
+每個檔案大小報告 rows/s 與前端這邊 tracemalloc 的最高用量：
+用量只跟 chunksize 有關，檔案大 10 倍不應該跟著變大。
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import requests
+
+from bulk_screening import new_job_dir, remove_job, score_upload
+from field_catalog import FieldCatalog
+from http_client import BackendClient
+
+BACKEND_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "backend")
+
+
+def write_csv(path, n, seed=0):
+    """表單欄位名稱的 CSV (約 1% 空白、0.1% 不是數字)"""
+    rng = np.random.default_rng(seed)
+    yes_no = np.array(["yes", "no", "I don't know"])
+    df = pd.DataFrame({
+        "SEQN": np.arange(n) + 100000,
+        "age": rng.integers(18, 80, n),
+        "gender": rng.choice(["male", "female"], n),
+        "height_cm": rng.normal(168, 9, n).round(1),
+        "weight_kg": rng.normal(78, 16, n).clip(40, 180).round(1),
+        "waist_cm": rng.normal(96, 14, n).clip(55, 170).round(1),
+        "systolic_avg": rng.normal(122, 16, n).round(),
+        "diastolic_avg": rng.normal(70, 11, n).clip(30, 120).round(),
+        "fasting_glucose": rng.lognormal(4.65, 0.2, n).round(),
+        "HbA1c": rng.normal(5.7, 0.8, n).clip(4, 14).round(1),
+        "HDL": rng.normal(52, 14, n).clip(15, 120).round(),
+        "ever_smoked": rng.choice(yes_no, n, p=[0.4, 0.58, 0.02]),
+        "family_diabetes": rng.choice(yes_no, n, p=[0.3, 0.6, 0.1]),
+        "Sleep_Hours": rng.normal(7, 1.3, n).clip(2, 14).round(1),
+    }).astype(object)
+    values = df.to_numpy()
+    values[:, 1:][rng.random((n, df.shape[1] - 1)) < 0.01] = ""
+    values[rng.random(n) < 0.001, 1] = "n/a"
+    pd.DataFrame(values, columns=df.columns).to_csv(path, index=False)
+
+
+class SizedFile:
+    """磁碟上的檔案加上 size (像 Streamlit 的 UploadedFile)"""
+
+    def __init__(self, path):
+        self.size = os.path.getsize(path)
+        self._f = open(path, "rb")
+
+    def __getattr__(self, name):
+        return getattr(self._f, name)
+
+    def __iter__(self):
+        return iter(self._f)
+
+    def close(self):
+        self._f.close()
+
+
+def start_server(port):
+    proc = subprocess.Popen(
+        [sys.executable, "-W", "ignore", "-m", "uvicorn", "main:app", "--port", str(port)],
+        cwd=os.path.abspath(BACKEND_DIR),
+        env=dict(os.environ, DRIFT_MONITOR="0", LOG_LEVEL="WARNING"),
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 120
+    while True:
+        try:
+            requests.get(f"{url}/schema", timeout=1)
+            return proc, url
+        except requests.ConnectionError:
+            if time.time() > deadline:
+                proc.terminate()
+                raise RuntimeError("uvicorn 沒有啟動")
+            time.sleep(0.5)
+
+
+def run(client, catalog, path, chunksize):
+    upload = SizedFile(path)
+    job_dir = new_job_dir()
+    tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        for update in score_upload(client, catalog, upload, job_dir, chunksize):
+            last = update
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+        upload.close()
+    result_bytes = os.path.getsize(last["path"])
+    remove_job(job_dir)
+    return {
+        "rows": last["rows_read"],
+        "rows_scored": last["rows_scored"],
+        "rows_failed": last["rows_failed"],
+        "file_mb": round(upload.size / 2**20, 2),
+        "result_mb": round(result_bytes / 2**20, 2),
+        "sec": round(elapsed, 2),
+        "rows_per_sec": round(last["rows_read"] / elapsed),
+        "peak_mb": round(peak / 2**20, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--chunksize", type=int, default=2000)
+    parser.add_argument("--url", help="已經在跑的後端 (不另外啟動)")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("-o", "--output", help="結果寫成 JSON")
+    args = parser.parse_args()
+
+    proc = None
+    url = args.url
+    if not url:
+        proc, url = start_server(args.port)
+    client = BackendClient(url, read_timeout=120)
+    rows = []
+    try:
+        catalog = FieldCatalog(client.get("/field_catalog").json())
+        with tempfile.TemporaryDirectory() as tmp:
+            for n in args.rows:
+                path = os.path.join(tmp, f"bulk_{n}.csv")
+                write_csv(path, n)
+                rows.append(dict(run(client, catalog, path, args.chunksize), chunksize=args.chunksize))
+                print(json.dumps(rows[-1]))
+    finally:
+        client.close()
+        if proc:
+            proc.terminate()
+            proc.wait()
+
+    if len(rows) > 1:
+        growth = rows[-1]["peak_mb"] / rows[0]["peak_mb"] if rows[0]["peak_mb"] else float("nan")
+        size = rows[-1]["rows"] / rows[0]["rows"]
+        print(f"檔案大 {size:.0f} 倍，前端最高記憶體變成 {growth:.2f} 倍")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(rows, f, indent=2)
+        print(f"✅ 結果已寫入 {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+輸入頁的 rerun 次數與 CPU：模擬一個使用者填完整份表單並送出
+
+    python -m benchmarks.input_reruns
+    python -m benchmarks.input_reruns --sessions 5 -o reruns.json
+    python -m benchmarks.input_reruns --app /tmp/app_before.py --compare reruns.json
+
+用 streamlit.testing (AppTest) 在同一個 process 裡執行 app.py，後端換成 stub_backend
+(回應固定、幾乎不花時間，量到的只有前端)。使用者依序填入 PROFILE 的每個欄位：
+在 st.form 裡的元件要等送出才會 rerun，其他元件每改一次就 rerun 一次。
+CPU 是每次 script run 的 process time 加總 (含 AppTest 本身的開銷，前後比較時相同)。
+AppTest 不能只重跑 fragment，fragment 裡的元件也算一次完整 rerun (是上限)。
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+from benchmarks.stub_backend import StubBackend
+
+APP_PATH = os.path.join(os.path.dirname(__file__), "..", "app.py")
+
+# (元件種類, key 或 label 開頭, 值)：填寫順序同畫面由上到下
+PROFILE = [
+    ("number_input", "age", 52),
+    ("selectbox", "Gender", "male"),
+    ("number_input", "height_cm", 172.0),
+    ("number_input", "weight_kg", 84.0),
+    ("number_input", "waist_cm", 98.0),
+    ("selectbox", "Does a close relative", "yes"),
+    ("selectbox", "Do you do moderate", "no"),
+    ("number_input", "alcohol_drinks", 2.0),
+    ("selectbox", "Have you ever smoked", "yes"),
+    ("selectbox", "Do you do vigorous", "no"),
+    ("number_input", "Sleep_Hours", 6.5),
+    ("selectbox", "How is your self-reported", "3"),
+    ("number_input", "systolic_avg", 132.0),
+    ("number_input", "diastolic_avg", 84.0),
+    ("number_input", "fasting_glucose", 108.0),
+    ("number_input", "total_cholesterol", 205.0),
+    ("number_input", "triglycerides", 165.0),
+    ("number_input", "insulin", 14.2),
+    ("number_input", "HDL", 44.0),
+    ("number_input", "HbA1c", 5.9),
+    ("number_input", "LDL", 128.0),
+]
+SUBMIT_LABEL = "Get My Prediction"
+
+
+def find_widget(at, kind, selector):
+    for w in getattr(at, kind):
+        if w.key == selector or str(w.label).startswith(selector):
+            return w
+    raise LookupError(f"找不到 {kind}: {selector}")
+
+
+def run_session(app_path, timeout):
+    """回傳 {"runs": 全部 script run 數, "reruns": 填寫 + 送出造成的 run 數, "cpu_ms": ...}"""
+    from streamlit.testing.v1 import AppTest
+
+    cpu = []
+
+    def timed_run(at):
+        t0 = time.process_time()
+        at.run()
+        cpu.append(time.process_time() - t0)
+
+    at = AppTest.from_file(os.path.abspath(app_path), default_timeout=timeout)
+    timed_run(at)  # 打開頁面
+    deferred = 0
+    for kind, selector, value in PROFILE:
+        widget = find_widget(at, kind, selector)
+        widget.set_value(value)
+        if widget.form_id:
+            deferred += 1  # 在表單裡：送出時才一起送
+        else:
+            timed_run(at)
+    find_widget(at, "button", SUBMIT_LABEL).click()
+    timed_run(at)
+
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+    if at.session_state["page"] != "result":
+        raise RuntimeError(f"沒有進到結果頁：{[e.value for e in at.error]}")
+    return {
+        "runs": len(cpu),
+        "reruns": len(cpu) - 1,
+        "deferred_inputs": deferred,
+        "cpu_ms": sum(cpu) * 1000,
+        "cpu_ms_page_load": cpu[0] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--app", default=APP_PATH)
+    parser.add_argument("--sessions", type=int, default=3, help="模擬幾個使用者 (取平均)")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("-o", "--output", help="結果寫成 JSON")
+    parser.add_argument("--compare", help="上一次的 JSON，列出變化")
+    args = parser.parse_args()
+
+    with StubBackend() as url:
+        os.environ["BACKEND_URL"] = url
+        sys.path.insert(0, os.path.dirname(os.path.abspath(args.app)))
+        run_session(args.app, args.timeout)  # 暖身 (import、第一次建立快取)
+        sessions = [run_session(args.app, args.timeout) for _ in range(args.sessions)]
+
+    result = {
+        "app": os.path.basename(args.app),
+        "sessions": args.sessions,
+        "inputs": len(PROFILE),
+        "reruns_per_submission": sessions[0]["reruns"],
+        "deferred_inputs": sessions[0]["deferred_inputs"],
+        "cpu_ms_per_session": round(sum(s["cpu_ms"] for s in sessions) / len(sessions), 1),
+        "cpu_ms_per_run": round(sum(s["cpu_ms"] for s in sessions) / sum(s["runs"] for s in sessions), 2),
+    }
+    print(json.dumps(result, indent=2))
+
+    if args.compare:
+        with open(args.compare) as f:
+            base = json.load(f)
+        for key in ("reruns_per_submission", "cpu_ms_per_session", "cpu_ms_per_run"):
+            old, new = base[key], result[key]
+            change = f"{(new / old - 1) * 100:+.0f}%" if old else "-"
+            print(f"{key:<24} {old:>10} -> {new:<10} ({change})")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"✅ 結果已寫入 {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+輸入頁即時風險預覽 (live_preview.LivePreview + 後端 /predict_lite) 的請求量、延遲與過載行為
+
+    python -m benchmarks.live_preview                  # 只跑模擬的填表時間軸 (不需要後端)
+    python -m benchmarks.live_preview --backend        # 另外在 backend/ 啟動 uvicorn 量延遲與 503
+    python -m benchmarks.live_preview --url http://localhost:8000 --burst 32
+
+1. 填表時間軸：依 input_reruns.PROFILE 的順序填，數字欄位先打錯再改 (模擬按 +/- 或修正)，
+   欄位之間停頓一下，最後改回之前填過的值。
+   比較「每次改值就問後端」與 LivePreview (debounce + 依輸入雜湊快取) 送出的 request 數。
+2. --backend / --url：/predict_lite 與 /predict (explain=none / exact) 的延遲中位數，
+   以及同時送 --burst 個 /predict_lite 時被 503 擋掉的比例 (上限 LITE_MAX_INFLIGHT)。
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from benchmarks.bulk_upload import start_server
+from benchmarks.input_reruns import PROFILE
+from live_preview import LivePreview
+
+# 欄位 key -> 變數名 (PROFILE 的 selectbox 是用 label 開頭找的)
+SELECT_NAMES = {
+    "Gender": "gender",
+    "Does a close relative": "family_diabetes",
+    "Do you do moderate": "moderate_activity",
+    "Have you ever smoked": "ever_smoked",
+    "Do you do vigorous": "vigorous_activity",
+    "How is your self-reported": "general_health",
+}
+
+
+def typing_timeline(seed=0):
+    """(時間, 當時的完整輸入) 的 list：每次改值一筆"""
+    rng = random.Random(seed)
+    values, events, now = {}, [], 0.0
+    for kind, selector, value in PROFILE:
+        name = SELECT_NAMES.get(selector, selector)
+        if kind == "number_input":
+            # 先填一個差一點的值再改對 (0.3 ~ 0.6 秒一次)
+            for wrong in (value * rng.uniform(0.5, 1.5), value + 1):
+                values[name] = round(wrong, 1)
+                events.append((now, dict(values)))
+                now += rng.uniform(0.3, 0.6)
+        values[name] = value
+        events.append((now, dict(values)))
+        now += rng.uniform(1.5, 4.0)  # 看下一個問題
+    # 改回之前的值再改回來 (應該都命中快取)
+    for name in ("weight_kg", "HbA1c"):
+        original = values[name]
+        values[name] = original + 5
+        events.append((now, dict(values)))
+        now += 2.0
+        values[name] = original
+        events.append((now, dict(values)))
+        now += 2.0
+    return events, now
+
+
+def simulate(poll, debounce, seed=0):
+    events, end = typing_timeline(seed)
+    preview = LivePreview(debounce=debounce)
+    fetched = []
+
+    def fetch(values):
+        fetched.append(values)
+        return 0.5
+
+    t, i, current, stale = 0.0, 0, {}, 0
+    while t <= end + 2 * debounce:
+        while i < len(events) and events[i][0] <= t:
+            current = events[i][1]
+            i += 1
+        if current:
+            preview.poll(current, fetch, now=t)
+        t += poll
+    return {
+        "changes": len(events),
+        "naive_requests": len(events),
+        "preview_requests": len(fetched),
+        "reduction": round(1 - len(fetched) / len(events), 3),
+        "cache_entries": len(preview.cache),
+        "poll_sec": poll,
+        "debounce_sec": debounce,
+    }
+
+
+def payload(rng):
+    """/predict 的 JSON (每次不同，避開結果快取)"""
+    return {
+        "RIDAGEYR": rng.randint(20, 79), "RIAGENDR": rng.choice([1, 2]),
+        "BMXBMI": round(rng.uniform(19, 38), 1), "BMXWAIST": round(rng.uniform(70, 120), 1),
+        "LBXGLU": rng.randint(80, 140), "LBXGH": round(rng.uniform(4.8, 7.5), 1),
+        "BPXSY_avg": rng.randint(100, 160), "BPXDI_avg": rng.randint(60, 95),
+    }
+
+
+def latency(url, path, params, n, rng):
+    times = []
+    with requests.Session() as s:
+        for _ in range(n):
+            t0 = time.perf_counter()
+            s.post(f"{url}{path}", params=params, json=payload(rng), timeout=60).raise_for_status()
+            times.append((time.perf_counter() - t0) * 1000)
+    return round(statistics.median(times), 1)
+
+
+def burst(url, n, rng):
+    """同時送 n 個 /predict_lite，回傳各狀態碼的次數"""
+    bodies = [payload(rng) for _ in range(n)]
+    with ThreadPoolExecutor(n) as pool:
+        codes = list(pool.map(lambda b: requests.post(f"{url}/predict_lite", json=b, timeout=60).status_code,
+                              bodies))
+    return {str(c): codes.count(c) for c in sorted(set(codes))}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--poll", type=float, default=0.5, help="預覽 fragment 的 run_every (PREVIEW_POLL)")
+    parser.add_argument("--debounce", type=float, default=0.8, help="PREVIEW_DEBOUNCE")
+    parser.add_argument("--backend", action="store_true", help="在 backend/ 啟動 uvicorn 量延遲")
+    parser.add_argument("--url", help="已經在跑的後端 (不另外啟動)")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--requests", type=int, default=30, help="每個路徑量幾次延遲")
+    parser.add_argument("--burst", type=int, default=16, help="同時送出的 /predict_lite 數")
+    parser.add_argument("-o", "--output", help="結果寫成 JSON")
+    args = parser.parse_args()
+
+    result = {"timeline": simulate(args.poll, args.debounce)}
+    print(json.dumps(result["timeline"]))
+
+    proc, url = None, args.url
+    if args.backend and not url:
+        proc, url = start_server(args.port)
+    if url:
+        rng = random.Random(0)
+        try:
+            result["latency_ms"] = {
+                "predict_lite": latency(url, "/predict_lite", None, args.requests, rng),
+                "predict_none": latency(url, "/predict", {"explain": "none"}, args.requests, rng),
+                "predict_exact": latency(url, "/predict", {"explain": "exact"}, max(args.requests // 5, 3), rng),
+            }
+            print(json.dumps(result["latency_ms"]))
+            result["burst"] = dict(burst(url, args.burst, rng), concurrent=args.burst)
+            print(json.dumps(result["burst"]))
+        finally:
+            if proc:
+                proc.terminate()
+                proc.wait()
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"✅ 結果已寫入 {args.output}")
+
+
+if __name__ == "__main__":
+    main()
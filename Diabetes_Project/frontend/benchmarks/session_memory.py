@@ -0,0 +1,115 @@
+"""
+每個 session 在 st.session_state 裡留下多少資料，以及共用 result store 的大小
+
+    python -m benchmarks.session_memory
+    python -m benchmarks.session_memory --sessions 1 10 50 --store-max-mb 2
+    python -m benchmarks.session_memory --app /tmp/app_before.py
+
+用 AppTest 模擬 N 個使用者各做一次預測 (stub_backend 的 realistic 模式：waterfall
+約 100 KB、force plot 約 300 KB)，停在結果頁時量：
+    session_kb      每個 session 的 session_state 內容大小 (字串 / bytes 的實際長度加總)
+    store_kb        result store 目前的大小 (有上限，超過就淘汰最久沒用的)
+    total_kb        全部 session 加上 store，也就是使用者越多記憶體會長多少
+AppTest 自己保留的畫面元素 (每個 session 一份) 不算在內。
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+
+from benchmarks.input_reruns import PROFILE, SUBMIT_LABEL, find_widget
+from benchmarks.stub_backend import StubBackend
+
+APP_PATH = os.path.join(os.path.dirname(__file__), "..", "app.py")
+
+
+def deep_size(value, seen=None):
+    """字串 / bytes 的長度加總 (dict、list 會往下找)；其他物件用 sys.getsizeof"""
+    seen = seen if seen is not None else set()
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    if isinstance(value, str):
+        return len(value.encode("utf-8"))
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(deep_size(k, seen) + deep_size(v, seen) for k, v in value.items())
+    if isinstance(value, (list, tuple, set)):
+        return sum(deep_size(v, seen) for v in value)
+    return sys.getsizeof(value)
+
+
+def submit_session(app_path, timeout):
+    """填完表單並送出，回傳停在結果頁的 AppTest"""
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(os.path.abspath(app_path), default_timeout=timeout).run()
+    for kind, selector, value in PROFILE:
+        find_widget(at, kind, selector).set_value(value)
+    find_widget(at, "button", SUBMIT_LABEL).click().run()
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+    if at.session_state["page"] != "result":
+        raise RuntimeError(f"沒有進到結果頁：{[e.value for e in at.error]}")
+    return at
+
+
+def store_bytes():
+    """app 建立的 result store 目前的大小 (舊版 app 沒有 store 就是 0)"""
+    try:
+        import result_store
+    except ImportError:
+        return 0
+    # store 是 app 裡 st.cache_resource 建立的，從 gc 找出來
+    stores = [o for o in gc.get_objects() if isinstance(o, result_store.ResultStore)]
+    return sum(store.stats()["bytes"] for store in stores)
+
+
+def measure(app_path, n_sessions, timeout):
+    sessions = [submit_session(app_path, timeout) for _ in range(n_sessions)]
+    session_bytes = [deep_size(at.session_state.to_dict()) for at in sessions]
+    store = store_bytes()
+    return {
+        "sessions": n_sessions,
+        "session_kb": round(sum(session_bytes) / len(session_bytes) / 1024, 1),
+        "store_kb": round(store / 1024, 1),
+        "total_kb": round((sum(session_bytes) + store) / 1024, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--app", default=APP_PATH)
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--store-max-mb", type=float, default=2.0,
+                        help="RESULT_STORE_MAX_MB (設小一點才看得到上限的效果)")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("-o", "--output", help="結果寫成 JSON")
+    args = parser.parse_args()
+
+    os.environ["RESULT_STORE"] = "memory"
+    os.environ["RESULT_STORE_MAX_MB"] = str(args.store_max_mb)
+    from streamlit.runtime.caching import cache_resource
+
+    rows = []
+    with StubBackend(realistic=True) as url:
+        os.environ["BACKEND_URL"] = url
+        sys.path.insert(0, os.path.dirname(os.path.abspath(args.app)))
+        for n in args.sessions:
+            cache_resource.clear()  # 每一輪都從空的 store 開始
+            gc.collect()
+            rows.append(measure(args.app, n, args.timeout))
+
+    print(f"{'sessions':>8} {'session_kb':>11} {'store_kb':>9} {'total_kb':>9}")
+    for r in rows:
+        print(f"{r['sessions']:>8} {r['session_kb']:>11} {r['store_kb']:>9} {r['total_kb']:>9}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"app": os.path.basename(args.app), "store_max_mb": args.store_max_mb, "rows": rows}, f, indent=2)
+        print(f"✅ 結果已寫入 {args.output}")
+
+
+if __name__ == "__main__":
+    main()
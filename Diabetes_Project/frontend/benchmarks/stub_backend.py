@@ -0,0 +1,127 @@
+"""
+量測前端用的假後端 (不載入模型，回應固定且幾乎不花時間，量到的只有前端本身)
+
+    with StubBackend() as url:
+        os.environ["BACKEND_URL"] = url
+
+/schema 與 /field_catalog 用 backend/field_schema.py 的內容 (找不到就是空的規格)，
+/predict 回傳固定的機率與一張小圖 (realistic=True 時圖與 force HTML 的大小接近真的後端)，
+/predict_lite 只回傳機率 (busy=True 時回 503，像後端同時處理的數量已滿)，/global_shap 支援 ETag。
+每個路徑被呼叫幾次記在 calls，最後一次 /predict 或 /predict_lite 的輸入在 last_payload。
+"""
+import base64
+import json
+import os
+import sys
+import threading
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BACKEND_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "backend")
+MODEL_VERSION = "stub"
+
+
+def tiny_png(width=8, height=8, noise=False):
+    """純色 (noise=True 時是雜訊，壓縮不了、大小接近真的圖) 的 PNG (不需要 matplotlib / PIL)"""
+    def chunk(kind, data):
+        body = kind + data
+        return len(data).to_bytes(4, "big") + body + zlib.crc32(body).to_bytes(4, "big")
+    raw = b"".join(b"\x00" + (os.urandom(3 * width) if noise else b"\xd3\x2f\x2f" * width)
+                   for _ in range(height))
+    header = width.to_bytes(4, "big") + height.to_bytes(4, "big") + b"\x08\x02\x00\x00\x00"
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header)
+            + chunk(b"IDAT", zlib.compress(raw)) + chunk(b"IEND", b""))
+
+
+def load_schema():
+    """(/schema, /field_catalog) 的內容"""
+    sys.path.insert(0, os.path.abspath(BACKEND_DIR))
+    try:
+        from field_schema import catalog_document, schema_document
+        return schema_document(), catalog_document()
+    except ImportError:
+        return {"version": "stub", "fields": []}, {"version": "stub", "sections": [], "fields": []}
+    finally:
+        sys.path.pop(0)
+
+
+class StubBackend:
+    def __init__(self, probability=0.42, predict_delay=0.0, realistic=False, busy=False):
+        self.calls = {}
+        self.last_payload = None
+        png = base64.b64encode(tiny_png()).decode()
+        waterfall, force_html = png, "<div>force plot</div>"
+        if realistic:
+            # waterfall 約 100 KB，force plot 內含約 300 KB 的 SHAP JS
+            waterfall = base64.b64encode(tiny_png(200, 160, noise=True)).decode()
+            force_html = "<script>" + "/* shap bundle */" * 19200 + "</script><div>force plot</div>"
+        schema, catalog = load_schema()
+        self.responses = {
+            "/schema": schema,
+            "/field_catalog": catalog,
+            "/global_shap": {"beeswarm": png, "bar": png},
+            "/predict": {
+                "probability": probability,
+                "advice": ["⚠️ 中度風險警告：建議定期追蹤。"],
+                "shap_local": {"waterfall": waterfall, "force_html": force_html},
+                "explanation": {"mode": "exact", "top_features": []},
+            },
+            "/predict_lite": {"probability": probability},
+        }
+        self.predict_delay = predict_delay
+        self.busy = busy
+        self._server = None
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, status, body=None, headers=None):
+                data = json.dumps(body).encode() if body is not None else b""
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.send_header("X-Model-Version", MODEL_VERSION)
+                for k, v in (headers or {}).items():
+                    self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _route(self):
+                path = self.path.split("?")[0]
+                stub.calls[path] = stub.calls.get(path, 0) + 1
+                if path not in stub.responses:
+                    return self._reply(404, {"detail": "Not Found"})
+                if path == "/global_shap":
+                    etag = f'"{MODEL_VERSION}"'
+                    if self.headers.get("If-None-Match") == etag:
+                        return self._reply(304, headers={"ETag": etag})
+                    return self._reply(200, stub.responses[path], {"ETag": etag})
+                if path == "/predict":
+                    length = int(self.headers.get("Content-Length") or 0)
+                    stub.last_payload = json.loads(self.rfile.read(length) or b"null")
+                    if stub.predict_delay:
+                        threading.Event().wait(stub.predict_delay)
+                    return self._reply(200, stub.responses[path], {"Server-Timing": "total;dur=1.0"})
+                if path == "/predict_lite":
+                    length = int(self.headers.get("Content-Length") or 0)
+                    stub.last_payload = json.loads(self.rfile.read(length) or b"null")
+                    if stub.busy:
+                        return self._reply(503, {"detail": "busy"}, {"Retry-After": "5"})
+                return self._reply(200, stub.responses[path])
+
+            do_GET = do_POST = _route
+
+        return Handler
+
+    def __enter__(self):
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,234 @@
+"""
+前端 (app.py) 每一步互動的 script 執行時間、rerun 次數與 session_state 大小
+
+    python -m benchmarks.ui_session -o ui_baseline.json
+    python -m benchmarks.ui_session --compare ui_baseline.json --threshold 0.25
+    python -m benchmarks.ui_session --app /tmp/app_before.py --sessions 5
+
+用 streamlit.testing (AppTest) 在同一個 process 裡跑完整的一次使用：
+    open          打開頁面
+    fill          依 input_reruns.PROFILE 填完整份表單 (表單裡的元件不會 rerun)
+    submit        按下送出，跳到結果頁 (含 st.rerun)
+    switch_tabs   切換結果頁的分頁：st.tabs 在瀏覽器裡切換，不會 rerun (這一步確認分頁還在、runs 是 0)
+    result_rerun  結果頁整頁重跑一次 (結果頁上的任何互動都要付這個代價)
+    back          回到輸入頁
+後端換成 stub_backend (realistic 模式：圖與 force HTML 的大小接近真的後端)，量到的只有前端。
+每一步記錄：
+    runs        script 執行次數 (st.rerun 造成的也算)
+    wall_ms     AppTest 執行的時間 (含 AppTest 本身的開銷，前後比較時相同)
+    cpu_ms      同上的 process time
+    session_kb  這一步之後 session_state 的大小 (算法同 session_memory)
+    elements    畫面上的元素數 (表單或結果頁變大時會跟著變多)
+多個 session 取中位數。--compare 時 runs 變多、或時間 / 大小超過 threshold
+(而且差距大於 --min-delta-ms / --min-delta-kb) 就以 exit code 1 結束。
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks.input_reruns import PROFILE, SUBMIT_LABEL, find_widget
+from benchmarks.session_memory import deep_size
+from benchmarks.stub_backend import StubBackend
+
+APP_PATH = os.path.join(os.path.dirname(__file__), "..", "app.py")
+STEPS = ["open", "fill", "submit", "switch_tabs", "result_rerun", "back"]
+METRICS = ["runs", "wall_ms", "cpu_ms", "session_kb", "elements"]
+BACK_LABEL = "← Back to Calculator"
+
+
+@contextlib.contextmanager
+def count_script_runs():
+    """
+    回傳一個 list，期間每次 AppTest.run() 執行了幾次 script 就 append 幾次
+    (AppTest 每次 run 建立一個 LocalScriptRunner，從它的事件數 SCRIPT_STARTED)
+    """
+    from streamlit.runtime.scriptrunner import ScriptRunnerEvent
+    from streamlit.testing.v1.local_script_runner import LocalScriptRunner
+
+    started = []
+    original = LocalScriptRunner.run
+
+    def run(self, *args, **kwargs):
+        try:
+            return original(self, *args, **kwargs)
+        finally:
+            started.append(sum(1 for e in self.events if e == ScriptRunnerEvent.SCRIPT_STARTED))
+
+    LocalScriptRunner.run = run
+    try:
+        yield started
+    finally:
+        LocalScriptRunner.run = original
+
+
+def count_elements(node):
+    children = getattr(node, "children", None) or {}
+    return 1 + sum(count_elements(child) for child in children.values())
+
+
+class Session:
+    """一個使用者：每一步的 runs / 時間 / 大小記在 steps"""
+
+    def __init__(self, app_path, timeout, runs_log):
+        from streamlit.testing.v1 import AppTest
+
+        self.at = AppTest.from_file(os.path.abspath(app_path), default_timeout=timeout)
+        self.runs_log = runs_log
+        self.steps = {}
+
+    @contextlib.contextmanager
+    def step(self, name):
+        row = {"runs": 0, "wall_ms": 0.0, "cpu_ms": 0.0}
+        self._row = row
+        yield
+        if self.at.exception:
+            raise RuntimeError(f"{name}: {self.at.exception[0].message}")
+        row["wall_ms"] = round(row["wall_ms"], 2)
+        row["cpu_ms"] = round(row["cpu_ms"], 2)
+        row["session_kb"] = round(deep_size(self.at.session_state.to_dict()) / 1024, 1)
+        row["elements"] = count_elements(self.at.main) + count_elements(self.at.sidebar)
+        self.steps[name] = row
+
+    def run(self):
+        before = len(self.runs_log)
+        t0, c0 = time.perf_counter(), time.process_time()
+        self.at.run()
+        self._row["wall_ms"] += (time.perf_counter() - t0) * 1000
+        self._row["cpu_ms"] += (time.process_time() - c0) * 1000
+        self._row["runs"] += sum(self.runs_log[before:])
+
+
+def run_session(app_path, timeout, runs_log):
+    s = Session(app_path, timeout, runs_log)
+    at = s.at
+    with s.step("open"):
+        s.run()
+    with s.step("fill"):
+        for kind, selector, value in PROFILE:
+            widget = find_widget(at, kind, selector)
+            widget.set_value(value)
+            if not widget.form_id:
+                s.run()
+    with s.step("submit"):
+        find_widget(at, "button", SUBMIT_LABEL).click()
+        s.run()
+        if at.session_state["page"] != "result":
+            raise RuntimeError(f"沒有進到結果頁：{[e.value for e in at.error]}")
+    with s.step("switch_tabs"):
+        # 分頁在瀏覽器裡切換，不需要 rerun；只確認結果頁還有分頁
+        if not at.tabs:
+            raise RuntimeError("結果頁沒有分頁")
+    with s.step("result_rerun"):
+        s.run()
+    with s.step("back"):
+        find_widget(at, "button", BACK_LABEL).click()
+        s.run()
+        if at.session_state["page"] != "input":
+            raise RuntimeError("沒有回到輸入頁")
+    return s.steps
+
+
+def median_steps(sessions):
+    return {
+        step: {m: round(statistics.median(s[step][m] for s in sessions), 2) for m in METRICS}
+        for step in STEPS
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current, baseline, threshold, min_delta_ms, min_delta_kb):
+    """回傳 [(step, metric, baseline, current)]，只列出退步的"""
+    regressions = []
+    for step, row in current.items():
+        old_row = baseline.get(step)
+        if not old_row:
+            continue
+        if row["runs"] > old_row["runs"]:
+            regressions.append((step, "runs", old_row["runs"], row["runs"]))
+        for metric, min_delta in (("wall_ms", min_delta_ms), ("cpu_ms", min_delta_ms),
+                                  ("session_kb", min_delta_kb)):
+            old, new = old_row.get(metric), row[metric]
+            if old is not None and new > old * (1 + threshold) and new - old > min_delta:
+                regressions.append((step, metric, old, new))
+    return regressions
+
+
+def print_table(steps, baseline=None):
+    print(f"{'step':<14}" + "".join(f"{m:>20}" for m in METRICS))
+    for step in STEPS:
+        line = f"{step:<14}"
+        for m in METRICS:
+            value = steps[step][m]
+            cell = f"{value:g}"
+            old = (baseline or {}).get(step, {}).get(m)
+            if old:
+                cell += f" ({(value / old - 1) * 100:+.0f}%)"
+            line += f"{cell:>20}"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--app", default=APP_PATH)
+    parser.add_argument("--sessions", type=int, default=5, help="模擬幾個使用者 (取中位數)")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("-o", "--output", help="結果寫成 baseline JSON")
+    parser.add_argument("--compare", help="與這個 baseline JSON 比較")
+    parser.add_argument("--threshold", type=float, default=0.25, help="變慢 / 變大多少比例算退步 (0.25 = 25%)")
+    parser.add_argument("--min-delta-ms", type=float, default=20.0, help="差距小於這個毫秒數不算退步 (雜訊)")
+    parser.add_argument("--min-delta-kb", type=float, default=4.0, help="session_state 差距小於這個 KB 不算退步")
+    args = parser.parse_args()
+
+    import streamlit
+
+    with StubBackend(realistic=True) as url, count_script_runs() as runs_log:
+        os.environ["BACKEND_URL"] = url
+        sys.path.insert(0, os.path.dirname(os.path.abspath(args.app)))
+        run_session(args.app, args.timeout, runs_log)  # 暖身 (import、第一次建立快取)
+        sessions = [run_session(args.app, args.timeout, runs_log) for _ in range(args.sessions)]
+    steps = median_steps(sessions)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["steps"]
+    print_table(steps, baseline)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "app": os.path.basename(args.app),
+                "commit": git_commit(),
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                "python": platform.python_version(),
+                "streamlit": streamlit.__version__,
+                "sessions": args.sessions,
+                "inputs": len(PROFILE),
+                "steps": steps,
+            }, f, indent=2)
+        print(f"✅ baseline 已寫入 {args.output}")
+
+    if baseline is not None:
+        regressions = compare(steps, baseline, args.threshold, args.min_delta_ms, args.min_delta_kb)
+        for step, metric, old, new in regressions:
+            print(f"❌ {step} {metric}: {old:g} -> {new:g}")
+        if regressions:
+            sys.exit(1)
+        print(f"✅ 沒有超過 {args.threshold:.0%} 的退步")
+
+
+if __name__ == "__main__":
+    main()
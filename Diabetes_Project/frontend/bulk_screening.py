@@ -0,0 +1,101 @@
+"""
+批次篩檢 (pages/1_Bulk_Screening.py) 的處理邏輯：上傳的 CSV 分塊送到後端 /predict_csv
+
+    for update in score_upload(client, catalog, upload, job_dir, chunksize=2000):
+        progress_bar.progress(update["fraction"])
+        table.append(update["rows"])
+
+上傳檔不會整個讀進 session：用 pd.read_csv(chunksize=...) 一塊一塊讀，
+每塊用欄位目錄 (FieldCatalog.to_codes，與表單送出同一個轉換) 對照成 NHANES 代碼
+(表單的變數名、yes/no、male/female 都接受)，
+送到 /predict_csv (NDJSON)，結果逐列附加寫到磁碟上的 scored.csv。
+session 裡只留工作目錄、計數與畫面上顯示的前幾列。
+"""
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import pandas as pd
+
+JOB_ROOT = os.path.join(tempfile.gettempdir(), "healthshield-bulk")
+RESULT_FILE = "scored.csv"
+RESULT_COLUMNS = ["row", "id", "probability", "errors"]
+ID_COLUMN = "SEQN"
+
+
+def new_job_dir():
+    """建立這次上傳的工作目錄；順便清掉超過 BULK_JOB_TTL 秒的舊工作"""
+    os.makedirs(JOB_ROOT, exist_ok=True)
+    ttl = float(os.getenv("BULK_JOB_TTL", "3600"))
+    now = time.time()
+    for name in os.listdir(JOB_ROOT):
+        path = os.path.join(JOB_ROOT, name)
+        if os.path.isdir(path) and now - os.path.getmtime(path) > ttl:
+            shutil.rmtree(path, ignore_errors=True)
+    return tempfile.mkdtemp(dir=JOB_ROOT)
+
+
+def remove_job(job_dir):
+    if job_dir and os.path.dirname(job_dir) == JOB_ROOT:
+        shutil.rmtree(job_dir, ignore_errors=True)
+
+
+def parse_ndjson(lines, row_offset):
+    """/predict_csv 的 NDJSON -> (結果列的 list, 最後的 summary 或 None)；row 加上 row_offset 變成整個檔案的列號"""
+    rows, summary = [], None
+    for line in lines:
+        if not line:
+            continue
+        item = json.loads(line)
+        if "summary" in item:
+            summary = item["summary"]
+        elif "error" in item:
+            raise ValueError(item["error"])
+        elif "row" in item:
+            errors = ";".join(f"{e['field']}:{e['error']}" for e in item.get("errors", []))
+            rows.append({"row": item["row"] + row_offset, "id": item.get("id"),
+                         "probability": item.get("probability"), "errors": errors})
+    return rows, summary
+
+
+def score_upload(client, catalog, upload, job_dir, chunksize=2000, id_column=ID_COLUMN, headers=None):
+    """
+    逐塊評分，每塊之後 yield 一次進度：
+        {"rows": 這一塊的結果 DataFrame, "rows_read", "rows_scored", "rows_failed",
+         "fraction": 已讀的比例 (依檔案大小), "path": scored.csv}
+    沒有任何可用的欄位時丟出 ValueError；後端錯誤丟出 requests.HTTPError
+    """
+    path = os.path.join(job_dir, RESULT_FILE)
+    total_bytes = getattr(upload, "size", None) or 0
+    counts = {"rows_read": 0, "rows_scored": 0, "rows_failed": 0}
+    upload.seek(0)
+    # 全部讀成字串：數值的檢查與「不是數字」的錯誤都交給後端
+    reader = pd.read_csv(upload, chunksize=chunksize, dtype=str, keep_default_na=False)
+    with open(path, "w", newline="", encoding="utf-8") as out:
+        pd.DataFrame(columns=RESULT_COLUMNS).to_csv(out, index=False)
+        for chunk in reader:
+            send = catalog.to_codes(chunk)
+            if send.columns.empty:
+                raise ValueError("No known columns (NHANES codes or form names) in the file / 檔案裡沒有認得的欄位")
+            if id_column in chunk.columns:
+                send[id_column] = chunk[id_column]
+            resp = client.post("/predict_csv", params={"format": "ndjson", "chunksize": len(send),
+                                                       "id_column": id_column},
+                               data=send.to_csv(index=False).encode("utf-8"),
+                               headers=dict(headers or {}, **{"Content-Type": "text/csv"}), stream=True)
+            try:
+                resp.raise_for_status()
+                rows, _ = parse_ndjson(resp.iter_lines(decode_unicode=True), counts["rows_read"])
+            finally:
+                resp.close()
+
+            scored = pd.DataFrame(rows, columns=RESULT_COLUMNS).sort_values("row")
+            scored.to_csv(out, index=False, header=False)
+            out.flush()
+            counts["rows_read"] += len(chunk)
+            counts["rows_failed"] += int((scored["errors"] != "").sum())
+            counts["rows_scored"] += int(scored["probability"].notna().sum())
+            fraction = min(upload.tell() / total_bytes, 1.0) if total_bytes else 0.0
+            yield dict(counts, rows=scored, fraction=fraction, path=path)
@@ -0,0 +1,73 @@
+"""
+後端欄位目錄 (GET /field_catalog) 的前端包裝
+
+輸入頁的每個元件 (標籤、上下限、間距、選項)、錯誤訊息的欄位名稱，
+以及「表單變數名 / 文字選項 -> NHANES 代碼」的轉換都從這裡來，
+前端不再自己維護一份對照表，檢查範圍與後端的驗證完全相同。
+
+轉換只有一個實作 (to_codes，整個 DataFrame 一次換)：
+    表單送出：一列的 DataFrame (to_payload)
+    批次篩檢：上傳 CSV 的每一塊
+"""
+import json
+
+import pandas as pd
+
+
+class FieldCatalog:
+    def __init__(self, document):
+        self.version = document["version"]
+        self.unknown_label = document.get("unknown_label", "I don't know")
+        self.sections = document["sections"]
+        self.fields = document["fields"]
+        self.by_name = {f["name"]: f for f in self.fields}
+        self.by_code = {f["code"]: f for f in self.fields}
+        # 前端變數名 -> NHANES 代碼
+        self.name_mapping = {f["name"]: f["code"] for f in self.fields}
+        # 有選項的欄位：選項文字 (小寫) -> 代碼 (null 是缺值)
+        self._option_codes = {
+            f["code"]: {str(label).lower(): code for label, code in f["options"]}
+            for f in self.fields if f.get("options")
+        }
+
+    def section_fields(self, section_id):
+        return [f for f in self.fields if f["section"] == section_id]
+
+    def inputs(self):
+        """要使用者填的欄位 (算出來的 BMI 不算)"""
+        return [f for f in self.fields if not f.get("derived")]
+
+    @staticmethod
+    def option_labels(field):
+        return [label for label, _ in field["options"]]
+
+    def display_name(self, code):
+        field = self.by_code.get(code)
+        return field.get("display", field["name"]) if field else code
+
+    def missing(self, values, unknown):
+        """沒有回答的欄位 (值是 None、也沒有勾 I don't know)，回傳顯示名稱"""
+        return [f.get("display", f["name"]) for f in self.inputs()
+                if values.get(f["name"]) is None and not unknown.get(f["name"], False)]
+
+    def to_codes(self, frame):
+        """
+        表單變數名或 NHANES 代碼的 DataFrame -> 只有認得欄位的 NHANES 代碼 DataFrame
+        文字選項 (yes / no、male / female、I don't know，不分大小寫) 換成代碼，
+        其他值原樣保留 (範圍等檢查交給後端)
+        """
+        frame = frame.rename(columns={name: code for name, code in self.name_mapping.items()
+                                      if name in frame.columns and code not in frame.columns})
+        codes = [c for c in self.by_code if c in frame.columns]
+        out = frame[codes].copy()
+        for code in codes:
+            lookup = self._option_codes.get(code)
+            if lookup and out[code].dtype == object:
+                text = out[code].astype(str).str.strip().str.lower()
+                out[code] = text.map(lookup).where(text.isin(list(lookup)), out[code])
+        return out
+
+    def to_payload(self, values):
+        """一個人的輸入 {變數名: 值} -> /predict 的 JSON {NHANES 代碼: 數值或 None}"""
+        frame = self.to_codes(pd.DataFrame([values], dtype=object))
+        return json.loads(frame.to_json(orient="records"))[0]
@@ -0,0 +1,43 @@
+"""
+全域解釋圖 (GET /global_shap) 的快取
+
+圖只會隨模型改變，所以整個前端 process (所有使用者 session 共用) 只留一份解碼好的 PNG bytes：
+    - 已知的模型版本 (/predict 回應的 X-Model-Version) 和快取的一樣 -> 不發 request
+    - 否則帶 If-None-Match 重新驗證，後端回 304 就沿用，回 200 才重新解碼
+每個模型版本、每個前端 instance 只會真的下載一次。
+"""
+import base64
+import threading
+
+
+class GlobalPlotCache:
+    def __init__(self, client):
+        self.client = client  # http_client.BackendClient
+        self.etag = None
+        self.model_version = None
+        self.images = None  # {"beeswarm": PNG bytes, "bar": PNG bytes}
+        self.fetches = 0  # 下載 (200) 次數
+        self.revalidations = 0  # 304 次數
+        self._lock = threading.Lock()
+
+    def get(self, model_version=None, headers=None):
+        """回傳 {名稱: PNG bytes}；連線失敗時丟出 requests.RequestException"""
+        # 同時有好幾個 session 要圖時只送一個 request，其餘的等著用結果
+        with self._lock:
+            if self.images is not None and model_version and model_version == self.model_version:
+                return self.images
+
+            req_headers = dict(headers or {})
+            if self.etag and self.images is not None:
+                req_headers["If-None-Match"] = self.etag
+            resp = self.client.get("/global_shap", headers=req_headers)
+            if resp.status_code == 304 and self.images is not None:
+                self.revalidations += 1
+            else:
+                resp.raise_for_status()
+                plots = resp.json() or {}
+                self.images = {k: base64.b64decode(v) for k, v in plots.items() if isinstance(v, str)}
+                self.etag = resp.headers.get("ETag")
+                self.fetches += 1
+            self.model_version = resp.headers.get("X-Model-Version") or model_version
+            return self.images
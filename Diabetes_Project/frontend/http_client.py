@@ -0,0 +1,134 @@
+"""
+前端呼叫後端用的 HTTP client (整個 Streamlit process 共用一個)
+
+    - requests.Session + 連線池：keep-alive，每次按預測不必重新做 TCP / TLS handshake
+    - 連線 / 讀取 timeout 分開設定 (讀取要等 SHAP 與畫圖，比較長)
+    - urllib3 Retry：連線失敗任何方法都重試 (request 還沒送出)；讀取失敗與 502/503/504
+      只重試 GET 等冪等方法，間隔是指數退避 + 隨機 jitter
+    - circuit breaker：連續 BACKEND_BREAKER_FAILURES 次失敗 (連線錯誤、逾時、5xx) 後，
+      BACKEND_BREAKER_RESET 秒內直接丟出 BackendUnavailable，不再讓每個使用者等 timeout；
+      時間到放一個 request 試試，成功就恢復
+
+設定 (環境變數)：
+    BACKEND_CONNECT_TIMEOUT   秒，預設 3.05
+    BACKEND_READ_TIMEOUT      秒，預設 30
+    BACKEND_RETRIES           預設 2
+    BACKEND_POOL_SIZE         每個 host 保留的連線數，預設 16
+    BACKEND_BREAKER_FAILURES  預設 5
+    BACKEND_BREAKER_RESET     秒，預設 30
+"""
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+class BackendUnavailable(requests.ConnectionError):
+    """circuit breaker 開啟中 (後端最近一直失敗)"""
+
+
+class CircuitBreaker:
+    """closed -> (連續失敗 failure_threshold 次) -> open -> (reset_after 秒後) half-open -> closed / open"""
+
+    def __init__(self, failure_threshold=5, reset_after=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_after = reset_after
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False  # half-open 時已經放出去的那一個 request
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def _state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_after:
+            return "half-open"
+        return "open"
+
+    def allow(self):
+        with self._lock:
+            state = self._state()
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial:
+                self._trial = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+class BackendClient:
+    def __init__(self, base_url, connect_timeout=3.05, read_timeout=30.0, retries=2,
+                 pool_size=16, failure_threshold=5, reset_after=30.0):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = (connect_timeout, read_timeout)
+        self.breaker = CircuitBreaker(failure_threshold, reset_after)
+
+        retry = Retry(
+            total=retries, connect=retries, read=retries, status=retries,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset({"GET", "HEAD", "OPTIONS"}),
+            backoff_factor=0.2, backoff_jitter=0.2, backoff_max=2.0,
+            respect_retry_after_header=True, raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    @classmethod
+    def from_env(cls, base_url):
+        return cls(
+            base_url,
+            connect_timeout=float(os.getenv("BACKEND_CONNECT_TIMEOUT", "3.05")),
+            read_timeout=float(os.getenv("BACKEND_READ_TIMEOUT", "30")),
+            retries=int(os.getenv("BACKEND_RETRIES", "2")),
+            pool_size=int(os.getenv("BACKEND_POOL_SIZE", "16")),
+            failure_threshold=int(os.getenv("BACKEND_BREAKER_FAILURES", "5")),
+            reset_after=float(os.getenv("BACKEND_BREAKER_RESET", "30")),
+        )
+
+    def request(self, method, path, timeout=None, **kwargs):
+        """回傳 requests.Response (4xx 也照常回傳)；連線失敗或 breaker 開啟時丟出 requests.RequestException"""
+        if not self.breaker.allow():
+            raise BackendUnavailable(f"backend unavailable (circuit open, retry after {self.breaker.reset_after:g}s)")
+        try:
+            resp = self.session.request(method, f"{self.base_url}{path}",
+                                        timeout=timeout or self.timeout, **kwargs)
+        except requests.RequestException:
+            self.breaker.record_failure()
+            raise
+        if resp.status_code >= 500:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return resp
+
+    def get(self, path, **kwargs):
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request("POST", path, **kwargs)
+
+    def close(self):
+        self.session.close()
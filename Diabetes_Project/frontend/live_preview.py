@@ -0,0 +1,84 @@
+"""
+輸入頁的即時風險預覽 (POST /predict_lite：只算機率，不算 SHAP、不畫圖)
+
+每個 session 一個 LivePreview (放在 session_state)，預覽的 fragment 每隔幾秒呼叫一次 poll()：
+    - debounce：輸入停止變動 debounce 秒後才問後端，連續改好幾個欄位只送最後一次
+    - 依輸入的雜湊快取 (LRU，最多 max_entries 筆)，改回之前的值不必再問後端
+    - 後端忙 (503、逾時、連線失敗、circuit breaker 開啟)：不顯示錯誤，
+      暫停 backoff 秒 (503 有 Retry-After 就照它)，畫面保留上一次的預覽
+"""
+import hashlib
+import json
+import time
+from collections import OrderedDict
+
+import requests
+
+# poll() 回傳的狀態
+FRESH = "fresh"  # 目前的輸入已經有結果
+WAITING = "waiting"  # 輸入剛改過，等 debounce (機率是上一次的結果)
+PAUSED = "paused"  # 後端忙，暫停中 (機率是上一次的結果)
+
+
+class PreviewBusy(Exception):
+    """後端回 503 (/predict_lite 同時處理的數量已滿)"""
+
+    def __init__(self, retry_after=None):
+        super().__init__("preview busy")
+        self.retry_after = retry_after
+
+
+def input_hash(values):
+    """輸入 {變數名: 值} 的雜湊 (只在值改變時才需要轉換成代碼)"""
+    return hashlib.sha1(json.dumps(values, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class LivePreview:
+    def __init__(self, debounce=0.8, max_entries=64, backoff=10.0):
+        self.debounce = debounce
+        self.max_entries = max_entries
+        self.backoff = backoff
+        self.cache = OrderedDict()  # 輸入雜湊 -> 機率 (輸入不合法時是 None)
+        self.pending = None  # (輸入雜湊, 第一次看到的時間)
+        self.paused_until = 0.0
+        self.last = None  # 最後一次拿到的機率
+        self.fetches = 0
+        self.failures = 0
+
+    def poll(self, values, fetch, now=None):
+        """
+        回傳 (狀態, 機率或 None)
+        fetch(values) 問後端並回傳機率 (輸入不合法時回傳 None)；
+        後端忙時丟出 PreviewBusy 或 requests.RequestException
+        """
+        now = time.monotonic() if now is None else now
+        key = input_hash(values)
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            self.pending = None
+            self.last = self.cache[key]
+            return FRESH, self.last
+        if now < self.paused_until:
+            return PAUSED, self.last
+        if self.pending is None or self.pending[0] != key:
+            self.pending = (key, now)
+        if now - self.pending[1] < self.debounce:
+            return WAITING, self.last
+
+        self.fetches += 1
+        try:
+            probability = fetch(values)
+        except PreviewBusy as e:
+            return self._pause(now, e.retry_after)
+        except requests.RequestException:
+            return self._pause(now)
+        self.pending = None
+        self.cache[key] = self.last = probability
+        while len(self.cache) > self.max_entries:
+            self.cache.popitem(last=False)
+        return FRESH, probability
+
+    def _pause(self, now, retry_after=None):
+        self.failures += 1
+        self.paused_until = now + (retry_after if retry_after else self.backoff)
+        return PAUSED, self.last
@@ -0,0 +1,105 @@
+import os
+
+import pandas as pd
+import requests
+import streamlit as st
+
+from backend_api import backend_client, field_catalog
+from bulk_screening import new_job_dir, remove_job, score_upload
+
+# 畫面上最多顯示幾列 (完整結果在下載的檔案裡)
+PREVIEW_ROWS = int(os.getenv("BULK_PREVIEW_ROWS", "5000"))
+
+st.set_page_config(page_title="HealthShield - Bulk Screening", layout="wide")
+
+if "bulk_upload_key" not in st.session_state:
+    st.session_state["bulk_upload_key"] = 0
+
+st.title("Bulk Screening / 批次篩檢")
+try:
+    catalog = field_catalog()
+except (requests.RequestException, ValueError, KeyError) as e:
+    st.error(f"Could not load the input fields from the backend / 無法取得輸入欄位: {e}")
+    st.stop()
+st.write(
+    "Upload a CSV with one person per row. Columns can be NHANES codes "
+    f"({', '.join(list(catalog.name_mapping.values())[:4])}, ...) or the form names "
+    f"({', '.join(list(catalog.name_mapping)[:4])}, ...); yes / no and male / female are accepted. "
+    "An optional `SEQN` column is kept as the row id. / 上傳 CSV，每列一個人"
+)
+
+upload = st.file_uploader("CSV file / 上傳檔案", type="csv",
+                          key=f"bulk_upload_{st.session_state['bulk_upload_key']}")
+chunksize = st.number_input("Rows per request / 每次送出的列數", min_value=100, max_value=50000,
+                            value=2000, step=500)
+start = st.button("Start screening / 開始篩檢", type="primary", disabled=upload is None)
+
+column_config = {
+    "row": st.column_config.NumberColumn("Row / 列"),
+    "id": st.column_config.TextColumn("ID"),
+    "probability": st.column_config.ProgressColumn("Probability / 機率", min_value=0.0, max_value=1.0,
+                                                   format="percent"),
+    "errors": st.column_config.TextColumn("Errors / 錯誤"),
+}
+
+if start:
+    # 上一次的結果檔先刪掉；session 裡只留工作目錄、計數與前 PREVIEW_ROWS 列
+    previous = st.session_state.get("bulk_job")
+    remove_job(previous and previous["dir"])
+    job = {"dir": new_job_dir(), "name": upload.name, "path": None, "done": False,
+           "rows_read": 0, "rows_scored": 0, "rows_failed": 0, "preview": None, "error": None}
+    st.session_state["bulk_job"] = job
+
+    progress = st.progress(0.0, text="Uploading... / 上傳中")
+    table = st.empty()
+    preview = []
+    try:
+        for update in score_upload(backend_client(), catalog, upload, job["dir"], int(chunksize)):
+            job.update({k: update[k] for k in ("path", "rows_read", "rows_scored", "rows_failed")})
+            shown = sum(len(p) for p in preview)
+            if shown < PREVIEW_ROWS:
+                preview.append(update["rows"].head(PREVIEW_ROWS - shown))
+                job["preview"] = pd.concat(preview, ignore_index=True)
+                table.dataframe(job["preview"], column_config=column_config, hide_index=True)
+            progress.progress(update["fraction"],
+                              text=f"{job['rows_read']:,} rows read, {job['rows_scored']:,} scored, "
+                                   f"{job['rows_failed']:,} with errors / 已處理 {job['rows_read']:,} 列")
+        job["done"] = True
+        progress.progress(1.0, text="Done / 完成")
+    except ValueError as e:
+        job["error"] = f"Could not read the file / 無法讀取檔案: {e}"
+    except requests.RequestException as e:
+        job["error"] = f"Backend Error: {e}"
+
+    # 評分完就把上傳的檔案從 uploader 放掉 (換一個 key)，不讓它一直留在 session 裡
+    st.session_state["bulk_upload_key"] += 1
+    st.rerun()
+
+job = st.session_state.get("bulk_job")
+if job:
+    st.divider()
+    st.subheader(f"Results / 結果: {job['name']}")
+    c1, c2, c3 = st.columns(3)
+    c1.metric("Rows read / 讀取", f"{job['rows_read']:,}")
+    c2.metric("Scored / 完成評分", f"{job['rows_scored']:,}")
+    c3.metric("With errors / 有錯誤", f"{job['rows_failed']:,}")
+    if job["error"]:
+        st.error(job["error"])
+    if not job["done"] and job["rows_read"]:
+        st.warning("Screening stopped before the end of the file; the download has the rows scored so far. "
+                   "/ 篩檢未完成，下載檔只含已處理的列")
+
+    if job["preview"] is not None:
+        if job["rows_read"] > len(job["preview"]):
+            st.caption(f"Showing the first {len(job['preview']):,} rows; download the file for all of them. "
+                       "Click a column header to sort. / 只顯示前幾列，完整結果請下載")
+        st.dataframe(job["preview"], column_config=column_config, hide_index=True)
+
+    if job["path"] and os.path.exists(job["path"]):
+        def read_results(path=job["path"]):
+            # 按下下載時才讀檔
+            with open(path, "rb") as f:
+                return f.read()
+
+        st.download_button("Download scored CSV / 下載結果", data=read_results,
+                           file_name=f"scored_{os.path.splitext(job['name'])[0]}.csv", mime="text/csv")
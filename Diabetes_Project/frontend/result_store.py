@@ -0,0 +1,229 @@
+"""
+預測結果的大型檔案 (個人 waterfall PNG、force plot HTML) 放在伺服器端，session state 只留 ID
+
+force_html 內含整段 SHAP JS，加上 waterfall 圖，一次預測就是幾百 KB；
+如果放在 st.session_state，每個開著的 session 都佔一份，使用者越多記憶體越高。
+改成所有 session 共用一個有上限的 store：
+    MemoryStore   process 內的 LRU + TTL，總大小不超過 max_bytes
+    DiskStore     每筆結果一個目錄 (預設在系統暫存目錄)，同樣依大小 / TTL 淘汰
+
+session state 只放 result_id 與機率、建議等小欄位，結果頁再用 ID 取圖；
+被淘汰或過期時 get() 回傳 None，結果頁請使用者重新預測。
+result_id 是隨機的 token (所有 session 共用同一個 store，不能被猜到)。
+
+設定 (環境變數)：
+    RESULT_STORE          memory (預設) | disk | disk:/path/to/dir
+    RESULT_STORE_TTL      秒數，預設 3600
+    RESULT_STORE_MAX_MB   總大小上限，預設 256
+"""
+import os
+import re
+import secrets
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+# DiskStore 的副檔名：讀回來時決定是 str 還是 bytes
+TEXT_SUFFIX = ".txt"
+BINARY_SUFFIX = ".bin"
+# secrets.token_urlsafe(16) 的樣子；DiskStore 只會刪符合的目錄
+RESULT_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{22}$")
+
+
+def artifact_size(artifacts):
+    return sum(len(v.encode("utf-8")) if isinstance(v, str) else len(v) for v in artifacts.values())
+
+
+class ResultStore:
+    """介面；子類別實作 _put / _get / _evict，值是 {名稱: bytes 或 str}"""
+
+    def __init__(self, ttl=3600, max_bytes=256 * 1024 * 1024):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def put(self, artifacts):
+        """存一筆結果，回傳 result_id"""
+        result_id = secrets.token_urlsafe(16)
+        with self._lock:
+            self._put(result_id, artifacts)
+            self._evict(time.time())
+        return result_id
+
+    def get(self, result_id):
+        """回傳 {名稱: 值}；不存在、已過期或被淘汰時回傳 None"""
+        if not result_id:
+            return None
+        with self._lock:
+            artifacts = self._get(result_id, time.time())
+            if artifacts is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return artifacts
+
+    def stats(self):
+        with self._lock:
+            return {
+                "backend": type(self).__name__,
+                "ttl": self.ttl,
+                "max_bytes": self.max_bytes,
+                "entries": self._entries(),
+                "bytes": self._bytes(),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def _put(self, result_id, artifacts):
+        raise NotImplementedError
+
+    def _get(self, result_id, now):
+        raise NotImplementedError
+
+    def _evict(self, now):
+        raise NotImplementedError
+
+    def _entries(self):
+        raise NotImplementedError
+
+    def _bytes(self):
+        raise NotImplementedError
+
+
+class MemoryStore(ResultStore):
+    """process 內的 LRU；超過 max_bytes 時從最久沒讀的開始丟，過期的也丟"""
+
+    def __init__(self, ttl=3600, max_bytes=256 * 1024 * 1024):
+        super().__init__(ttl, max_bytes)
+        self._data = OrderedDict()  # result_id -> (expire_at, size, artifacts)
+        self._size = 0
+
+    def _put(self, result_id, artifacts):
+        size = artifact_size(artifacts)
+        self._data[result_id] = (time.time() + self.ttl, size, dict(artifacts))
+        self._size += size
+
+    def _get(self, result_id, now):
+        entry = self._data.get(result_id)
+        if entry is None:
+            return None
+        if entry[0] < now:
+            self._drop(result_id)
+            return None
+        self._data.move_to_end(result_id)
+        return entry[2]
+
+    def _drop(self, result_id):
+        _, size, _ = self._data.pop(result_id)
+        self._size -= size
+        self.evictions += 1
+
+    def _evict(self, now):
+        for result_id in [k for k, (expire_at, _, _) in self._data.items() if expire_at < now]:
+            self._drop(result_id)
+        # 最新放進來的那筆一定留著 (就算它本身比上限還大)
+        while self._size > self.max_bytes and len(self._data) > 1:
+            self._drop(next(iter(self._data)))
+
+    def _entries(self):
+        return len(self._data)
+
+    def _bytes(self):
+        return self._size
+
+
+class DiskStore(ResultStore):
+    """
+    每筆結果一個目錄 <directory>/<result_id>/<名稱>.bin|.txt
+    LRU 順序、到期時間與大小放在記憶體 (只有檔案內容在磁碟上)，
+    process 重啟時上一次留下的目錄會在建立時清掉
+    """
+
+    def __init__(self, directory=None, ttl=3600, max_bytes=256 * 1024 * 1024):
+        super().__init__(ttl, max_bytes)
+        self.directory = directory or os.path.join(tempfile.gettempdir(), "healthshield-results")
+        os.makedirs(self.directory, exist_ok=True)
+        self._index = OrderedDict()  # result_id -> (expire_at, size)
+        self._size = 0
+        # 上一個 process 留下的結果：不在 index 裡，直接刪掉 (其他檔案不動)
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if RESULT_ID_PATTERN.match(name) and os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+
+    def _path(self, result_id):
+        return os.path.join(self.directory, result_id)
+
+    def _put(self, result_id, artifacts):
+        path = self._path(result_id)
+        os.makedirs(path)
+        for name, value in artifacts.items():
+            if isinstance(value, str):
+                with open(os.path.join(path, name + TEXT_SUFFIX), "w", encoding="utf-8") as f:
+                    f.write(value)
+            else:
+                with open(os.path.join(path, name + BINARY_SUFFIX), "wb") as f:
+                    f.write(value)
+        size = artifact_size(artifacts)
+        self._index[result_id] = (time.time() + self.ttl, size)
+        self._size += size
+
+    def _get(self, result_id, now):
+        entry = self._index.get(result_id)
+        if entry is None:
+            return None
+        if entry[0] < now:
+            self._drop(result_id)
+            return None
+        artifacts = {}
+        try:
+            for filename in os.listdir(self._path(result_id)):
+                name, suffix = os.path.splitext(filename)
+                if suffix == TEXT_SUFFIX:
+                    with open(os.path.join(self._path(result_id), filename), encoding="utf-8") as f:
+                        artifacts[name] = f.read()
+                else:
+                    with open(os.path.join(self._path(result_id), filename), "rb") as f:
+                        artifacts[name] = f.read()
+        except FileNotFoundError:
+            # 目錄被外部清掉 (例如暫存目錄被系統清理)
+            self._drop(result_id)
+            return None
+        self._index.move_to_end(result_id)
+        return artifacts
+
+    def _drop(self, result_id):
+        _, size = self._index.pop(result_id)
+        self._size -= size
+        self.evictions += 1
+        shutil.rmtree(self._path(result_id), ignore_errors=True)
+
+    def _evict(self, now):
+        for result_id in [k for k, (expire_at, _) in self._index.items() if expire_at < now]:
+            self._drop(result_id)
+        while self._size > self.max_bytes and len(self._index) > 1:
+            self._drop(next(iter(self._index)))
+
+    def _entries(self):
+        return len(self._index)
+
+    def _bytes(self):
+        return self._size
+
+
+def from_env():
+    """依 RESULT_STORE 建立 store"""
+    setting = os.getenv("RESULT_STORE", "memory").strip()
+    ttl = float(os.getenv("RESULT_STORE_TTL", "3600"))
+    max_bytes = int(float(os.getenv("RESULT_STORE_MAX_MB", "256")) * 1024 * 1024)
+    if setting == "disk" or setting.startswith("disk:"):
+        return DiskStore(setting.partition(":")[2] or None, ttl=ttl, max_bytes=max_bytes)
+    if setting != "memory":
+        raise ValueError(f"unknown RESULT_STORE: {setting!r} (memory | disk | disk:/path)")
+    return MemoryStore(ttl=ttl, max_bytes=max_bytes)
@@ -0,0 +1,71 @@
+import pandas as pd
+
+from field_catalog import FieldCatalog
+
+def values(series):
+    """NaN / None 都當成 None，方便比較"""
+    return [None if pd.isna(v) else v for v in series]
+
+
+YES_NO = [["yes", 1], ["no", 2], ["I don't know", None]]
+DOCUMENT = {
+    "version": "test",
+    "sections": [{"id": "basic"}, {"id": "lifestyle"}],
+    "fields": [
+        {"name": "age", "code": "RIDAGEYR", "section": "basic", "display": "Age"},
+        {"name": "gender", "code": "RIAGENDR", "section": "basic", "options": [["male", 1], ["female", 2]]},
+        {"name": "bmi", "code": "BMXBMI", "section": "basic", "derived": "bmi"},
+        {"name": "ever_smoked", "code": "SMQ020", "section": "lifestyle", "options": YES_NO, "display": "Ever Smoked"},
+        {"name": "general_health", "code": "HUQ010", "section": "lifestyle",
+         "options": [["5", 5], ["1", 1], ["I don't know", None]]},
+    ],
+}
+
+
+def test_form_names_become_codes_in_catalog_order_and_unknown_columns_are_dropped():
+    catalog = FieldCatalog(DOCUMENT)
+    frame = pd.DataFrame({"SEQN": [1, 2], "ever_smoked": ["yes", "no"], "age": [45, 60], "notes": ["a", "b"]})
+    out = catalog.to_codes(frame)
+    assert list(out.columns) == ["RIDAGEYR", "SMQ020"]
+    assert out["RIDAGEYR"].tolist() == [45, 60]
+    assert "SEQN" in frame.columns  # 原本的 DataFrame 不動
+
+
+def test_code_column_wins_over_the_form_name():
+    catalog = FieldCatalog(DOCUMENT)
+    out = catalog.to_codes(pd.DataFrame({"age": [1], "RIDAGEYR": [50]}))
+    assert out.to_dict("list") == {"RIDAGEYR": [50]}
+
+
+def test_option_text_is_mapped_case_insensitively_and_other_values_are_kept():
+    catalog = FieldCatalog(DOCUMENT)
+    frame = pd.DataFrame({
+        "SMQ020": [" Yes", "NO", "i don't know", 1, "maybe"],
+        "gender": ["Female", "male", 2, None, "MALE "],
+        "HUQ010": ["5", "1", "I don't know", 3, "5"],
+    })
+    out = catalog.to_codes(frame)
+    assert values(out["SMQ020"]) == [1, 2, None, 1, "maybe"]  # 認不得的交給後端驗證
+    assert values(out["RIAGENDR"]) == [2, 1, 2, None, 1]
+    assert values(out["HUQ010"]) == [5, 1, None, 3, 5]
+
+
+def test_numeric_columns_are_left_alone():
+    catalog = FieldCatalog(DOCUMENT)
+    out = catalog.to_codes(pd.DataFrame({"SMQ020": [1.0, 2.0, float("nan")]}))
+    assert out["SMQ020"].dtype == float
+    assert out["SMQ020"].tolist()[:2] == [1.0, 2.0]
+
+
+def test_to_payload_sends_nulls_for_unknown_answers():
+    catalog = FieldCatalog(DOCUMENT)
+    payload = catalog.to_payload({"age": 45, "gender": "female", "ever_smoked": "I don't know", "bmi": None})
+    assert payload == {"RIDAGEYR": 45, "RIAGENDR": 2, "BMXBMI": None, "SMQ020": None}
+
+
+def test_missing_lists_unanswered_inputs_by_display_name():
+    catalog = FieldCatalog(DOCUMENT)
+    values = {"age": None, "gender": "male", "ever_smoked": None, "general_health": None}
+    assert catalog.missing(values, {"general_health": True}) == ["Age", "Ever Smoked"]
+    assert [f["name"] for f in catalog.inputs()] == ["age", "gender", "ever_smoked", "general_health"]
+    assert catalog.display_name("RIAGENDR") == "gender" and catalog.display_name("XYZ") == "XYZ"
@@ -0,0 +1,107 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+import http_client
+from http_client import BackendClient, BackendUnavailable, CircuitBreaker
+
+
+@pytest.fixture
+def flaky_backend():
+    """每個 request 都回 status (預設 503)，記錄每個方法被打幾次"""
+    calls = {}
+
+    class Handler(BaseHTTPRequestHandler):
+        status = 503
+
+        def log_message(self, *args):
+            pass
+
+        def _reply(self):
+            calls[self.command] = calls.get(self.command, 0) + 1
+            self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            self.send_response(Handler.status)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        do_GET = do_POST = _reply
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}", calls, Handler
+    server.shutdown()
+    server.server_close()
+
+
+def test_breaker_opens_after_consecutive_failures_and_lets_one_trial_through(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(http_client.time, "monotonic", lambda: now[0])
+    breaker = CircuitBreaker(failure_threshold=3, reset_after=30)
+    breaker.record_failure()
+    breaker.record_success()  # 成功會把連續失敗歸零
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == "closed" and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+
+    now[0] = 30.0
+    assert breaker.state == "half-open"
+    assert breaker.allow() and not breaker.allow()  # 只放一個
+    breaker.record_failure()  # 試的那一個失敗：重新計時
+    assert breaker.state == "open"
+
+    now[0] = 60.0
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.failures == 0
+
+
+def test_5xx_is_retried_for_get_but_not_for_post(flaky_backend):
+    url, calls, _ = flaky_backend
+    client = BackendClient(url, retries=2, failure_threshold=10)
+    assert client.get("/schema").status_code == 503
+    assert client.post("/predict", json={}).status_code == 503
+    assert calls == {"GET": 3, "POST": 1}
+    assert client.breaker.failures == 2  # 一次呼叫 (含重試) 只算一次失敗
+    client.close()
+
+
+def test_open_breaker_fails_fast_without_calling_the_backend(flaky_backend):
+    url, calls, handler = flaky_backend
+    client = BackendClient(url, retries=0, failure_threshold=2, reset_after=60)
+    for _ in range(2):
+        client.post("/predict", json={})
+    with pytest.raises(BackendUnavailable) as exc:
+        client.post("/predict", json={})
+    assert isinstance(exc.value, requests.ConnectionError)  # 呼叫端原本的 except 照樣接得到
+    assert calls == {"POST": 2}
+
+    handler.status = 200
+    client.breaker.opened_at -= 60
+    assert client.get("/schema").status_code == 200
+    assert client.breaker.state == "closed"
+    client.close()
+
+
+def test_connection_errors_count_as_failures():
+    with ThreadingHTTPServer(("127.0.0.1", 0), BaseHTTPRequestHandler) as server:
+        port = server.server_port  # 關掉後這個 port 沒人在聽
+    client = BackendClient(f"http://127.0.0.1:{port}", retries=0, failure_threshold=1)
+    with pytest.raises(requests.ConnectionError):
+        client.get("/schema")
+    assert client.breaker.state == "open"
+
+
+def test_from_env(monkeypatch):
+    monkeypatch.setenv("BACKEND_CONNECT_TIMEOUT", "1.5")
+    monkeypatch.setenv("BACKEND_READ_TIMEOUT", "10")
+    monkeypatch.setenv("BACKEND_RETRIES", "4")
+    monkeypatch.setenv("BACKEND_BREAKER_FAILURES", "7")
+    client = BackendClient.from_env("http://backend:8000/")
+    assert client.base_url == "http://backend:8000"
+    assert client.timeout == (1.5, 10.0)
+    assert client.session.get_adapter("http://backend:8000").max_retries.total == 4
+    assert client.breaker.failure_threshold == 7
@@ -0,0 +1,43 @@
+import pytest
+
+pytest.importorskip("streamlit.testing.v1")
+import streamlit as st  # noqa: E402
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+import backend_api  # noqa: E402
+from benchmarks.input_reruns import APP_PATH, PROFILE, find_widget, run_session  # noqa: E402
+from benchmarks.stub_backend import StubBackend  # noqa: E402
+
+# 在 fragment 裡 (每改一次就重跑) 的欄位；其餘都在表單裡
+FRAGMENT_INPUTS = {"age", "Gender", "height_cm", "weight_kg", "waist_cm"}
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    backend = StubBackend()
+    with backend as url:
+        monkeypatch.setattr(backend_api, "BACKEND_URL", url)
+        st.cache_resource.clear()
+        yield backend
+        st.cache_resource.clear()
+
+
+def test_form_fields_only_rerun_on_submit_and_are_sent_together(stub):
+    session = run_session(APP_PATH, timeout=30)
+    assert session["deferred_inputs"] == len(PROFILE) - len(FRAGMENT_INPUTS)
+    assert session["reruns"] == len(FRAGMENT_INPUTS) + 1  # 送出算一次
+    assert stub.calls["/predict"] == 1
+    payload = stub.last_payload
+    assert (payload["RIDAGEYR"], payload["RIAGENDR"], payload["MCQ300C"], payload["PAQ665"]) == (52, 1, 1, 2)
+    assert (payload["LBXGH"], payload["LBDLDL"], payload["HUQ010"]) == (5.9, 128.0, 3)
+    assert payload["BMXBMI"] == round(84.0 / 1.72 ** 2, 1)
+
+
+def test_implausible_bmi_is_flagged_while_typing(stub):
+    at = AppTest.from_file(APP_PATH, default_timeout=30).run()
+    find_widget(at, "number_input", "height_cm").set_value(172.0)
+    find_widget(at, "number_input", "weight_kg").set_value(84.0).run()
+    assert not [w for w in at.warning if "BMI" in w.value]
+    find_widget(at, "number_input", "height_cm").set_value(150.0)
+    find_widget(at, "number_input", "weight_kg").set_value(216.0).run()  # 填成磅
+    assert [w for w in at.warning if "looks unusual" in w.value]
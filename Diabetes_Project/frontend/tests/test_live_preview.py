@@ -0,0 +1,66 @@
+import requests
+
+from http_client import BackendUnavailable
+from live_preview import FRESH, PAUSED, WAITING, LivePreview, PreviewBusy
+
+
+class Backend:
+    """記錄每次被問到的輸入；失敗時依序丟出 errors 裡的例外"""
+
+    def __init__(self, *errors):
+        self.asked = []
+        self.errors = list(errors)
+
+    def __call__(self, values):
+        self.asked.append(dict(values))
+        if self.errors:
+            raise self.errors.pop(0)
+        return values["LBXGH"] / 10
+
+
+def test_only_the_last_of_a_burst_of_edits_is_sent():
+    preview, backend = LivePreview(debounce=0.8), Backend()
+    for t, glucose in ((0.0, 5.0), (0.3, 5.5), (0.6, 6.0)):
+        assert preview.poll({"LBXGH": glucose}, backend, now=t) == (WAITING, None)
+    assert preview.poll({"LBXGH": 6.0}, backend, now=1.3) == (WAITING, None)  # 6.0 是 0.6 才出現的
+    assert preview.poll({"LBXGH": 6.0}, backend, now=1.5) == (FRESH, 0.6)
+    assert backend.asked == [{"LBXGH": 6.0}]
+
+    # 改了之後還在等：顯示上一次的機率
+    assert preview.poll({"LBXGH": 7.0}, backend, now=2.0) == (WAITING, 0.6)
+
+
+def test_values_seen_before_come_from_the_cache():
+    preview, backend = LivePreview(debounce=0, max_entries=2), Backend()
+    for glucose in (5.0, 6.0, 5.0):
+        preview.poll({"LBXGH": glucose}, backend, now=0)
+    assert len(backend.asked) == 2
+    preview.poll({"LBXGH": 7.0}, backend, now=0)  # 6.0 是最久沒用的，被擠掉
+    assert preview.poll({"LBXGH": 5.0}, backend, now=0) == (FRESH, 0.5)
+    preview.poll({"LBXGH": 6.0}, backend, now=0)
+    assert len(backend.asked) == 4 and preview.fetches == 4
+
+
+def test_busy_backend_pauses_and_keeps_the_last_probability():
+    preview = LivePreview(debounce=0, backoff=10)
+    backend = Backend(PreviewBusy(retry_after=3), requests.Timeout(), BackendUnavailable("circuit open"))
+    assert preview.poll({"LBXGH": 5.0}, Backend(), now=0) == (FRESH, 0.5)
+
+    assert preview.poll({"LBXGH": 6.0}, backend, now=1) == (PAUSED, 0.5)
+    assert preview.poll({"LBXGH": 6.0}, backend, now=3.9) == (PAUSED, 0.5)  # Retry-After: 3
+    assert len(backend.asked) == 1
+    assert preview.poll({"LBXGH": 6.0}, backend, now=4) == (PAUSED, 0.5)  # 逾時：暫停 backoff 秒
+    assert preview.poll({"LBXGH": 6.0}, backend, now=13.9) == (PAUSED, 0.5)
+    assert preview.poll({"LBXGH": 6.0}, backend, now=14) == (PAUSED, 0.5)  # breaker 開啟
+    assert preview.poll({"LBXGH": 6.0}, backend, now=24) == (FRESH, 0.6)
+    assert preview.failures == 3 and len(backend.asked) == 4
+    # 暫停中改回快取過的值照樣顯示
+    assert preview.poll({"LBXGH": 5.0}, backend, now=24) == (FRESH, 0.5)
+
+
+def test_invalid_inputs_are_cached_as_none():
+    preview = LivePreview(debounce=0)
+    asked = []
+    assert preview.poll({"LBXGH": -1}, lambda values: asked.append(values), now=0) == (FRESH, None)
+    assert preview.poll({"LBXGH": -1}, lambda values: asked.append(values), now=1) == (FRESH, None)
+    assert len(asked) == 1
@@ -0,0 +1,78 @@
+import os
+
+import pytest
+
+import result_store
+from result_store import RESULT_ID_PATTERN, DiskStore, MemoryStore
+
+
+@pytest.fixture(params=["memory", "disk"])
+def make_store(request, tmp_path):
+    def make(**kwargs):
+        if request.param == "disk":
+            return DiskStore(str(tmp_path / "results"), **kwargs)
+        return MemoryStore(**kwargs)
+    return make
+
+
+def test_round_trip_keeps_text_and_bytes_apart(make_store):
+    store = make_store()
+    result_id = store.put({"waterfall": b"\x89PNG", "force_html": "<div>力</div>"})
+    assert RESULT_ID_PATTERN.match(result_id)
+    assert store.get(result_id) == {"waterfall": b"\x89PNG", "force_html": "<div>力</div>"}
+    assert store.get("unknown") is None and store.get(None) is None
+    stats = store.stats()
+    assert (stats["entries"], stats["bytes"], stats["hits"], stats["misses"]) == (1, 4 + len("<div>力</div>".encode()), 1, 1)
+
+
+def test_evicts_the_least_recently_read_but_keeps_the_newest(make_store):
+    store = make_store(max_bytes=10)
+    a = store.put({"png": b"a" * 4})
+    b = store.put({"png": b"b" * 4})
+    store.get(a)  # a 比 b 新
+    c = store.put({"png": b"c" * 4})
+    assert store.get(b) is None
+    assert store.get(a) and store.get(c)
+    big = store.put({"png": b"d" * 50})  # 比上限還大的那筆也留著
+    assert store.get(big) == {"png": b"d" * 50}
+    assert store.stats()["entries"] == 1
+    assert store.stats()["evictions"] == 3
+
+
+def test_expired_results_are_gone(make_store, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(result_store.time, "time", lambda: now[0])
+    store = make_store(ttl=60)
+    old = store.put({"png": b"x"})
+    now[0] += 61
+    new = store.put({"png": b"y"})  # put 時把過期的清掉
+    assert store.stats()["entries"] == 1
+    assert store.get(old) is None
+    now[0] += 61
+    assert store.get(new) is None
+    assert store.stats()["bytes"] == 0
+
+
+def test_disk_store_removes_files_and_leftovers_from_a_previous_process(tmp_path):
+    directory = tmp_path / "results"
+    store = DiskStore(str(directory), max_bytes=5)
+    first = store.put({"png": b"12345"})
+    second = store.put({"png": b"67890"})
+    assert sorted(os.listdir(directory)) == [second]
+    assert first != second
+
+    (directory / "notes.txt").write_text("keep me")
+    DiskStore(str(directory))  # 重啟：上一次的結果目錄清掉，其他檔案不動
+    assert os.listdir(directory) == ["notes.txt"]
+    assert store.get(second) is None  # 目錄被外部清掉也只是 miss
+
+
+def test_from_env(monkeypatch, tmp_path):
+    monkeypatch.setenv("RESULT_STORE", f"disk:{tmp_path}")
+    monkeypatch.setenv("RESULT_STORE_MAX_MB", "1")
+    store = result_store.from_env()
+    assert isinstance(store, DiskStore) and store.directory == str(tmp_path)
+    assert store.max_bytes == 1024 * 1024
+    monkeypatch.setenv("RESULT_STORE", "redis://cache")
+    with pytest.raises(ValueError):
+        result_store.from_env()
@@ -0,0 +1,111 @@
+"""
+前端的 request 追蹤
+
+每次按下「Get My Prediction」建立一個 Trace，記錄：
+    streamlit.prediction      整個流程 (root span，從送出那次 rerun 開始到結果頁畫完)
+    ├─ streamlit.input_run    送出那次 script run (資料清理 + 呼叫 API)
+    │  ├─ POST /predict       呼叫後端 (client span，span id 會放進 traceparent 給後端接)
+    │  └─ GET /global_shap    與 /predict 同時在背景執行 (可能在 result_run 裡才結束)
+    └─ streamlit.result_run   st.rerun() 後畫結果頁的那次 script run
+
+span 格式是 OTLP/JSON (和後端 backend/tracing.py 相同)，寫到 TRACE_EXPORT_FILE
+或 POST 到 TRACE_EXPORT_URL；兩者都沒設定就只產生 header，不輸出。
+輸出在背景執行緒 (一次一批、依序)，script run 不等 POST；
+Streamlit 結束時 ThreadPoolExecutor 會先把排隊中的送完。
+"""
+import json
+import os
+import secrets
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+SERVICE_NAME = "healthshield-frontend"
+TRACE_EXPORT_FILE = os.getenv("TRACE_EXPORT_FILE")
+TRACE_EXPORT_URL = os.getenv("TRACE_EXPORT_URL")
+
+SPAN_INTERNAL, SPAN_CLIENT = 1, 3
+
+_exporter = ThreadPoolExecutor(max_workers=1, thread_name_prefix="span-export")
+
+
+class Trace:
+    def __init__(self, start_ns=None):
+        self.trace_id = secrets.token_hex(16)
+        self.root_id = secrets.token_hex(8)
+        self.start_ns = start_ns or time.time_ns()
+        self.spans = []
+        self.start_run(self.start_ns)
+
+    def start_run(self, start_ns=None):
+        """開始記錄一次 script run (Streamlit 每次 rerun 都是一次)"""
+        self.run_id = secrets.token_hex(8)
+        self.run_start_ns = start_ns or time.time_ns()
+
+    def end_run(self, name):
+        self.spans.append(_make_span(name, self.trace_id, self.run_id, self.root_id,
+                                     self.run_start_ns, time.time_ns(), SPAN_INTERNAL))
+
+    @contextmanager
+    def span(self, name, parent_id=None, kind=SPAN_INTERNAL, start_ns=None):
+        """記錄一個 span；yield 出 span id，方便當子 span 的 parent 或放進 traceparent"""
+        span_id = secrets.token_hex(8)
+        start = start_ns or time.time_ns()
+        try:
+            yield span_id
+        finally:
+            self.spans.append(_make_span(name, self.trace_id, span_id, parent_id or self.root_id,
+                                         start, time.time_ns(), kind))
+
+    def headers(self, span_id):
+        """送給後端的 header：traceparent 與 X-Request-ID (= trace id)"""
+        return {
+            "traceparent": f"00-{self.trace_id}-{span_id}-01",
+            "X-Request-ID": self.trace_id,
+        }
+
+    def finish(self):
+        """補上 root span，交給背景執行緒輸出 (回傳 Future；沒設定輸出時是 None)"""
+        self.spans.append(_make_span("streamlit.prediction", self.trace_id, self.root_id, None,
+                                     self.start_ns, time.time_ns(), SPAN_INTERNAL))
+        spans, self.spans = self.spans, []
+        if TRACE_EXPORT_FILE or TRACE_EXPORT_URL:
+            return _exporter.submit(export, spans)
+        return None
+
+
+def _make_span(name, trace_id, span_id, parent_id, start_ns, end_ns, kind):
+    return {
+        "traceId": trace_id,
+        "spanId": span_id,
+        "parentSpanId": parent_id or "",
+        "name": name,
+        "kind": kind,
+        "startTimeUnixNano": str(start_ns),
+        "endTimeUnixNano": str(end_ns),
+        "attributes": [],
+    }
+
+
+def export(spans):
+    if not spans or not (TRACE_EXPORT_FILE or TRACE_EXPORT_URL):
+        return
+    payload = {
+        "resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+            "scopeSpans": [{"scope": {"name": "healthshield"}, "spans": spans}],
+        }]
+    }
+    line = json.dumps(payload, separators=(",", ":"))
+    try:
+        if TRACE_EXPORT_FILE:
+            os.makedirs(os.path.dirname(os.path.abspath(TRACE_EXPORT_FILE)), exist_ok=True)
+            with open(TRACE_EXPORT_FILE, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+        if TRACE_EXPORT_URL:
+            req = urllib.request.Request(TRACE_EXPORT_URL, data=line.encode("utf-8"),
+                                         headers={"Content-Type": "application/json"}, method="POST")
+            urllib.request.urlopen(req, timeout=2).close()
+    except OSError:
+        pass  # 追蹤失敗不能影響使用者
@@ -0,0 +1,149 @@
+"""
+從前後端輸出的 trace 檔 (OTLP/JSON lines) 重建每個 request 的 waterfall
+
+    python trace_waterfall.py traces/frontend.jsonl traces/backend.jsonl
+    python trace_waterfall.py traces/*.jsonl --trace 4bf92f3577b34da6a3ce929d0e0e4736
+    python trace_waterfall.py traces/*.jsonl --slowest 5 --json
+
+除了 waterfall，也會把時間拆成三部分，方便判斷慢在哪裡：
+    frontend  Streamlit 自己花的時間 (rerun、畫圖)
+    network   client span 扣掉對應的 server span (連線、TLS、排隊)
+    backend   後端 server span 的時間
+"""
+import argparse
+import glob
+import json
+from collections import defaultdict
+
+BAR_WIDTH = 40
+
+
+def load_spans(paths):
+    spans = []
+    for pattern in paths:
+        for path in sorted(glob.glob(pattern)) or [pattern]:
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    payload = json.loads(line)
+                    for rs in payload.get("resourceSpans", []):
+                        service = "?"
+                        for attr in rs.get("resource", {}).get("attributes", []):
+                            if attr["key"] == "service.name":
+                                service = attr["value"].get("stringValue", "?")
+                        for ss in rs.get("scopeSpans", []):
+                            for span in ss.get("spans", []):
+                                span = dict(span)
+                                span["service"] = service
+                                span["start"] = int(span["startTimeUnixNano"])
+                                span["end"] = int(span["endTimeUnixNano"])
+                                spans.append(span)
+    return spans
+
+
+def group_traces(spans):
+    traces = defaultdict(list)
+    for span in spans:
+        traces[span["traceId"]].append(span)
+    return traces
+
+
+def ordered_tree(spans):
+    """依 parent 關係排成 (depth, span) 的清單，同一層依開始時間排序"""
+    ids = {s["spanId"] for s in spans}
+    children = defaultdict(list)
+    roots = []
+    for s in spans:
+        parent = s.get("parentSpanId") or ""
+        if parent and parent in ids:
+            children[parent].append(s)
+        else:
+            roots.append(s)
+
+    out = []
+
+    def walk(span, depth):
+        out.append((depth, span))
+        for child in sorted(children[span["spanId"]], key=lambda c: c["start"]):
+            walk(child, depth + 1)
+
+    for root in sorted(roots, key=lambda r: r["start"]):
+        walk(root, 0)
+    return out
+
+
+def attribute(spans):
+    """拆成 frontend / network / backend 三部分 (毫秒)"""
+    by_id = {s["spanId"]: s for s in spans}
+    total_start = min(s["start"] for s in spans)
+    total_end = max(s["end"] for s in spans)
+    total = (total_end - total_start) / 1e6
+
+    backend = network = 0.0
+    for s in spans:
+        # server span (kind=2) 的 parent 是前端的 client span
+        if s.get("kind") == 2:
+            dur = (s["end"] - s["start"]) / 1e6
+            backend += dur
+            parent = by_id.get(s.get("parentSpanId"))
+            if parent is not None and parent.get("kind") == 3:
+                network += (parent["end"] - parent["start"]) / 1e6 - dur
+    return {
+        "total_ms": round(total, 2),
+        "frontend_ms": round(max(total - backend - network, 0.0), 2),
+        "network_ms": round(network, 2),
+        "backend_ms": round(backend, 2),
+    }
+
+
+def render(trace_id, spans):
+    t0 = min(s["start"] for s in spans)
+    total = max(s["end"] for s in spans) - t0 or 1
+    summary = attribute(spans)
+    lines = [
+        f"trace {trace_id}  total {summary['total_ms']:.1f} ms  "
+        f"(frontend {summary['frontend_ms']:.1f} / network {summary['network_ms']:.1f} / "
+        f"backend {summary['backend_ms']:.1f})",
+        f"{'offset':>9} {'dur':>9}  {'service':<22} span",
+    ]
+    for depth, s in ordered_tree(spans):
+        offset = (s["start"] - t0) / 1e6
+        dur = (s["end"] - s["start"]) / 1e6
+        left = int((s["start"] - t0) / total * BAR_WIDTH)
+        width = max(1, int((s["end"] - s["start"]) / total * BAR_WIDTH))
+        bar = " " * left + "█" * min(width, BAR_WIDTH - left)
+        name = "  " * depth + s["name"]
+        lines.append(f"{offset:9.1f} {dur:9.1f}  {s['service']:<22} {name:<40} |{bar:<{BAR_WIDTH}}|")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="重建前後端 trace 的 waterfall")
+    parser.add_argument("files", nargs="+", help="OTLP/JSON lines 檔 (可用萬用字元)")
+    parser.add_argument("--trace", help="只顯示這個 trace id")
+    parser.add_argument("--slowest", type=int, default=10, help="顯示最慢的 N 個 trace")
+    parser.add_argument("--json", action="store_true", help="輸出每個 trace 的時間拆解 (JSON)")
+    args = parser.parse_args()
+
+    traces = group_traces(load_spans(args.files))
+    if args.trace:
+        selected = [args.trace] if args.trace in traces else []
+    else:
+        selected = sorted(traces, key=lambda t: attribute(traces[t])["total_ms"], reverse=True)
+        selected = selected[:args.slowest]
+
+    if args.json:
+        print(json.dumps({t: attribute(traces[t]) for t in selected}, indent=2))
+        return
+    if not selected:
+        print("找不到符合的 trace")
+        return
+    for trace_id in selected:
+        print(render(trace_id, traces[trace_id]))
+        print()
+
+
+if __name__ == "__main__":
+    main()
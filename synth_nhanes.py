@@ -0,0 +1,437 @@
+"""
+產生 NHANES 格式的合成資料 (壓力測試用，不需要真的 NHANES 檔)
+
+    python synth_nhanes.py --out synthetic --rows-per-cycle 100000
+    python synth_nhanes.py --out synthetic --rows-per-cycle 1000000 --format xpt csv \\
+        --merged synthetic/ALL_NHANES_MERGED_20072018.csv
+
+輸出的資料夾結構與 crawl.py 下載的相同，可以直接接著跑後面的流程：
+    synthetic/nhanes_20072008/DEMO_E.XPT, BMX_E.XPT, ...   (combine_xpt.py 讀得到的檔名與欄位)
+    cd synthetic && python ../combine_xpt.py && python ../deal_nan.py && python ../combine_year.py
+
+- SEQN 跨 cycle 連續不重複，同一個人在各模組檔的 SEQN 相同
+- 各模組只收特定年齡、部分模組是子樣本 (空腹檢驗約 45%)，沒收到的人不在該檔裡
+- 特殊代碼 7/9、77/99、777/999、7777/9999 依 deal_nan.py 的分組出現
+- 檢驗值之間有相關 (BMI -> 胰島素、三酸甘油脂；糖尿病 -> HbA1c -> 空腹血糖；
+  LDL 用 Friedewald 公式由 TC、HDL、TG 算出，TG > 400 時為缺值)
+- 每個 cycle 的模組 / 欄位組合不同 (例如 2015 之後睡眠改成 SLD012、2013 之後胰島素在 INS 檔)
+  缺值率也隨 cycle 變高
+- 以固定大小的區塊 (BLOCK_ROWS) 產生並寫入，記憶體與總列數無關；
+  同樣的 --seed 與參數一定得到同樣的檔案
+1999-2004 的檢驗檔名是特例 (combine_xpt.py 的 LAB_SPECIAL)，這裡只產生 2005 之後的 cycle。
+"""
+import argparse
+import struct
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+BLOCK_ROWS = 100_000
+
+# cycle 資料夾 -> 檔名字尾 (與 crawl.py 相同；字尾 P 的檔名是 P_MOD)
+CYCLES = {
+    "nhanes_20052006": "D",
+    "nhanes_20072008": "E",
+    "nhanes_20092010": "F",
+    "nhanes_20112012": "G",
+    "nhanes_20132014": "H",
+    "nhanes_20152016": "I",
+    "nhanes_20172018": "J",
+    "nhanes_20172020": "P",
+    "nhanes_20212023": "L",
+}
+DEFAULT_CYCLES = ["nhanes_20072008", "nhanes_20092010", "nhanes_20112012",
+                  "nhanes_20132014", "nhanes_20152016", "nhanes_20172018"]
+# 第一個 cycle 的起始 SEQN (與真實資料相同)，之後的 cycle 接著編號
+FIRST_SEQN = {"nhanes_20052006": 31127, "nhanes_20072008": 41475}
+
+# 模組欄位 (與 combine_xpt.py 的 MODULES 相同)
+MODULES = {
+    "DIQ": ["SEQN", "DIQ010"],
+    "MCQ": ["SEQN", "MCQ010", "MCQ035", "MCQ300A", "MCQ300B", "MCQ300C",
+            "MCQ160C", "MCQ160E", "MCQ160F", "MCQ160N", "MCQ080"],
+    "DEMO": ["SEQN", "RIDAGEYR", "RIAGENDR", "RIDRETH1", "DMDEDUC2", "DMDEDUC3", "DMDMARTL", "INDFMINC"],
+    "BMX": ["SEQN", "BMXHT", "BMXWT", "BMXBMI", "BMXWAIST", "BMXTRI", "BMXSUB"],
+    "SMQ": ["SEQN", "SMQ020", "SMQ040"],
+    "SLQ": ["SEQN", "SLQ050", "SLD012", "SLD010H"],
+    "HUQ": ["SEQN", "HUQ010", "HUQ050"],
+    "PAQ": ["SEQN", "PAD680", "PAQ560", "PAQ665", "PAQ650"],
+    "ALQ": ["SEQN", "ALQ130"],
+    "GLU": ["SEQN", "LBXGLU", "LBXIN"],
+    "TCHOL": ["SEQN", "LBXTC"],
+    "HDL": ["SEQN", "LBDHDD"],
+    "TRIGLY": ["SEQN", "LBDLDL", "LBXTR"],
+    "BPX": ["SEQN", "BPXSY1", "BPXDI1", "BPXSY2", "BPXDI2", "BPXSY3", "BPXDI3"],
+    "AL_IGE": ["SEQN", "LBXIGE", "LBXID1", "LBXID2", "LBXIE1", "LBXIE5"],
+    "COT": ["SEQN", "LBXCOT"],
+    "VID": ["SEQN", "LBDVIDMS"],
+    "PBCD": ["SEQN", "LBXBCD", "LBXBPB", "LBXTHG"],
+    "UAS": ["SEQN", "URXUAS"],
+    "UHG": ["SEQN", "URXUHG"],
+    "RDQ": ["SEQN", "RDQ070", "RDQ090", "RDQ100"],
+    "SMQFAM": ["SEQN", "SMD410"],
+    "INS": ["SEQN", "LBXIN"],
+    "GHB": ["SEQN", "LBXGH"],
+}
+
+# 各模組收案條件：(最小年齡, 收案比例, 子樣本群組)；同一群組的模組收同一批人 (例如空腹檢驗)
+ENROLLMENT = {
+    "DEMO": (0, 1.00, None), "DIQ": (1, 0.99, None), "MCQ": (1, 0.99, None),
+    "BMX": (0, 0.96, None), "SMQ": (18, 0.95, None), "SLQ": (16, 0.95, None),
+    "HUQ": (0, 0.99, None), "PAQ": (2, 0.97, None), "ALQ": (18, 0.90, None),
+    "GLU": (12, 0.45, "fasting"), "INS": (12, 0.45, "fasting"), "TRIGLY": (12, 0.45, "fasting"),
+    "TCHOL": (6, 0.85, "blood"), "HDL": (6, 0.85, "blood"), "GHB": (12, 0.85, "blood"),
+    "BPX": (8, 0.88, None), "COT": (3, 0.85, "blood"), "VID": (1, 0.80, "blood"),
+    "PBCD": (1, 0.80, "blood"), "UAS": (6, 0.33, "urine"), "UHG": (6, 0.33, "urine"),
+    "RDQ": (1, 0.97, None), "SMQFAM": (0, 0.99, None), "AL_IGE": (1, 0.80, "blood"),
+}
+
+# 每個 cycle 的模組 / 欄位差異 (與真實 NHANES 一樣，不是每年都有每個檔)
+def cycle_layout(cycle):
+    year = int(cycle[7:11])
+    modules = dict(MODULES)
+    if year != 2005:
+        modules.pop("AL_IGE")             # 過敏原只有 2005-2006
+    if year >= 2013:
+        modules.pop("SMQFAM")
+        modules["GLU"] = ["SEQN", "LBXGLU"]  # 胰島素移到 INS 檔
+    else:
+        modules.pop("INS")
+    if year < 2015:
+        modules["SLQ"] = ["SEQN", "SLQ050", "SLD010H"]
+    else:
+        modules["SLQ"] = ["SEQN", "SLQ050", "SLD012"]
+    if year in (2011, 2012):
+        modules.pop("VID")
+    return modules
+
+
+# 特殊代碼 (deal_nan.py 的 NAN_MAP 分組)：欄位 -> (代碼, 出現比例)
+SPECIAL_CODES = {
+    "DIQ010": ([7, 9], 0.003), "SMQ020": ([7, 9], 0.003), "SMQ040": ([7, 9], 0.002),
+    "MCQ300A": ([7, 9], 0.02), "MCQ300B": ([7, 9], 0.02), "MCQ300C": ([7, 9], 0.03),
+    "MCQ010": ([7, 9], 0.002), "MCQ035": ([7, 9], 0.002), "MCQ080": ([7, 9], 0.002),
+    "MCQ160C": ([7, 9], 0.004), "MCQ160E": ([7, 9], 0.004), "MCQ160F": ([7, 9], 0.004),
+    "MCQ160N": ([7, 9], 0.004), "SLQ050": ([7, 9], 0.003), "HUQ010": ([7, 9], 0.002),
+    "RDQ070": ([7, 9], 0.002), "RDQ090": ([7, 9], 0.002), "RDQ100": ([7, 9], 0.002),
+    "SMD410": ([7, 9], 0.002), "DMDEDUC2": ([7, 9], 0.002), "PAQ665": ([7, 9], 0.002),
+    "PAQ650": ([7, 9], 0.002), "DMDEDUC3": ([77, 99], 0.002), "INDFMINC": ([77, 99], 0.03),
+    "DMDMARTL": ([77, 99], 0.002), "HUQ050": ([77, 99], 0.002), "SLD010H": ([77, 99], 0.003),
+    "ALQ130": ([777, 999], 0.005), "PAQ560": ([77, 99], 0.005), "PAD680": ([7777, 9999], 0.005),
+}
+
+
+# ---------------------------------------------------------
+# 一個區塊的受訪者 (所有欄位)
+# ---------------------------------------------------------
+def _cat(rng, n, values, p):
+    return rng.choice(np.asarray(values, dtype=float), n, p=p)
+
+
+def _lognormal(rng, n, median, sigma, lo=None, hi=None, decimals=2):
+    x = median * np.exp(rng.normal(0, sigma, n))
+    return np.round(np.clip(x, lo, hi), decimals)
+
+
+def generate_people(rng, n, year):
+    """回傳 DataFrame (n 列，全部欄位，尚未套用收案與缺值)"""
+    df = {}
+    child = rng.random(n) < 0.35
+    age = np.where(child, rng.integers(0, 18, n), rng.integers(18, 81, n)).astype(float)
+    female = rng.random(n) < 0.51
+    adult = age >= 18
+    df["RIDAGEYR"] = age
+    df["RIAGENDR"] = np.where(female, 2.0, 1.0)
+    df["RIDRETH1"] = _cat(rng, n, [1, 2, 3, 4, 5], [0.17, 0.10, 0.38, 0.22, 0.13])
+    df["DMDEDUC2"] = np.where(age >= 20, _cat(rng, n, [1, 2, 3, 4, 5], [0.1, 0.14, 0.23, 0.3, 0.23]), np.nan)
+    df["DMDEDUC3"] = np.where((age >= 6) & (age < 20), np.clip(age - 5, 0, 15), np.nan)
+    df["DMDMARTL"] = np.where(age >= 20, _cat(rng, n, [1, 2, 3, 4, 5, 6],
+                                              [0.5, 0.06, 0.11, 0.03, 0.2, 0.1]), np.nan)
+    df["INDFMINC"] = rng.integers(1, 14, n).astype(float)
+
+    # 身體測量：BMI 是共同的潛在變數
+    bmi = np.where(adult, 28.5 * np.exp(rng.normal(0, 0.2, n)),
+                   (16 + 0.25 * age) * np.exp(rng.normal(0, 0.15, n)))
+    height = np.where(adult, np.where(female, 161.5, 175.5) + rng.normal(0, 7, n),
+                      np.minimum(52 + 6.2 * age, 175) + rng.normal(0, 5, n))
+    height = np.round(np.clip(height, 45, 210), 1)
+    weight = np.round(np.clip(bmi * (height / 100) ** 2, 2.5, 240), 1)
+    df["BMXHT"], df["BMXWT"] = height, weight
+    df["BMXBMI"] = np.round(weight / (height / 100) ** 2, 1)
+    df["BMXWAIST"] = np.round(np.clip(28 + 2.4 * df["BMXBMI"] + rng.normal(0, 6, n), 35, 180), 1)
+    df["BMXTRI"] = _lognormal(rng, n, 0.6 * df["BMXBMI"], 0.3, 3, 45, 1)
+    df["BMXSUB"] = _lognormal(rng, n, 0.65 * df["BMXBMI"], 0.35, 3, 45, 1)
+
+    # 病史與糖尿病
+    family = rng.random(n) < 0.36
+    logit = -6.6 + 0.065 * age + 0.11 * (bmi - 27) + 0.9 * family
+    diabetic = adult & (rng.random(n) < 1 / (1 + np.exp(-logit)))
+    borderline = ~diabetic & adult & (rng.random(n) < 0.02)
+    df["DIQ010"] = np.select([diabetic, borderline], [1.0, 3.0], 2.0)
+    df["MCQ300C"] = np.where(age >= 20, np.where(family, 1.0, 2.0), np.nan)
+    for col, p in [("MCQ300A", 0.12), ("MCQ300B", 0.15)]:
+        df[col] = np.where(age >= 20, np.where(rng.random(n) < p, 1.0, 2.0), np.nan)
+    df["MCQ010"] = np.where(rng.random(n) < 0.14, 1.0, 2.0)
+    df["MCQ035"] = np.where(df["MCQ010"] == 1, np.where(rng.random(n) < 0.55, 1.0, 2.0), np.nan)
+    for col, base in [("MCQ160C", 0.02), ("MCQ160E", 0.015), ("MCQ160F", 0.015), ("MCQ160N", 0.01)]:
+        p = base * np.exp(0.04 * (age - 50))
+        df[col] = np.where(age >= 20, np.where(rng.random(n) < p, 1.0, 2.0), np.nan)
+    df["MCQ080"] = np.where(age >= 16, np.where(bmi > 30, 1.0, _cat(rng, n, [1, 2], [0.2, 0.8])), np.nan)
+
+    # 檢驗值 (彼此相關)
+    a1c = 5.3 + 0.006 * age + 0.025 * (bmi - 27) + rng.normal(0, 0.3, n)
+    a1c = a1c + diabetic * np.abs(rng.normal(1.6, 1.3, n))
+    df["LBXGH"] = np.round(np.clip(a1c, 3.5, 17.5), 1)
+    df["LBXGLU"] = np.round(np.clip(97 + 30 * (df["LBXGH"] - 5.5) + rng.normal(0, 8, n), 40, 580))
+    df["LBXIN"] = _lognormal(rng, n, 9.5 * np.exp(0.06 * (bmi - 27)), 0.5, 0.5, 650)
+    tc = np.clip(165 + 0.6 * np.minimum(age, 60) + rng.normal(0, 38, n), 70, 700)
+    hdl = np.clip(52 - 0.7 * (bmi - 27) + 9 * female + rng.normal(0, 12, n), 10, 200)
+    tg = _lognormal(rng, n, 105 * np.exp(0.025 * (bmi - 27) + 0.25 * diabetic), 0.45, 15, 3000, 0)
+    df["LBXTC"], df["LBDHDD"], df["LBXTR"] = np.round(tc), np.round(hdl), tg
+    ldl = np.round(tc - hdl - tg / 5)
+    df["LBDLDL"] = np.where((tg <= 400) & (ldl > 10), ldl, np.nan)  # Friedewald 公式
+    df["LBXCOT"] = np.where(rng.random(n) < 0.2, _lognormal(rng, n, 180, 0.8, 1, 1500, 1),
+                            _lognormal(rng, n, 0.03, 1.2, 0.011, 10, 3))
+    df["LBDVIDMS"] = _lognormal(rng, n, 62, 0.35, 5, 300, 1)
+    df["LBXBCD"] = _lognormal(rng, n, 0.3, 0.6, 0.07, 10)
+    df["LBXBPB"] = _lognormal(rng, n, 1.1, 0.6, 0.1, 40)
+    df["LBXTHG"] = _lognormal(rng, n, 0.8, 0.9, 0.1, 50)
+    df["URXUAS"] = _lognormal(rng, n, 7, 1.0, 0.5, 900)
+    df["URXUHG"] = _lognormal(rng, n, 0.4, 1.0, 0.05, 30)
+    for col in ["LBXIGE", "LBXID1", "LBXID2", "LBXIE1", "LBXIE5"]:
+        df[col] = _lognormal(rng, n, 40 if col == "LBXIGE" else 0.1, 1.3, 0.1, 5000)
+
+    # 血壓：真實值 + 三次量測誤差；舒張壓偶爾量到 0 (notebook 會當作缺值)
+    sys_true = 102 + 0.55 * np.maximum(age - 18, 0) + 0.6 * (bmi - 27) + rng.normal(0, 13, n)
+    dia_true = 66 + 0.15 * np.maximum(age - 18, 0) + 0.4 * (bmi - 27) + rng.normal(0, 9, n)
+    for i in (1, 2, 3):
+        df[f"BPXSY{i}"] = np.round(np.clip(sys_true + rng.normal(0, 4, n), 70, 240) / 2) * 2
+        dia = np.round(np.clip(dia_true + rng.normal(0, 4, n), 20, 130) / 2) * 2
+        df[f"BPXDI{i}"] = np.where(rng.random(n) < 0.01, 0.0, dia)
+
+    # 生活習慣
+    smoker = rng.random(n) < 0.42
+    df["SMQ020"] = np.where(smoker, 1.0, 2.0)
+    df["SMQ040"] = np.where(smoker, _cat(rng, n, [1, 2, 3], [0.4, 0.1, 0.5]), np.nan)
+    drinker = rng.random(n) < 0.65
+    df["ALQ130"] = np.where(drinker, np.clip(np.round(rng.gamma(1.6, 1.6, n)) + 1, 1, 25), np.nan)
+    active = rng.random(n) < 1 / (1 + np.exp(0.05 * (bmi - 27) + 0.02 * (age - 40)))
+    df["PAQ665"] = np.where(active | (rng.random(n) < 0.3), 1.0, 2.0)
+    df["PAQ650"] = np.where(active & (rng.random(n) < 0.6), 1.0, 2.0)
+    df["PAD680"] = np.round(np.clip(rng.normal(330, 180, n), 0, 1320) / 10) * 10
+    df["PAQ560"] = np.where(age < 12, rng.integers(0, 8, n).astype(float), np.nan)
+    sleep = np.clip(rng.normal(7.2, 1.3, n), 2, 14)
+    if year < 2015:
+        df["SLD010H"], df["SLD012"] = np.round(sleep), np.nan
+    else:
+        df["SLD010H"], df["SLD012"] = np.nan, np.round(sleep * 2) / 2
+    df["SLQ050"] = np.where(rng.random(n) < 0.27, 1.0, 2.0)
+    health = np.clip(np.round(2.6 + 0.5 * diabetic + 0.04 * (bmi - 27) + rng.normal(0, 0.9, n)), 1, 5)
+    df["HUQ010"] = health
+    df["HUQ050"] = _cat(rng, n, [0, 1, 2, 3, 4, 5], [0.16, 0.28, 0.24, 0.17, 0.08, 0.07])
+    for col in ["RDQ070", "RDQ090", "RDQ100"]:
+        df[col] = np.where(rng.random(n) < 0.12, 1.0, 2.0)
+    df["SMD410"] = np.where(rng.random(n) < 0.18, 1.0, 2.0)
+    return pd.DataFrame(df)
+
+
+def apply_codes_and_missing(rng, df, cycle_index):
+    """題目層級的缺值 (越新的 cycle 越多) 與特殊代碼"""
+    n = len(df)
+    rate = 0.02 * (1 + 0.15 * cycle_index)
+    for col in df.columns:
+        if col in ("RIDAGEYR", "RIAGENDR"):
+            continue
+        values = df[col].to_numpy()
+        values[rng.random(n) < rate] = np.nan
+        if col in SPECIAL_CODES:
+            codes, p = SPECIAL_CODES[col]
+            hit = (rng.random(n) < p) & ~np.isnan(values)
+            values[hit] = rng.choice(codes, int(hit.sum()))
+        df[col] = values
+    return df
+
+
+# ---------------------------------------------------------
+# SAS XPORT v5 寫檔 (pandas 只能讀 XPT，不能寫)
+# ---------------------------------------------------------
+def ieee_to_ibm(values):
+    """float64 陣列 -> IBM 浮點數 (n, 8) bytes；NaN 寫成 SAS 缺值 '.'"""
+    x = np.asarray(values, dtype=np.float64)
+    missing = np.isnan(x)
+    mant, exp2 = np.frexp(np.abs(np.where(missing, 0.0, x)))                 # |x| = mant * 2**exp2，mant 在 [0.5, 1)
+    exp16 = -(-exp2 // 4)                            # ceil(exp2 / 4)
+    frac = np.ldexp(mant, exp2 - 4 * exp16)          # 在 [1/16, 1)
+    mant56 = np.ldexp(frac, 56).astype(np.uint64)    # 56 bit 小數部分 (轉換是精確的)
+    head = ((x < 0).astype(np.uint64) << np.uint64(7)) | (exp16 + 64).astype(np.uint64)
+    word = (head << np.uint64(56)) | mant56
+    word[x == 0] = 0
+    word[missing] = np.uint64(0x2E) << np.uint64(56)
+    return word.astype(">u8").view(np.uint8).reshape(-1, 8)
+
+
+def _card(text):
+    return text.ljust(80).encode("ascii")
+
+
+class XptWriter:
+    """串流寫出單一資料集的 XPORT v5 檔 (只有數值欄位)"""
+
+    def __init__(self, path, name, columns, label="", created=datetime(2000, 1, 1)):
+        self.f = open(path, "wb")
+        self.columns = list(columns)
+        self.written = 0
+        # 建立時間固定 (同樣的參數要產生一模一樣的檔案)
+        now = created.strftime("%d%b%y:%H:%M:%S").upper()
+        f = self.f
+        f.write(_card("HEADER RECORD*******LIBRARY HEADER RECORD!!!!!!!" + "0" * 30))
+        f.write(_card("SAS     SAS     SASLIB  9.4     X64_7PRO" + " " * 24 + now))
+        f.write(_card(now))
+        f.write(_card("HEADER RECORD*******MEMBER  HEADER RECORD!!!!!!!" + "0" * 17 + "160" + "0" * 7 + "140"))
+        f.write(_card("HEADER RECORD*******DSCRPTR HEADER RECORD!!!!!!!" + "0" * 30))
+        f.write(_card("SAS     " + name[:8].ljust(8) + "SASDATA 9.4     X64_7PRO" + " " * 24 + now))
+        f.write(_card(now + " " * 16 + label[:40].ljust(40) + " " * 8))
+        f.write(_card(f"HEADER RECORD*******NAMESTR HEADER RECORD!!!!!!!000000{len(self.columns):04d}" + "0" * 20))
+        namestr = b"".join(
+            struct.pack(">hhhh8s40s8shhh2s8shhi52s", 1, 0, 8, i + 1, col[:8].ljust(8).encode(),
+                        b" " * 40, b" " * 8, 0, 0, 0, b"\0\0", b" " * 8, 0, 0, 8 * i, b"\0" * 52)
+            for i, col in enumerate(self.columns)
+        )
+        f.write(namestr + b" " * (-len(namestr) % 80))
+        f.write(_card("HEADER RECORD*******OBS     HEADER RECORD!!!!!!!" + "0" * 30))
+
+    def write(self, df):
+        block = np.hstack([ieee_to_ibm(df[c]) for c in self.columns])
+        data = block.tobytes()
+        self.f.write(data)
+        self.written += len(data)
+
+    def close(self):
+        self.f.write(b" " * (-self.written % 80))
+        self.f.close()
+
+
+class CsvWriter:
+    def __init__(self, path, columns):
+        self.path = path
+        self.columns = list(columns)
+        self.header = True
+
+    def write(self, df):
+        df[self.columns].to_csv(self.path, mode="w" if self.header else "a",
+                                header=self.header, index=False, float_format="%.10g")
+        self.header = False
+
+    def close(self):
+        pass
+
+
+# ---------------------------------------------------------
+# 主流程
+# ---------------------------------------------------------
+def file_stem(module, suffix):
+    return f"P_{module}" if suffix == "P" else f"{module}_{suffix}"
+
+
+def enrollment_masks(rng, age, modules):
+    """每個模組收到哪些人 (同一子樣本群組的模組是同一批人)"""
+    n = len(age)
+    groups = {}
+    masks = {}
+    for module in modules:
+        min_age, p, group = ENROLLMENT[module]
+        if group is None:
+            draw = rng.random(n)
+        else:
+            draw = groups.setdefault(group, rng.random(n))
+        masks[module] = (age >= min_age) & (draw < p)
+    return masks
+
+
+MERGED_COLUMNS = [
+    "SEQN", "DIQ010", "RIDAGEYR", "RIAGENDR", "BMXHT", "BMXWT", "BMXBMI", "BMXWAIST",
+    "BPXSY1", "BPXDI1", "BPXSY2", "BPXDI2", "BPXSY3", "BPXDI3",
+    "LBXGLU", "LBXIN", "LBXGH", "LBXTC", "LBDHDD", "LBDLDL", "LBXTR",
+    "SMQ020", "MCQ300C", "ALQ130", "PAQ665", "PAQ650", "SLD012", "HUQ010",
+]
+
+
+def generate(out, cycles, rows_per_cycle, seed=2025, formats=("xpt",), merged=None):
+    out = Path(out)
+    merged_header = True
+    seqn = FIRST_SEQN.get(cycles[0], 41475)
+    stats = {}
+    for ci, cycle in enumerate(cycles):
+        started = time.perf_counter()
+        suffix = CYCLES[cycle]
+        year = int(cycle[7:11])
+        modules = cycle_layout(cycle)
+        folder = out / cycle
+        folder.mkdir(parents=True, exist_ok=True)
+        writers = {}
+        for module, cols in modules.items():
+            stem = file_stem(module, suffix)
+            writers[module] = []
+            if "xpt" in formats:
+                writers[module].append(XptWriter(folder / f"{stem}.XPT", stem, cols))
+            if "csv" in formats:
+                writers[module].append(CsvWriter(folder / f"{stem}.csv", cols))
+
+        for b, start in enumerate(range(0, rows_per_cycle, BLOCK_ROWS)):
+            n = min(BLOCK_ROWS, rows_per_cycle - start)
+            # 每個區塊各自的亂數種子：結果與執行順序無關
+            rng = np.random.default_rng([seed, ci, b])
+            people = generate_people(rng, n, year)
+            people = apply_codes_and_missing(rng, people, ci)
+            people.insert(0, "SEQN", np.arange(seqn, seqn + n, dtype=float))
+            seqn += n
+            masks = enrollment_masks(rng, people["RIDAGEYR"].to_numpy(), modules)
+            for module, cols in modules.items():
+                part = people.loc[masks[module], cols]
+                for w in writers[module]:
+                    w.write(part)
+
+            if merged:
+                # 與 combine_year.py 輸出的欄位相同 (SLD010H 併入 SLD012，加上 Source；未經 deal_nan 清洗)
+                wide = pd.DataFrame({"SEQN": people["SEQN"]})
+                for module, cols in modules.items():
+                    for c in cols[1:]:
+                        wide[c] = people[c].where(masks[module])
+                if "SLD010H" in wide.columns:
+                    wide["SLD012"] = wide.pop("SLD010H")
+                wide = wide.reindex(columns=MERGED_COLUMNS)
+                wide["Source"] = cycle.replace("nhanes_", "")
+                wide.to_csv(merged, mode="w" if merged_header else "a", header=merged_header,
+                            index=False, float_format="%.10g")
+                merged_header = False
+
+        for ws in writers.values():
+            for w in ws:
+                w.close()
+        stats[cycle] = round(time.perf_counter() - started, 2)
+        print(f"✔ {cycle}: {rows_per_cycle} 人, {len(modules)} 個模組 ({stats[cycle]} 秒)")
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="產生 NHANES 格式的合成資料 (XPT / CSV)")
+    parser.add_argument("--out", default="synthetic", help="輸出的根目錄 (底下是各 cycle 資料夾)")
+    parser.add_argument("--cycles", nargs="+", default=DEFAULT_CYCLES, choices=list(CYCLES))
+    parser.add_argument("--rows-per-cycle", type=int, default=10000,
+                        help="每個 cycle 的人數 (真實資料約 1 萬，可設到數百萬)")
+    parser.add_argument("--seed", type=int, default=2025)
+    parser.add_argument("--format", nargs="+", default=["xpt"], choices=["xpt", "csv"])
+    parser.add_argument("--merged", help="另外輸出合併後的寬表 CSV (同 ALL_NHANES_MERGED_20072018.csv 的欄位)")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    generate(args.out, args.cycles, args.rows_per_cycle, args.seed, args.format, args.merged)
+    total = args.rows_per_cycle * len(args.cycles)
+    print(f"✅ 共 {total} 人，{time.perf_counter() - started:.1f} 秒 -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()